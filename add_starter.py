@@ -1,9 +1,14 @@
 # migrate_add_starter.py
 import os
+import sys
 import json
 import mysql.connector
 from mysql.connector import Error
 
+# Hetzelfde migratiesysteem als de app gebruiken
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pesten', 'src'))
+from pesten.migrations import LATEST_VERSION, current_version, migrate  # noqa: E402
+
 CONFIG_FILENAME = "db_config.json"
 
 def main():
@@ -18,19 +23,14 @@ def main():
 
     try:
         conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
 
-        # Check of kolom bestaat
-        cursor.execute("SHOW COLUMNS FROM games LIKE 'starter'")
-        result = cursor.fetchone()
-        if result:
-            print("Kolom 'starter' bestaat al. Geen wijzigingen nodig.")
+        # Voert alle ontbrekende migraties uit, waaronder de kolom 'starter'
+        if current_version(conn) >= LATEST_VERSION:
+            print("Schema is al up-to-date. Geen wijzigingen nodig.")
         else:
-            cursor.execute("ALTER TABLE games ADD COLUMN starter VARCHAR(255)")
-            conn.commit()
-            print("Kolom 'starter' succesvol toegevoegd.")
+            version = migrate(conn, "mysql", log=print)
+            print(f"Schema bijgewerkt naar versie {version}.")
 
-        cursor.close()
         conn.close()
     except Error as err:
         print(f"Database fout: {err}")
@@ -1,7 +1,18 @@
+import os
+import sys
 import json
+import time
+import sqlite3
+import argparse
 import pymysql
 from pymysql import MySQLError
 
+# Hetzelfde migratiesysteem als de app gebruiken
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pesten', 'src'))
+from pesten.db import sql  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.players import IMPORT_CHUNK_SIZE, import_players, read_player_names  # noqa: E402
+
 CONFIG_FILENAME = 'db_config.json'
 
 def load_db_config():
@@ -12,24 +23,11 @@ def load_db_config():
         print(f"Kon config bestand '{CONFIG_FILENAME}' niet laden: {e}")
         return None
 
-def create_tables(conn):
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS scores (
-            speler VARCHAR(255) PRIMARY KEY,
-            wins INT DEFAULT 0
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS games (
-            id INT AUTO_INCREMENT PRIMARY KEY
-        )
-    """)
-    conn.commit()
-    cursor.close()
-    print("Tabellen aangemaakt of bestaan al.")
+def create_tables(conn, db_type="mysql"):
+    version = migrate(conn, db_type, log=print)
+    print(f"Tabellen aangemaakt of bestaan al (schemaversie {version}).")
 
-def add_players(conn):
+def add_players(conn, db_type="mysql"):
     cursor = conn.cursor()
     while True:
         speler = input("Voeg een speler toe (of leeg laten om te stoppen): ").strip()
@@ -37,32 +35,62 @@ def add_players(conn):
             break
 
         # Check of speler al bestaat
-        cursor.execute("SELECT COUNT(*) FROM scores WHERE speler = %s", (speler,))
+        cursor.execute(sql(db_type, "SELECT COUNT(*) FROM scores WHERE speler = %s"), (speler,))
         exists = cursor.fetchone()[0]
         if exists:
             print(f"Speler '{speler}' bestaat al.")
             continue
 
-        cursor.execute("INSERT INTO scores (speler, wins) VALUES (%s, 0)", (speler,))
+        cursor.execute(sql(db_type, "INSERT INTO scores (speler, wins) VALUES (%s, 0)"), (speler,))
         conn.commit()
         print(f"Speler '{speler}' toegevoegd.")
 
     cursor.close()
 
+def bulk_import(conn, db_type, path, chunk_size):
+    start = time.perf_counter()
+    if path == '-':
+        inserted, skipped = import_players(conn, db_type, read_player_names(sys.stdin), chunk_size)
+    else:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            inserted, skipped = import_players(conn, db_type, read_player_names(f), chunk_size)
+    elapsed = time.perf_counter() - start
+    rate = (inserted + skipped) / elapsed if elapsed > 0 else 0
+    print(f"{inserted} spelers toegevoegd, {skipped} overgeslagen ({rate:,.0f} rijen/s).")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Maak de tabellen aan en voeg spelers toe.")
+    parser.add_argument('--import', dest='import_file', metavar='BESTAND',
+                        help="Importeer spelers uit een CSV-/tekstbestand (eerste kolom), '-' voor stdin")
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                        help=f"Aantal spelers per transactie (standaard {IMPORT_CHUNK_SIZE})")
+    parser.add_argument('--sqlite', metavar='PAD', help="Gebruik dit SQLite-bestand in plaats van MySQL")
+    return parser.parse_args()
+
 def main():
-    config = load_db_config()
-    if not config:
-        print("Stoppen omdat geen config beschikbaar is.")
-        return
+    args = parse_args()
 
-    try:
-        conn = pymysql.connect(**config)
-    except MySQLError as e:
-        print(f"Kon niet verbinden met database: {e}")
-        return
+    if args.sqlite:
+        conn = sqlite3.connect(args.sqlite)
+        db_type = "sqlite"
+    else:
+        config = load_db_config()
+        if not config:
+            print("Stoppen omdat geen config beschikbaar is.")
+            return
+
+        try:
+            conn = pymysql.connect(**config)
+        except MySQLError as e:
+            print(f"Kon niet verbinden met database: {e}")
+            return
+        db_type = "mysql"
 
-    create_tables(conn)
-    add_players(conn)
+    create_tables(conn, db_type)
+    if args.import_file:
+        bulk_import(conn, db_type, args.import_file, args.chunk_size)
+    else:
+        add_players(conn, db_type)
     conn.close()
     print("Klaar.")
 
@@ -1,5 +1,8 @@
+import asyncio
+import functools
 import os
 import json
+import threading
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
@@ -8,6 +11,10 @@ from mysql.connector import Error
 import csv
 
 CONFIG_FILENAME = "db_config.json"
+EXPORT_CHUNK_SIZE = 5000
+# Deadlock (1213) en lock wait timeout (1205): de transactie opnieuw proberen
+RETRY_ERRNOS = (1205, 1213)
+MAX_ATTEMPTS = 5
 
 class PestenApp(toga.App):
     def __init__(self):
@@ -235,7 +242,7 @@ class PestenApp(toga.App):
     def show_winner_selection(self):
         knop_box = toga.Box(style=Pack(direction=COLUMN, padding=10))
         for speler in self.selected_players:
-            knop_box.add(toga.Button(speler, on_press=lambda w, s=speler: self.set_winner(s), style=Pack(padding=5)))
+            knop_box.add(toga.Button(speler, on_press=functools.partial(self.set_winner, speler=speler), style=Pack(padding=5)))
 
         # Knop voor stapel schudden
         knop_box.add(toga.Button(
@@ -262,14 +269,30 @@ class PestenApp(toga.App):
         except Error as err:
             self.main_window.info_dialog("Database Fout", f"Kon stapelstatus niet opslaan:\n{err}")
 
-    def set_winner(self, speler):
+    async def set_winner(self, widget, speler):
         if not self.cursor:
             self.main_window.info_dialog('Database Fout', 'Geen verbinding met database.')
             return
 
-        self.cursor.execute("UPDATE scores SET wins = wins + 1 WHERE speler = %s", (speler,))
-        self.cursor.execute("UPDATE games SET winnaar = %s WHERE id = %s", (speler, self.current_game_id))
-        self.conn.commit()
+        # Alleen het eerste resultaat telt: een dubbele tik of een tweede tablet
+        # die hetzelfde spel afsluit vindt al een winnaar en telt niets mee
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                self.cursor.execute(
+                    "UPDATE games SET winnaar = %s WHERE id = %s AND winnaar IS NULL",
+                    (speler, self.current_game_id),
+                )
+                if self.cursor.rowcount == 1:
+                    self.cursor.execute("UPDATE scores SET wins = wins + 1 WHERE speler = %s", (speler,))
+                self.conn.commit()
+                break
+            except Error as err:
+                self.conn.rollback()
+                if err.errno not in RETRY_ERRNOS or attempt == MAX_ATTEMPTS - 1:
+                    self.main_window.info_dialog('Database Fout', f'Kon winnaar niet opslaan:\n{err}')
+                    return
+                # Wachten zonder de eventloop (en dus de UI) te blokkeren
+                await asyncio.sleep(0.05 * 2 ** attempt)
         self.show_scores(None)
 
     def show_scores(self, widget):
@@ -277,7 +300,22 @@ class PestenApp(toga.App):
             self.scores_label.text = 'Geen database verbinding.'
             return
 
-        self.cursor.execute("SELECT speler, wins FROM scores ORDER BY wins DESC")
+        # Alle spelers met hun aantal gespeelde spellen in één query
+        self.cursor.execute("""
+            WITH RECURSIVE deelnames (speler, rest) AS (
+                SELECT CAST(NULL AS CHAR(255)), CONCAT(spelers, ',') FROM games
+                UNION ALL
+                SELECT SUBSTRING_INDEX(rest, ',', 1), SUBSTRING(rest, LOCATE(',', rest) + 1)
+                FROM deelnames WHERE rest <> ''
+            )
+            SELECT s.speler, s.wins, COALESCE(d.aantal, 0)
+            FROM scores s
+            LEFT JOIN (
+                SELECT speler, COUNT(*) AS aantal FROM deelnames
+                WHERE speler IS NOT NULL GROUP BY speler
+            ) d ON d.speler = s.speler
+            ORDER BY s.wins DESC, s.speler
+        """)
         score_rows = self.cursor.fetchall()
 
         if not score_rows:
@@ -285,10 +323,7 @@ class PestenApp(toga.App):
             return
 
         score_texts = []
-        for speler, wins in score_rows:
-            self.cursor.execute("SELECT COUNT(*) FROM games WHERE FIND_IN_SET(%s, spelers)", (speler,))
-            games_played = self.cursor.fetchone()[0]
-
+        for speler, wins, games_played in score_rows:
             if not wins == 0 and not games_played == 0:
                 percentage = (wins / games_played) * 100
             else:
@@ -302,13 +337,7 @@ class PestenApp(toga.App):
             self.main_window.info_dialog('Fout', 'Geen databaseverbinding.')
             return
 
-        self.cursor.execute("SELECT id, spelers, winnaar, starter, stapel_geschud FROM games ORDER BY id")
-        rows = self.cursor.fetchall()
-
-        if not rows:
-            self.main_window.info_dialog('Info', 'Er zijn geen gespeelde spellen om te exporteren.')
-            return
-
+        # Eerst de bestandsnaam, zodat er niets wordt opgehaald als de gebruiker annuleert
         file_path = await self.main_window.save_file_dialog(
             title='Sla spellen op als CSV',
             suggested_filename='spellen.csv',
@@ -318,22 +347,75 @@ class PestenApp(toga.App):
         if not file_path:
             return
 
+        self.cursor.execute("SELECT COUNT(*) FROM games")
+        total = self.cursor.fetchone()[0]
+        if not total:
+            self.main_window.info_dialog('Info', 'Er zijn geen gespeelde spellen om te exporteren.')
+            return
+
         file_path = os.path.abspath(file_path)
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+
+        progress_bar = toga.ProgressBar(max=total, value=0, style=Pack(padding=10))
+        progress_label = toga.Label(f'0 / {total} spellen', style=Pack(padding=(0, 10)))
+        cancel_button = toga.Button('Annuleer', on_press=lambda w: cancel.set(), style=Pack(padding=5))
+        progress_window = toga.Window(title='Spellen exporteren')
+        progress_window.content = toga.Box(children=[progress_bar, progress_label, cancel_button], style=Pack(direction=COLUMN, padding=10))
+        self.open_windows.add(progress_window)
+        progress_window.show()
+
+        def show_progress(exported):
+            progress_bar.value = exported
+            progress_label.text = f'{exported} / {total} spellen'
+
+        def export():
+            # Eigen verbinding met een unbuffered cursor: rijen komen in blokken
+            # van de server, dus het geheugengebruik blijft gelijk hoe groot games ook is
+            conn = mysql.connector.connect(**self.db_config)
+            cursor = conn.cursor(buffered=False)
+            exported = 0
+            completed = False
+            try:
+                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(['Spel ID', 'Spelers', 'Winnaar', 'Starter', 'Stapel Geschud'])
+                    cursor.execute("SELECT id, spelers, winnaar, starter, stapel_geschud FROM games ORDER BY id")
+                    while True:
+                        rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                        if not rows:
+                            completed = True
+                            break
+                        if cancel.is_set():
+                            break
+                        writer.writerows(
+                            (spel_id, spelers, winnaar or '', starter or '', stapel_geschud)
+                            for spel_id, spelers, winnaar, starter, stapel_geschud in rows
+                        )
+                        exported += len(rows)
+                        loop.call_soon_threadsafe(show_progress, exported)
+            finally:
+                # close() van de verbinding, niet van de cursor: die zou bij
+                # annuleren eerst alle resterende rijen nog binnenhalen
+                conn.close()
+            if not completed:
+                # Gestopt voordat alle rijen binnen waren. Wie pas na het
+                # laatste blok op Annuleer drukt, houdt de volledige export.
+                os.remove(file_path)
+                return None
+            return exported
+
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Spel ID', 'Spelers', 'Winnaar', 'Starter', 'Stapel Geschud'])
-                for spel_id, spelers, winnaar, starter, stapel_geschud in rows:
-                    writer.writerow([
-                        spel_id,
-                        spelers,
-                        winnaar if winnaar else '',
-                        starter if starter else '',
-                        stapel_geschud
-                    ])
-            self.main_window.info_dialog('Succes', f'Spellen succesvol opgeslagen in {file_path}')
+            exported = await loop.run_in_executor(None, export)
         except Exception as e:
             self.main_window.info_dialog('Fout', f'Kon CSV niet opslaan:\n{e}')
+        else:
+            if exported is None:
+                self.main_window.info_dialog('Geannuleerd', 'Export geannuleerd.')
+            else:
+                self.main_window.info_dialog('Succes', f'{exported} spellen succesvol opgeslagen in {file_path}')
+        finally:
+            self.close_window(progress_window)
 
     def on_window_close(self, window):
         if window in self.open_windows:
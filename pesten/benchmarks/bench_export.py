@@ -0,0 +1,101 @@
+"""Vergelijk de oude CSV-export (fetchall) met de streaming export.
+
+Vult een SQLite-bestand met N synthetische spellen en meet per variant de tijd
+en het piekgeheugen (tracemalloc). De streaming export moet een vlak
+geheugenprofiel hebben, onafhankelijk van N. Daarna wordt een incrementele
+export gemeten van --new-games extra spellen (de spellen van een dag).
+
+Gebruik: python benchmarks/bench_export.py [--games 1000000] [--chunk-size 5000] [--new-games 200]
+"""
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.export import EXPORT_HEADER, export_games_csv, export_incremental  # noqa: E402
+
+
+def create_games(conn):
+    conn.execute("""
+        CREATE TABLE games (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            spelers TEXT NOT NULL,
+            winnaar TEXT,
+            starter TEXT,
+            stapel_geschud INTEGER DEFAULT 0
+        )
+    """)
+
+
+def add_games(conn, games, players, rng):
+    def rows():
+        for _ in range(games):
+            spelers = rng.sample(players, rng.randint(2, 6))
+            yield ",".join(spelers), rng.choice(spelers), rng.choice(spelers), rng.randint(0, 1)
+
+    conn.executemany("INSERT INTO games (spelers, winnaar, starter, stapel_geschud) VALUES (?, ?, ?, ?)", rows())
+    conn.commit()
+
+
+def export_fetchall(conn, path):
+    # Zoals export_games_csv in de app het vroeger deed
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, spelers, winnaar, starter, stapel_geschud FROM games ORDER BY id")
+    rows = cursor.fetchall()
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(EXPORT_HEADER)
+        for spel_id, spelers, winnaar, starter, stapel_geschud in rows:
+            writer.writerow([spel_id, spelers, winnaar if winnaar else '', starter if starter else '', stapel_geschud])
+    return len(rows)
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    exported = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {exported} spellen in {elapsed:.1f} s, piekgeheugen {peak / 1024 / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--new-games', type=int, default=200)
+    args = parser.parse_args()
+
+    players = [f"speler{i}" for i in range(args.players)]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'pesten.sqlite3'))
+        rng = random.Random(1)
+        create_games(conn)
+        add_games(conn, args.games, players, rng)
+        path = os.path.join(tmp, 'spellen.csv')
+
+        measure('fetchall', lambda: export_fetchall(conn, path))
+        measure('streaming', lambda: export_games_csv(conn, path, chunk_size=args.chunk_size))
+
+        incremental_path = os.path.join(tmp, 'nachtelijk.csv')
+        export_incremental(conn, incremental_path, chunk_size=args.chunk_size)
+        add_games(conn, args.new_games, players, rng)
+        start = time.perf_counter()
+        exported = export_incremental(conn, incremental_path, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"{'increment':<10} {exported} nieuwe spellen in {elapsed * 1000:.1f} ms")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
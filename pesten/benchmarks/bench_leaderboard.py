@@ -0,0 +1,74 @@
+"""Vergelijk de oude N+1 scorelijst met de geaggregeerde leaderboard-query.
+
+Gebruik: python benchmarks/bench_leaderboard.py [--players 300] [--games 20000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.game_players import backfill_game_players  # noqa: E402
+from pesten.leaderboard import fetch_leaderboard  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.stats import rebuild_player_stats  # noqa: E402
+
+
+def build_database(players, games, seed=1):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    migrate(conn, "sqlite")
+    cursor = conn.cursor()
+    names = [f"speler{i}" for i in range(players)]
+    cursor.executemany("INSERT INTO scores (speler) VALUES (?)", [(n,) for n in names])
+    rows = []
+    for _ in range(games):
+        table = rng.sample(names, rng.randint(2, 6))
+        rows.append((",".join(table), rng.choice(table)))
+    cursor.executemany("INSERT INTO games (spelers, winnaar) VALUES (?, ?)", rows)
+    cursor.execute("UPDATE scores SET wins = (SELECT COUNT(*) FROM games WHERE winnaar = scores.speler)")
+    conn.commit()
+    backfill_game_players(conn, "sqlite")
+    rebuild_player_stats(conn)
+    return conn
+
+
+def n_plus_one(cursor):
+    cursor.execute("SELECT speler, wins FROM scores ORDER BY wins DESC")
+    result = []
+    for speler, wins in cursor.fetchall():
+        cursor.execute("SELECT COUNT(*) FROM games WHERE instr(spelers, ?) > 0", (speler,))
+        result.append((speler, wins, cursor.fetchone()[0]))
+    return result
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--games', type=int, default=20000)
+    args = parser.parse_args()
+
+    conn = build_database(args.players, args.games)
+    cursor = conn.cursor()
+    old = timed(n_plus_one, cursor)
+    new = timed(fetch_leaderboard, cursor)
+    print(f"{args.players} spelers, {args.games} spellen")
+    print(f"N+1 loop:        {old * 1000:9.1f} ms")
+    print(f"Leaderboard:     {new * 1000:9.1f} ms")
+    print(f"Versnelling:     {old / new:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
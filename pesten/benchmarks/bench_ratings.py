@@ -0,0 +1,102 @@
+"""Meet hoe lang het opnieuw berekenen van alle ratings duurt.
+
+Vult een tijdelijk SQLite-bestand met --games afgeronde spellen en hun
+events (via GameGenerator, zonder game_players en player_stats) en meet daarna:
+- read: alleen de doorloop in volgorde van afronden (iter_rated_games);
+- recompute: de volledige recompute_ratings, inclusief wegschrijven;
+- incremental: één afgerond spel opslaan met de rating-update erbij.
+
+Met --budget faalt de benchmark (exitcode 1) als recompute langer duurt dan
+dat aantal seconden.
+
+Gebruik: python benchmarks/bench_ratings.py [--games 1000000] [--players 1000] [--budget 15]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.db import connect_sqlite  # noqa: E402
+from pesten.events import INSERT_EVENT_SQL, game_event_rows  # noqa: E402
+from pesten.generate import GameGenerator, player_names  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.ratings import fetch_ratings, iter_rated_games, recompute_ratings  # noqa: E402
+from pesten.repository import GameRepository  # noqa: E402
+from pesten.session import GameSession  # noqa: E402
+
+
+def fill(conn, players, games, chunk_size=50000):
+    names = player_names(players)
+    conn.executemany("INSERT INTO scores (speler) VALUES (?)", [(name,) for name in names])
+    insert_game = "INSERT INTO games (id, uuid, datum, spelers, starter, stapel_geschud, winnaar) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    rows = []
+    events = []
+    generated = GameGenerator(names, days=10 * 365).games(games)
+    for game_id, (game_uuid, datum, spelers, starter, shuffles, winnaar) in enumerate(generated, start=1):
+        datum = datum.strftime('%Y-%m-%d %H:%M:%S')
+        rows.append((game_id, game_uuid, datum, ",".join(spelers), starter, shuffles, winnaar))
+        events.extend(game_event_rows(game_id, datum, spelers, starter, shuffles, winnaar))
+        if len(rows) >= chunk_size:
+            conn.executemany(insert_game, rows)
+            conn.executemany(INSERT_EVENT_SQL["sqlite"], events)
+            rows, events = [], []
+    conn.executemany(insert_game, rows)
+    conn.executemany(INSERT_EVENT_SQL["sqlite"], events)
+    conn.commit()
+    conn.execute("ANALYZE")
+    return names
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, help='Maximale duur van recompute in seconden')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = connect_sqlite(os.path.join(workdir, 'ratings.sqlite3'))
+        migrate(conn, "sqlite")
+        print(f"{args.games} spellen voor {args.players} spelers aanmaken...")
+        start = time.perf_counter()
+        names = fill(conn, args.players, args.games)
+        print(f"Klaar in {time.perf_counter() - start:.1f} s")
+
+        read = timed(lambda: sum(len(batch) for batch in iter_rated_games(conn, "sqlite")), args.repeat)
+        recompute = timed(lambda: recompute_ratings(conn, "sqlite"), args.repeat)
+        repository = GameRepository(conn, "sqlite")
+        incremental = timed(
+            lambda: repository.record_game(GameSession(names[:4], starter=names[0], winnaar=names[1])), 50,
+        )
+
+        print(f"read        mediaan {statistics.median(read):8.2f} s")
+        print(f"recompute   mediaan {statistics.median(recompute):8.2f} s   "
+              f"({args.games / statistics.median(recompute):,.0f} spellen/s)")
+        print(f"incremental mediaan {statistics.median(incremental) * 1000:8.3f} ms per spel")
+        cursor = conn.cursor()
+        for rank, rating in enumerate(fetch_ratings(cursor, 5), start=1):
+            print(f"{rank:>3}. {rating.speler:<12} {rating.rating:7.0f}  ({rating.games} spellen)")
+        cursor.close()
+        conn.close()
+
+    if args.budget is not None and statistics.median(recompute) > args.budget:
+        print(f"Recompute duurt langer dan {args.budget} s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
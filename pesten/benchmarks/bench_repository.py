@@ -0,0 +1,65 @@
+"""Meet de overhead per aanroep van de repository tegenover losse SQL.
+
+Op een SQLite-database in het geheugen (zodat fsync niet meetelt):
+- adhoc: zoals de app het vroeger deed, per aanroep de placeholders vertalen
+  en een nieuwe cursor, zonder statement-cache (cached_statements=0);
+- repository zonder cache: vaste SQL, maar elke keer opnieuw voorbereid;
+- repository: vaste SQL en de statement-cache van sqlite3.
+
+Gebruik: python benchmarks/bench_repository.py [--calls 20000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.db import sql  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.repository import GameRepository  # noqa: E402
+from pesten.session import GameSession  # noqa: E402
+
+
+def open_database(cached_statements):
+    conn = sqlite3.connect(':memory:', cached_statements=cached_statements)
+    migrate(conn, "sqlite")
+    conn.executemany("INSERT INTO scores (speler) VALUES (?)", [("Anna",), ("Bram",), ("Cor",)])
+    conn.commit()
+    return conn
+
+
+def adhoc_progress(conn, game_id):
+    cursor = conn.cursor()
+    cursor.execute(sql("sqlite", "UPDATE games SET starter = %s WHERE id = %s AND winnaar IS NULL"), ("Anna", game_id))
+    conn.commit()
+    cursor.close()
+
+
+def measure(label, conn, progress, calls):
+    session = GameSession(["Anna", "Bram", "Cor"])
+    session.game_id = GameRepository(conn, "sqlite").record_game(session)
+    session.set_starter("Anna")
+    start = time.perf_counter()
+    for _ in range(calls):
+        progress(conn, session)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed / calls * 1e6:6.1f} µs per aanroep")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    def repository_progress(conn, session):
+        GameRepository(conn, "sqlite").record_progress(session)
+
+    measure('adhoc', open_database(0), lambda conn, session: adhoc_progress(conn, session.game_id), args.calls)
+    measure('repository zonder cache', open_database(0), repository_progress, args.calls)
+    measure('repository', open_database(128), repository_progress, args.calls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Vergelijk de standaard SQLite-instellingen met het afgestemde profiel.
+
+Per variant: latency van losse commits zoals in de spelflow (één
+flush_session per spel), de tijd van de scorelijst (show_scores) en van
+zoekopdrachten op winnaar en datum, die in het profiel een index hebben.
+
+Gebruik: python benchmarks/bench_sqlite.py [--games 100000] [--commits 300]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.db import connect_sqlite  # noqa: E402
+from pesten.leaderboard import fetch_leaderboard  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.session import GameSession, flush_session, write_games  # noqa: E402
+
+
+def random_session(rng, players):
+    session = GameSession(rng.sample(players, rng.randint(2, 6)))
+    session.set_starter(rng.choice(session.spelers))
+    session.set_winner(rng.choice(session.spelers))
+    return session
+
+
+def open_database(path, tuned, players, games):
+    if tuned:
+        conn = connect_sqlite(path)
+        migrate(conn, "sqlite")
+    else:
+        conn = sqlite3.connect(path)
+        migrate(conn, "sqlite")
+        for name in ("idx_games_in_progress", "idx_games_starter", "idx_games_datum"):
+            conn.execute(f"DROP INDEX {name}")
+    conn.executemany("INSERT INTO scores (speler) VALUES (?)", [(name,) for name in players])
+    rng = random.Random(1)
+    cursor = conn.cursor()
+    write_games(cursor, "sqlite", [random_session(rng, players) for _ in range(games)])
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def run(label, conn, players, commits):
+    rng = random.Random(2)
+    commit_times = timed(lambda: flush_session(conn, "sqlite", random_session(rng, players)), commits)
+    scores = timed(lambda: fetch_leaderboard(conn.cursor()), 20)
+    by_winner = timed(lambda: conn.execute("SELECT COUNT(*) FROM games WHERE winnaar = ?", (rng.choice(players),)).fetchone(), 20)
+    recent = timed(lambda: conn.execute("SELECT COUNT(*) FROM games WHERE datum >= datetime('now', '-1 day')").fetchone(), 20)
+    p95 = sorted(commit_times)[int(len(commit_times) * 0.95)]
+    print(f"{label:<10} commit {statistics.mean(commit_times):6.2f} ms (p95 {p95:6.2f})  "
+          f"scores {statistics.mean(scores):6.2f} ms  winnaar {statistics.mean(by_winner):6.2f} ms  "
+          f"vandaag {statistics.mean(recent):6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--commits', type=int, default=300)
+    args = parser.parse_args()
+
+    players = [f"speler{i}" for i in range(args.players)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in [('standaard', False), ('profiel', True)]:
+            conn = open_database(os.path.join(tmp, f'{label}.sqlite3'), tuned, players, args.games)
+            run(label, conn, players, args.commits)
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Meet de doorvoer van het synchroniseren van offline gespeelde spellen.
+
+Zet N spellen in de outbox van een lokale SQLite en synchroniseert ze naar een
+tweede SQLite-bestand als stand-in voor de MySQL-server.
+
+Gebruik: python benchmarks/bench_sync.py [--games 100000] [--batch-size 500]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.migrations import migrate  # noqa: E402
+from pesten.session import GameSession  # noqa: E402
+from pesten.sync import sync_outbox  # noqa: E402
+
+
+def open_database(path, players):
+    conn = sqlite3.connect(path)
+    migrate(conn, "sqlite")
+    conn.executemany("INSERT INTO scores (speler) VALUES (?)", [(name,) for name in players])
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    players = [f"speler{i}" for i in range(args.players)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local = open_database(os.path.join(tmp, 'lokaal.sqlite3'), players)
+        remote = open_database(os.path.join(tmp, 'server.sqlite3'), players)
+
+        # Outbox in één keer vullen; gemeten wordt alleen de sync zelf
+        queue = []
+        for _ in range(args.games):
+            session = GameSession(rng.sample(players, rng.randint(2, 6)))
+            session.set_starter(rng.choice(session.spelers))
+            session.set_winner(rng.choice(session.spelers))
+            queue.append((session.uuid, json.dumps(session.to_dict())))
+        local.executemany("INSERT INTO outbox (uuid, payload) VALUES (?, ?)", queue)
+        local.commit()
+
+        start = time.perf_counter()
+        synced = sync_outbox(local, remote, "sqlite", batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        print(f"{synced} spellen gesynchroniseerd in {elapsed:.1f} s ({synced / elapsed:,.0f} spellen/s, batch {args.batch_size})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Benchmarksuite voor de datapaden van de app, met een JSON-rapport.
+
+Meet op een gegenereerde clubgeschiedenis (zie python -m pesten.generate):
+- show_scores_cold: scorelijst uit de database (lege StatsCache);
+- show_scores_warm: herhaalde weergave, alleen de versiecontrole;
+- players: alle spelers (GameRepository.players);
+- player_page: eerste pagina van de spelerskiezer, zonder cache;
+- player_search: zoeken op een voorvoegsel in de spelerskiezer;
+- player_stats: statistieken van één speler;
+- export_csv: volledige CSV-export;
+- replay_stats: statistieken uit game_events, vanaf het laatste snapshot;
+- record_game: één afgerond spel opslaan (incl. commit).
+
+Elke meting wordt --repeat keer herhaald; het rapport bevat min, mediaan,
+p95 en max in milliseconden plus de omgeving (Python, SQLite, commit) en de
+grootte van de dataset. Met --compare wordt een eerder rapport ernaast
+gezet; een meting die meer dan --threshold trager is telt als regressie
+(exitcode 1). Standaard wordt het minimum vergeleken: dat is bij korte
+metingen het minst gevoelig voor ruis van andere processen. Verschillen
+kleiner dan --min-delta-ms tellen niet mee.
+
+Standaard wordt een tijdelijk SQLite-bestand gevuld. Met --database
+sqlite:PAD of mysql:CONFIG.json (bijvoorbeeld een lokale MariaDB) wordt
+die database gebruikt en alleen gevuld als er nog geen spellen in staan.
+
+Gebruik: python benchmarks/suite.py [--players 1000] [--games 100000] [--repeat 20]
+                                    [--database sqlite:PAD] [--output rapport.json]
+                                    [--compare vorig.json] [--threshold 0.2] [--metric min_ms]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pesten.cache import StatsCache  # noqa: E402
+from pesten.db import connect_spec  # noqa: E402
+from pesten.events import replay_stats  # noqa: E402
+from pesten.export import count_games, export_games_csv  # noqa: E402
+from pesten.generate import generate, player_names  # noqa: E402
+from pesten.migrations import migrate  # noqa: E402
+from pesten.players import PlayerDirectory  # noqa: E402
+from pesten.repository import GameRepository  # noqa: E402
+from pesten.session import GameSession  # noqa: E402
+
+REPORT_VERSION = 1
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(conn, db_type, repeat, export_repeat, workdir):
+    names = player_names(3)
+    results = {}
+
+    def show_scores_cold():
+        StatsCache().leaderboard(conn, db_type)
+
+    warm_cache = StatsCache()
+    results['show_scores_cold'] = measure(show_scores_cold, repeat)
+    results['show_scores_warm'] = measure(lambda: warm_cache.leaderboard(conn, db_type), repeat)
+    results['players'] = measure(lambda: GameRepository(conn, db_type).players(), repeat)
+    results['player_page'] = measure(lambda: PlayerDirectory().page(conn, db_type), repeat)
+    results['player_search'] = measure(lambda: PlayerDirectory().page(conn, db_type, names[1][:2]), repeat)
+    results['player_stats'] = measure(lambda: StatsCache().player_stats(conn, db_type, names[0]), repeat)
+
+    export_path = os.path.join(workdir, 'suite-export.csv')
+    results['export_csv'] = measure(lambda: export_games_csv(conn, export_path), export_repeat, warmup=0)
+    os.remove(export_path)
+    results['replay_stats'] = measure(lambda: replay_stats(conn, db_type), export_repeat)
+
+    # Als laatste: voegt spellen toe aan de database
+    repository = GameRepository(conn, db_type)
+    results['record_game'] = measure(lambda: repository.record_game(GameSession(names, starter=names[0], winnaar=names[1])), repeat)
+    return results
+
+
+def compare(report, baseline, threshold, metric='min_ms', min_delta_ms=0.05):
+    """Druk de verschillen met baseline af en geef de namen van regressies terug."""
+    regressions = []
+    print(f"\n{'meting':<18} {'vorige':>10} {'nu':>10} {'verschil':>9}  ({metric})")
+    for name, result in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"{name:<18} {'-':>10} {result[metric]:>10.3f}")
+            continue
+        change = (result[metric] - previous[metric]) / previous[metric] if previous[metric] else 0.0
+        slower = change > threshold and result[metric] - previous[metric] >= min_delta_ms
+        if slower:
+            regressions.append(name)
+        print(f"{name:<18} {previous[metric]:>10.3f} {result[metric]:>10.3f} {change:>+8.0%}{'  REGRESSIE' if slower else ''}")
+    if baseline.get('dataset') != report['dataset']:
+        print("Let op: de datasets verschillen, de cijfers zijn niet direct vergelijkbaar.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--export-repeat', type=int, default=3)
+    parser.add_argument('--database', help='sqlite:PAD of mysql:CONFIG.json (standaard: tijdelijk SQLite-bestand)')
+    parser.add_argument('--output', default='benchmark-report.json')
+    parser.add_argument('--compare', metavar='RAPPORT', help='Eerder rapport om mee te vergelijken')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Toegestane vertraging (standaard: 0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help='Kleinere verschillen zijn ruis (standaard: 0.05 ms)')
+    parser.add_argument('--metric', choices=['min_ms', 'median_ms', 'p95_ms'], default='min_ms', help='Welke waarde vergeleken wordt')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn, db_type = connect_spec(args.database or f"sqlite:{os.path.join(workdir, 'suite.sqlite3')}")
+        try:
+            migrate(conn, db_type)
+            if count_games(conn) == 0:
+                print(f"Dataset genereren: {args.players} spelers, {args.games} spellen...")
+                start = time.perf_counter()
+                generate(conn, db_type, args.players, args.games, seed=args.seed)
+                print(f"Klaar in {time.perf_counter() - start:.1f} s")
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM scores")
+            players = cursor.fetchone()[0]
+            cursor.close()
+            dataset = {'backend': db_type, 'players': players, 'games': count_games(conn)}
+            results = run_suite(conn, db_type, args.repeat, args.export_repeat, workdir)
+        finally:
+            conn.close()
+
+    report = {
+        'report_version': REPORT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'commit': git_commit(),
+        },
+        'dataset': dataset,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        print(f"{name:<18} mediaan {result['median_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms")
+    print(f"Rapport geschreven naar {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold, args.metric, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,11 @@
+import asyncio
 import os
 import json
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
@@ -7,40 +13,145 @@ import pymysql
 import sqlite3
 from pymysql import MySQLError
 
+from pesten.cache import StatsCache
+from pesten.db import SQLITE_KEYS, connect_sqlite, sqlite_profile
+from pesten.executor import DatabaseExecutor
+from pesten.export import ExportCancelled, count_games, export_games_csv
+from pesten.instrument import instrument, stats_from_environment
+from pesten.leaderboard import LeaderboardModel
+from pesten.migrations import migrate
+from pesten.players import PlayerDirectory
+from pesten.pool import POOL_KEYS, create_pool
+from pesten.profiling import profiler_from_environment
+from pesten.repository import GameRepository
+from pesten.session import IN_PROGRESS_MAX_AGE, SessionJournal, SessionManager
+from pesten.sync import mirror_players, pending_count, record_offline, sync_outbox
+
+logger = logging.getLogger('pesten.app')
+
+# Fouten van de database zelf (verbinding weg, lock, ...): daar vangt het
+# journaal het spel op. Alle andere fouten zijn bugs en worden gelogd.
+DB_ERRORS = (MySQLError, sqlite3.Error)
+
 CONFIG_FILENAME = "db_config.json"
+SQL_STATS_FILENAME = "sql-stats.json"
+SYNC_INTERVAL = 30  # seconden tussen verbindingspogingen in offline modus
+PLAYER_SEARCH_DELAY = 0.15  # seconden na de laatste toetsaanslag voordat er gezocht wordt
+
+# Handlers die met PESTEN_PROFILE_UI=1 gemeten worden (on_press en de schermen die ze bouwen)
+PROFILED_HANDLERS = (
+    'show_db_choice_screen', 'show_mysql_config_screen', 'on_mysql_config_submit', 'select_sqlite',
+    'show_main_screen', 'show_new_game_screen', 'confirm_players', 'show_starter_selection',
+    'set_starter', 'show_winner_selection', 'shuffle_deck', 'set_winner', 'show_scores',
+    'export_games_csv', 'show_player_stats', 'show_games_screen', 'switch_game',
+)
+
+
+class LeaderboardTable:
+    """Koppelt een LeaderboardModel aan een toga.Table: per melding één rij bijwerken."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @staticmethod
+    def _data(row):
+        return {'speler': row.speler, 'wins': row.wins, 'gespeeld': row.games_played, 'percentage': f"{row.percentage:.1f}%"}
+
+    def reset(self, rows):
+        self.table.data = [self._data(row) for row in rows]
+
+    def insert(self, index, row):
+        self.table.data.insert(index, self._data(row))
+
+    def remove(self, index):
+        self.table.data.remove(self.table.data[index])
+
+    def change(self, index, row):
+        target = self.table.data[index]
+        for name, value in self._data(row).items():
+            if getattr(target, name) != value:
+                setattr(target, name, value)
+
 
 class PestenApp(toga.App):
     def __init__(self):
         super().__init__('Pesten Tracker', 'org.example.pesten')
-        self.conn = None
-        self.cursor = None
-        self.current_game_id = None
+        self.conn = None  # lokale SQLite; MySQL loopt via self.pool
+        self.pool = None
+        self.offline = False
+        self.sync_label = None
+        self.main_box = None  # hoofdscherm, één keer gebouwd door show_main_screen
+        self.games = SessionManager()  # alle lopende spellen, één ervan actief
+        self.journal = None
         self.selected_players = []
-        self.checkboxes = []
+        self.page_players = []
+        self.player_search = ''
+        self.player_page = 0
+        self.player_table = None
+        self.player_directory = PlayerDirectory()
+        self.leaderboard = LeaderboardModel()
+        self.leaderboard_version = None  # dataversie waarop self.leaderboard gebaseerd is
+        self.stats_cache = StatsCache()
         self.db_type = None  # "mysql" of "sqlite"
         self.app_dir = None
         self.config_path = None
         self.db_config = {}
+        self.db = DatabaseExecutor()
+        # Alleen met PESTEN_SQL_STATS=1 worden queries gemeten; anders None en
+        # gebruikt de app de verbindingen van de driver rechtstreeks
+        self.sql_stats = stats_from_environment()
 
     def startup(self):
         self.main_window = toga.MainWindow(title=self.formal_name)
         self.app_dir = self.paths.app
         os.makedirs(self.app_dir, exist_ok=True)
         self.config_path = os.path.join(self.app_dir, CONFIG_FILENAME)
+        self.journal = SessionJournal(os.path.join(self.app_dir, 'journal'))
+        self.profiler = profiler_from_environment(self.app_dir)
+        if self.profiler is not None:
+            self.db.timer = self.profiler.add_db_time
+            self.profiler.wrap_methods(self, PROFILED_HANDLERS)
+        if self.sql_stats is not None:
+            debug_group = toga.Group('Debug')
+            self.commands.add(
+                toga.Command(self.show_sql_stats, text='SQL-statistieken', group=debug_group),
+                toga.Command(self.reset_sql_stats, text='SQL-statistieken wissen', group=debug_group),
+            )
 
         if self.load_db_config():
-            if self.try_connect_mysql():
-                self.db_type = "mysql"
-                self.ensure_columns()
-                self.show_main_screen()
-                self.main_window.show()
-                return
-            else:
-                self.main_window.info_dialog('Database Fout', 'Kon niet verbinden met opgeslagen MySQL-config.')
-
-        self.show_db_choice_screen()
+            # Verbinden gebeurt niet op de UI-thread: het venster staat er meteen
+            self.main_window.content = toga.Box(
+                children=[toga.Label('Verbinden met de database...', style=Pack(padding=10))],
+                style=Pack(direction=COLUMN, padding=20),
+            )
+            self.loop.create_task(self.connect_saved_config())
+        else:
+            self.show_db_choice_screen()
         self.main_window.show()
 
+    async def connect_saved_config(self):
+        """Verbind met de opgeslagen MySQL-config, of speel lokaal verder als de server onbereikbaar is."""
+        if await self.try_connect_mysql():
+            self.db_type = "mysql"
+            self.show_main_screen()
+            await self.replay_journal()
+            await self.sync_now()
+            return
+
+        # Server onbereikbaar: lokaal verder spelen en later synchroniseren
+        try:
+            self.offline = True
+            self.db_type = "sqlite"
+            await self.run_db(self._open_sqlite)
+        except sqlite3.Error:
+            self.offline = False
+            self.main_window.info_dialog('Database Fout', 'Kon niet verbinden met opgeslagen MySQL-config.')
+            self.show_db_choice_screen()
+            return
+        self.show_main_screen()
+        self.loop.create_task(self.sync_loop())
+        await self.replay_journal()
+
     def load_db_config(self):
         if os.path.exists(self.config_path):
             try:
@@ -58,30 +169,48 @@ class PestenApp(toga.App):
         except Exception as e:
             self.main_window.info_dialog('Fout bij opslaan', f'Kon databaseconfig niet opslaan:\n{e}')
 
-    def try_connect_mysql(self):
+    def connect_mysql(self):
+        """Eén korte verbindingspoging (zie ConnectionPool.probe) plus migraties.
+
+        Geeft de pool terug, of None als de server onbereikbaar is.
+        """
+        pool = create_pool(self.db_config, pymysql, wrap=self.instrument)
         try:
-            self.conn = pymysql.connect(**self.db_config)
-            self.cursor = self.conn.cursor()
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS scores (
-                    speler VARCHAR(255) PRIMARY KEY,
-                    wins INT DEFAULT 0
-                )
-            """)
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS games (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    spelers TEXT NOT NULL,
-                    winnaar VARCHAR(255)
-                )
-            """)
-            self.conn.commit()
-            return True
+            pool.probe()
+            with pool.connection() as conn:
+                migrate(conn, "mysql")
         except MySQLError:
-            self.conn = None
-            self.cursor = None
+            pool.close_all()
+            return None
+        return pool
+
+    async def try_connect_mysql(self, widget=None):
+        """Test de server op een eigen thread en zet self.pool alleen als dat lukt.
+
+        De database-thread blijft zo vrij voor de lokale SQLite-database,
+        ook als de server in offline modus elke SYNC_INTERVAL getest wordt.
+        """
+        pool = await self.run_db(self.connect_mysql, widget=widget, parallel=True)
+        if pool is None:
             return False
+        self.pool = pool
+        return True
+
+    @contextmanager
+    def connection(self):
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            yield self.conn
+
+    @contextmanager
+    def repository(self):
+        with self.connection() as conn:
+            yield GameRepository(conn, self.db_type)
+
+    def is_connected(self):
+        return self.pool is not None or self.conn is not None
 
     def show_db_choice_screen(self, widget=None):
         label = toga.Label("Kies database:", style=Pack(padding=10))
@@ -121,7 +250,7 @@ class PestenApp(toga.App):
 
         self.main_window.content = toga.Box(children=[inputs_box, buttons], style=Pack(direction=COLUMN, padding=10))
 
-    def on_mysql_config_submit(self, widget):
+    async def on_mysql_config_submit(self, widget):
         host = self.host_input.value.strip()
         port_str = self.port_input.value.strip()
         user = self.user_input.value.strip()
@@ -138,6 +267,8 @@ class PestenApp(toga.App):
             self.main_window.info_dialog('Fout', 'Poort moet een getal zijn.')
             return
 
+        # Pool-, timeout- en SQLite-instellingen uit db_config.json blijven behouden
+        pool_settings = {key: self.db_config[key] for key in POOL_KEYS + SQLITE_KEYS if key in self.db_config}
         self.db_config = {
             'host': host,
             'port': port,
@@ -145,188 +276,599 @@ class PestenApp(toga.App):
             'password': password,
             'database': database
         }
+        self.db_config.update(pool_settings)
 
-        if not self.try_connect_mysql():
+        if not await self.try_connect_mysql(widget=widget):
             self.main_window.info_dialog('Database Fout', 'Kon niet verbinden met MySQL met opgegeven gegevens.')
             return
 
         self.save_db_config()
         self.db_type = "mysql"
-        self.ensure_columns()
+        self.offline = False
         self.show_main_screen()
+        await self.replay_journal()
+        await self.sync_now()
 
-    def select_sqlite(self, widget=None):
+    async def select_sqlite(self, widget=None):
         self.db_type = "sqlite"
         try:
-            self.conn = sqlite3.connect(os.path.join(self.app_dir, 'pesten.sqlite3'))
-            self.cursor = self.conn.cursor()
-            self._setup_sqlite()
-            self.ensure_columns()
+            await self.run_db(self._open_sqlite, widget=widget)
         except sqlite3.Error as err:
             self.conn = None
-            self.cursor = None
             self.main_window.info_dialog('Database Fout', f'Kon niet verbinden met SQLite:\n{err}')
             return
         self.show_main_screen()
+        await self.replay_journal()
 
-    def _setup_sqlite(self):
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS scores (
-            speler TEXT PRIMARY KEY,
-            wins INTEGER DEFAULT 0
-        )
-        """)
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS games (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            spelers TEXT NOT NULL,
-            winnaar TEXT
-        )
-        """)
-        self.conn.commit()
+    def _open_sqlite(self):
+        # De verbinding wordt alleen vanaf de database-thread gebruikt
+        self.conn = self.instrument(connect_sqlite(self.sqlite_path(), check_same_thread=False, **sqlite_profile(self.db_config)))
+        migrate(self.conn, "sqlite")
+
+    def sqlite_path(self):
+        return os.path.join(self.app_dir, 'pesten.sqlite3')
+
+    async def run_db(self, fn, *args, widget=None, parallel=False):
+        """Voer fn uit op de database-thread en toon zolang een bezig-status.
 
-    def ensure_columns(self):
+        Met parallel op een eigen thread, voor werk dat de gedeelde verbindingen niet gebruikt.
+        """
+        self.main_window.title = f"{self.formal_name} - bezig..."
+        if widget is not None:
+            widget.enabled = False
         try:
-            if self.db_type == "sqlite":
-                self.cursor.execute("PRAGMA table_info(games)")
-                columns = [row[1] for row in self.cursor.fetchall()]
-                if "starter" not in columns:
-                    self.cursor.execute("ALTER TABLE games ADD COLUMN starter TEXT")
-                if "stapel_geschud" not in columns:
-                    self.cursor.execute("ALTER TABLE games ADD COLUMN stapel_geschud INTEGER DEFAULT 0")
-            else:
-                self.cursor.execute("SHOW COLUMNS FROM games LIKE 'starter'")
-                if not self.cursor.fetchone():
-                    self.cursor.execute("ALTER TABLE games ADD COLUMN starter VARCHAR(255)")
-                self.cursor.execute("SHOW COLUMNS FROM games LIKE 'stapel_geschud'")
-                if not self.cursor.fetchone():
-                    self.cursor.execute("ALTER TABLE games ADD COLUMN stapel_geschud TINYINT(1) DEFAULT 0")
-            self.conn.commit()
-        except Exception as e:
-            self.main_window.info_dialog('Database Fout', f'Kon kolommen niet controleren/toevoegen:\n{e}')
+            if parallel:
+                return await self.db.run_parallel(fn, *args)
+            return await self.db.run(fn, *args)
+        finally:
+            self.main_window.title = self.formal_name
+            if widget is not None:
+                widget.enabled = True
 
     def show_main_screen(self, widget=None):
+        # Het scherm en de scorestabel worden één keer gebouwd en daarna
+        # hergebruikt: na een spel werkt alleen apply_game de gewijzigde rijen bij
+        if self.main_box is None:
+            self._build_main_screen()
+        self._show_games_button()
+        self.main_window.content = self.main_box
+        if self.leaderboard.loaded:
+            self.show_scores_status()
+        # show_scores laadt alleen opnieuw als de dataversie veranderd is
+        self.loop.create_task(self.show_scores())
+        self.loop.create_task(self.update_sync_status())
+
+    def _build_main_screen(self):
         show_scores_button = toga.Button('Toon scores', on_press=self.show_scores, style=Pack(padding=5))
         new_game_button = toga.Button('Nieuw spel', on_press=self.show_new_game_screen, style=Pack(padding=5))
-        self.scores_label = toga.Label('Scores komen hier...', style=Pack(padding=10))
-        button_box = toga.Box(children=[show_scores_button, new_game_button], style=Pack(direction=ROW, padding=5))
-        main_box = toga.Box(children=[button_box, self.scores_label], style=Pack(direction=COLUMN, padding=10))
-        self.main_window.content = main_box
-        self.show_scores(None)
-
-    def show_new_game_screen(self, widget=None):
-        if not self.cursor:
+        export_csv_button = toga.Button('Exporteer spellen (CSV)', on_press=self.export_games_csv, style=Pack(padding=5))
+        self.games_button = toga.Button('', on_press=self.show_games_screen, style=Pack(padding=5))
+        self.scores_label = toga.Label('', style=Pack(padding=10))
+        self.sync_label = toga.Label('', style=Pack(padding=(0, 10)))
+        self.scores_table = toga.Table(
+            headings=['Speler', 'Wins', 'Gespeeld', 'Winst %'],
+            accessors=['speler', 'wins', 'gespeeld', 'percentage'],
+            on_select=self.show_player_stats,
+            style=Pack(flex=1, padding=10),
+        )
+        self.button_box = toga.Box(children=[show_scores_button, new_game_button, export_csv_button], style=Pack(direction=ROW, padding=5))
+        self.main_box = toga.Box(
+            children=[self.button_box, self.sync_label, self.scores_label, self.scores_table],
+            style=Pack(direction=COLUMN, padding=10),
+        )
+        # De tabel volgt het model zolang de app draait, ook als een ander scherm zichtbaar is
+        listener = LeaderboardTable(self.scores_table)
+        self.leaderboard.listeners = [listener]
+        if self.leaderboard.loaded:
+            listener.reset(self.leaderboard.rows)
+
+    def _show_games_button(self):
+        shown = self.games_button in self.button_box.children
+        if self.games:
+            self.games_button.text = f'Lopende spellen ({len(self.games)})'
+            if not shown:
+                self.button_box.add(self.games_button)
+        elif shown:
+            self.button_box.remove(self.games_button)
+
+    async def show_new_game_screen(self, widget=None):
+        if not self.is_connected():
             self.main_window.info_dialog('Database Fout', 'Geen verbinding met database.')
             return
 
-        self.cursor.execute("SELECT speler FROM scores")
-        spelers = [row[0] for row in self.cursor.fetchall()]
+        self.selected_players = []
+        self.player_search = ''
+        self.player_page = 0
+        spelers, has_more = await self.run_db(self._fetch_player_page, '', 0, widget=widget)
 
         if not spelers:
             self.main_window.info_dialog('Geen spelers', 'Voeg eerst spelers toe in de database.')
             return
 
-        select_box = toga.Box(style=Pack(direction=COLUMN, padding=10))
-        self.checkboxes = []
-        for speler in spelers:
-            cb = toga.Switch(text=speler, value=False)
-            self.checkboxes.append(cb)
-            select_box.add(cb)
+        # Eén tabel met alleen de zichtbare pagina, in plaats van een Switch per speler
+        search_input = toga.TextInput(placeholder='Zoek speler...', on_change=self.on_player_search, style=Pack(padding=5))
+        self.player_table = toga.Table(
+            headings=['Gekozen', 'Speler'],
+            accessors=['gekozen', 'speler'],
+            on_select=self.toggle_player,
+            style=Pack(flex=1, padding=5),
+        )
+        self.selected_label = toga.Label('Nog niemand gekozen', style=Pack(padding=5))
+        self.previous_page_button = toga.Button('Vorige', on_press=self.previous_player_page, style=Pack(padding=5))
+        self.next_page_button = toga.Button('Volgende', on_press=self.next_player_page, style=Pack(padding=5))
+        paging_row = toga.Box(children=[self.previous_page_button, self.next_page_button], style=Pack(direction=ROW))
 
         button_row = toga.Box(style=Pack(direction=ROW, padding=5))
         confirm_button = toga.Button('Bevestig spelers', on_press=self.confirm_players, style=Pack(padding=5))
         cancel_button = toga.Button('Annuleer', on_press=self.show_main_screen, style=Pack(padding=5))
         button_row.add(confirm_button)
         button_row.add(cancel_button)
-        select_box.add(button_row)
-        self.main_window.content = select_box
+
+        self.main_window.content = toga.Box(
+            children=[search_input, self.player_table, paging_row, self.selected_label, button_row],
+            style=Pack(direction=COLUMN, padding=10),
+        )
+        self.show_player_page(spelers, has_more)
+
+    def _fetch_player_page(self, prefix, page):
+        with self.connection() as conn:
+            return self.player_directory.page(conn, self.db_type, prefix, page)
+
+    def show_player_page(self, spelers, has_more):
+        self.page_players = spelers
+        self.player_table.data = [
+            {'gekozen': '✓' if speler in self.selected_players else '', 'speler': speler}
+            for speler in spelers
+        ]
+        self.previous_page_button.enabled = self.player_page > 0
+        self.next_page_button.enabled = has_more
+
+    async def load_player_page(self):
+        search, page = self.player_search, self.player_page
+        spelers, has_more = await self.run_db(self._fetch_player_page, search, page)
+        # Intussen verder getypt: dit resultaat is niet meer nodig
+        if (search, page) == (self.player_search, self.player_page):
+            self.show_player_page(spelers, has_more)
+
+    async def on_player_search(self, widget):
+        self.player_search = widget.value
+        self.player_page = 0
+        await asyncio.sleep(PLAYER_SEARCH_DELAY)
+        if widget.value == self.player_search:
+            await self.load_player_page()
+
+    async def previous_player_page(self, widget):
+        self.player_page = max(self.player_page - 1, 0)
+        await self.load_player_page()
+
+    async def next_player_page(self, widget):
+        self.player_page += 1
+        await self.load_player_page()
+
+    def toggle_player(self, widget, **kwargs):
+        row = widget.selection
+        if row is None:
+            return
+        speler = row.speler
+        if speler in self.selected_players:
+            self.selected_players.remove(speler)
+        else:
+            self.selected_players.append(speler)
+        self.selected_label.text = 'Gekozen: ' + ', '.join(self.selected_players) if self.selected_players else 'Nog niemand gekozen'
+        # Opnieuw vullen wist de selectie, zodat dezelfde rij nog eens aangetikt kan worden
+        self.show_player_page(self.page_players, self.next_page_button.enabled)
 
     def confirm_players(self, widget):
-        self.selected_players = [cb.text for cb in self.checkboxes if cb.value]
-        if not self.selected_players:
+        selected_players = list(self.selected_players)
+        if not selected_players:
             self.main_window.info_dialog('Geen selectie', 'Selecteer minstens één speler.')
             return
 
-        spelers_str = ",".join(self.selected_players)
-        if self.db_type == "sqlite":
-            self.cursor.execute("INSERT INTO games (spelers) VALUES (?)", (spelers_str,))
+        # Het spel loopt lokaal (met journaal) en staat als lopend spel in de
+        # database, zodat het na een herstart van de app terug te halen is
+        session = self.games.start(selected_players)
+        self.journal.save(session)
+        if not self.offline:
+            self.loop.create_task(self.register_game(session))
+        self.show_starter_selection()
+
+    async def run_in_background(self, fn, *args):
+        """Schrijf op de database-thread zonder de UI te blokkeren; databasefouten zijn niet fataal.
+
+        Het journaal houdt het spel vast; wat hier door een databasefout
+        mislukt wordt bij het afronden alsnog in één keer opgeslagen. Andere
+        fouten worden gelogd.
+        """
+        try:
+            await self.db.run(fn, *args)
+        except DB_ERRORS:
+            pass
+        except Exception:
+            logger.exception("Opslaan op de achtergrond mislukt: %s", getattr(fn, '__name__', fn))
+
+    async def register_game(self, session):
+        try:
+            await self.db.run(self._register_game, session)
+        except DB_ERRORS:
+            return
+        except Exception:
+            logger.exception("Lopend spel %s registreren mislukt", session.uuid)
+            return
+        # Journaal alleen vanaf de UI-thread schrijven, en niet meer als het spel al klaar is
+        if session.uuid in self.games and not session.is_finished:
+            self.journal.save(session)
+
+    def _register_game(self, session):
+        # game_id hier zetten: _save_starter draait direct hierna op deze thread
+        with self.repository() as repository:
+            session.game_id = repository.record_game(session)
+
+    def _save_starter(self, session):
+        # Staat na _register_game in de wachtrij van de database-thread
+        if session.game_id is not None and not session.is_finished and not self.offline:
+            with self.repository() as repository:
+                repository.record_progress(session)
+
+    def show_games_screen(self, widget=None):
+        """Alle lopende spellen, om te wisselen tussen tafels."""
+        box = toga.Box(style=Pack(direction=COLUMN, padding=10))
+        box.add(toga.Label('Lopende spellen' if self.games else 'Geen lopende spellen', style=Pack(padding=5)))
+        for session in self.games:
+            gestart = session.started_at[11:16]
+            begint = f" - begint: {session.starter}" if session.starter else ''
+            box.add(toga.Button(
+                f"{', '.join(session.spelers)} ({gestart}){begint}",
+                on_press=functools.partial(self.switch_game, game_uuid=session.uuid),
+                style=Pack(padding=5),
+            ))
+        box.add(toga.Button('Nieuw spel', on_press=self.show_new_game_screen, style=Pack(padding=5)))
+        box.add(toga.Button('Terug naar scores', on_press=self.show_main_screen, style=Pack(padding=5)))
+        self.main_window.content = box
+
+    def switch_game(self, widget, game_uuid):
+        session = self.games.switch(game_uuid)
+        if session.starter is None:
+            self.show_starter_selection()
         else:
-            self.cursor.execute("INSERT INTO games (spelers) VALUES (%s)", (spelers_str,))
-        self.conn.commit()
-        self.current_game_id = self.cursor.lastrowid
+            self.show_winner_selection()
 
+    def show_starter_selection(self):
         # Vraag wie begint
         begin_box = toga.Box(style=Pack(direction=COLUMN, padding=10))
-        for speler in self.selected_players:
-            begin_box.add(toga.Button(speler, on_press=lambda w, s=speler: self.set_starter(s), style=Pack(padding=5)))
+        for speler in self.games.active.spelers:
+            begin_box.add(toga.Button(speler, on_press=functools.partial(self.set_starter, starter=speler), style=Pack(padding=5)))
+        begin_box.add(toga.Button('Ander spel', on_press=self.show_games_screen, style=Pack(padding=5)))
         self.main_window.content = begin_box
 
-    def set_starter(self, starter):
-        if self.db_type == "sqlite":
-            self.cursor.execute("UPDATE games SET starter = ? WHERE id = ?", (starter, self.current_game_id))
-        else:
-            self.cursor.execute("UPDATE games SET starter = %s WHERE id = %s", (starter, self.current_game_id))
-        self.conn.commit()
+    def set_starter(self, widget, starter):
+        session = self.games.active
+        session.set_starter(starter)
+        self.journal.save(session)
+        self.loop.create_task(self.run_in_background(self._save_starter, session))
         self.show_winner_selection()
 
     def show_winner_selection(self):
         knop_box = toga.Box(style=Pack(direction=COLUMN, padding=10))
-        for speler in self.selected_players:
-            knop_box.add(toga.Button(speler, on_press=lambda w, s=speler: self.set_winner(s), style=Pack(padding=5)))
+        for speler in self.games.active.spelers:
+            knop_box.add(toga.Button(speler, on_press=functools.partial(self.set_winner, speler=speler), style=Pack(padding=5)))
         knop_box.add(toga.Button("Stapel geschud", on_press=self.shuffle_deck, style=Pack(padding=5)))
+        knop_box.add(toga.Button('Ander spel', on_press=self.show_games_screen, style=Pack(padding=5)))
         back_button = toga.Button('Terug naar scores', on_press=self.show_main_screen, style=Pack(padding=5))
         knop_box.add(back_button)
         self.main_window.content = knop_box
 
     def shuffle_deck(self, widget):
-        if self.db_type == "sqlite":
-            self.cursor.execute("UPDATE games SET stapel_geschud = staped_geschud + 1 WHERE id = ?", (self.current_game_id,))
-        else:
-            self.cursor.execute("UPDATE games SET stapel_geschud = stapel_geschud + 1 WHERE id = %s", (self.current_game_id,))
-        self.conn.commit()
+        session = self.games.active
+        session.shuffle()
+        self.journal.save(session)
         self.main_window.info_dialog("Actie", "De stapel is gemarkeerd als geschud!")
 
-    def set_winner(self, speler):
-        if self.db_type == "sqlite":
-            self.cursor.execute("UPDATE scores SET wins = wins + 1 WHERE speler = ?", (speler,))
-            self.cursor.execute("UPDATE games SET winnaar = ? WHERE id = ?", (speler, self.current_game_id))
+    async def set_winner(self, widget, speler):
+        session = self.games.active
+        if session is None or session.is_finished:
+            # Dubbele tik: het resultaat van dit spel wordt al opgeslagen
+            return
+        session.set_winner(speler)
+        self.journal.save(session)
+        try:
+            version = await self.run_db(self._flush_session, session, widget=widget)
+        except MySQLError:
+            # Server weggevallen: spel lokaal opslaan en later synchroniseren
+            await self.go_offline()
+            try:
+                await self.run_db(self._flush_session, session, widget=widget)
+            except Exception as e:
+                self.show_flush_error(e)
+        except Exception as e:
+            self.show_flush_error(e)
         else:
-            self.cursor.execute("UPDATE scores SET wins = wins + 1 WHERE speler = %s", (speler,))
-            self.cursor.execute("UPDATE games SET winnaar = %s WHERE id = %s", (speler, self.current_game_id))
-        self.conn.commit()
-        self.show_scores(None)
+            # Alleen de rijen van de deelnemers veranderen; geen nieuwe query.
+            # Kon de cache niet volgen (version None), dan laadt show_scores opnieuw.
+            self.leaderboard.apply_game(session.spelers, session.winnaar)
+            self.leaderboard_version = version
+        self.games.remove(session)
         self.show_main_screen()
 
-    def show_scores(self, widget=None):
-        if not self.cursor:
+    def show_flush_error(self, error):
+        self.main_window.info_dialog('Database Fout', f'Spel is lokaal bewaard en wordt later opgeslagen:\n{error}')
+
+    def _flush_session(self, session):
+        """Sla session op en geef de dataversie terug als de statistiekencache kon volgen."""
+        version = None
+        if self.offline:
+            record_offline(self.conn, session)
+            self.stats_cache.invalidate()
+        else:
+            with self.repository() as repository:
+                before = self.stats_cache.begin_write(repository.conn, self.db_type)
+                game_id = repository.record_game(session)
+                version = self.stats_cache.record_game(
+                    repository.conn, self.db_type, before, session.spelers, session.winnaar, game_id,
+                )
+        self.journal.remove(session)
+        self.player_directory.invalidate()
+        return version
+
+    async def go_offline(self):
+        if self.pool is not None:
+            self.pool.close_all()
+            self.pool = None
+        self.offline = True
+        self.db_type = "sqlite"
+        self.player_directory.invalidate()
+        # Lokale scores kunnen afwijken van de server: volgende keer opnieuw laden
+        self.stats_cache.invalidate()
+        self.leaderboard_version = None
+        if self.conn is None:
+            await self.run_db(self._open_sqlite)
+        self.loop.create_task(self.sync_loop())
+        await self.update_sync_status()
+
+    async def sync_loop(self):
+        while self.offline:
+            await asyncio.sleep(SYNC_INTERVAL)
+            await self.sync_now()
+
+    async def sync_now(self):
+        """Push offline gespeelde spellen naar MySQL zodra de server bereikbaar is.
+
+        Pas na een geslaagde probe gaat er werk naar de database-thread.
+        """
+        if not self.db_config:
+            return
+        if self.offline and not await self.try_connect_mysql():
+            await self.update_sync_status()
+            return
+        try:
+            if self.conn is None:
+                await self.run_db(self._open_sqlite)
+            await self.run_db(self._sync_outbox)
+        except Exception:
+            await self.update_sync_status()
+            return
+
+        if self.offline:
+            self.offline = False
+            self.db_type = "mysql"
+            await self.show_scores()
+        await self.update_sync_status()
+
+    def _sync_outbox(self):
+        with self.pool.connection() as remote:
+            synced = sync_outbox(self.conn, remote, "mysql")
+            mirror_players(self.conn, remote)
+        self.player_directory.invalidate()
+        return synced
+
+    async def update_sync_status(self):
+        if self.sync_label is None or not self.db_config or self.conn is None:
+            return
+        pending = await self.db.run(pending_count, self.conn)
+        if self.offline:
+            self.sync_label.text = f'Offline - {pending} spel(len) wachten op synchronisatie'
+        elif pending:
+            self.sync_label.text = f'Online - {pending} spel(len) nog te synchroniseren'
+        else:
+            self.sync_label.text = 'Online - alles gesynchroniseerd'
+
+    async def replay_journal(self):
+        """Sla afgeronde spellen uit het journaal alsnog op en herstel alle lopende spellen.
+
+        Lopende spellen komen uit het journaal en, als er verbinding is, uit
+        de database (ook van andere tablets); het journaal gaat voor omdat
+        dat ook de schudteller bijhoudt. Spellen uit de database komen niet
+        in het journaal, en journaalspellen die verlaten zijn
+        (IN_PROGRESS_MAX_AGE) of in de database al een winnaar hebben
+        vallen af.
+        """
+        since = (datetime.now() - IN_PROGRESS_MAX_AGE).strftime('%Y-%m-%d %H:%M:%S')
+        open_sessions = []
+        for session in self.journal.load_all():
+            if not session.is_finished:
+                if session.started_at < since:
+                    self.journal.remove(session)
+                else:
+                    open_sessions.append(session)
+                continue
+            try:
+                await self.run_db(self._flush_session, session)
+            except Exception:
+                # Blijft in het journaal staan voor een volgende poging
+                continue
+
+        recovered = []
+        if not self.offline and self.is_connected():
+            try:
+                finished, recovered = await self.run_db(self._fetch_in_progress, since, [s.uuid for s in open_sessions])
+            except Exception:
+                finished = set()
+            for session in open_sessions:
+                if session.uuid in finished:
+                    # Elders afgerond
+                    self.journal.remove(session)
+            open_sessions = [session for session in open_sessions if session.uuid not in finished]
+
+        for session in open_sessions:
+            self.games.add(session)
+        for session in recovered:
+            if session.uuid not in self.games:
+                self.games.add(session)
+
+        if self.games.active is not None:
+            return
+        if len(self.games) == 1:
+            self.switch_game(None, next(iter(self.games)).uuid)
+        elif self.games:
+            self.show_games_screen()
+
+    def _fetch_in_progress(self, since, uuids):
+        """(uuids uit uuids die al een winnaar hebben, lopende spellen sinds since)."""
+        with self.repository() as repository:
+            return repository.finished(uuids), repository.in_progress(since)
+
+    async def show_scores(self, widget=None):
+        if not self.is_connected():
             self.scores_label.text = 'Geen database verbinding.'
             return
 
-        self.cursor.execute("SELECT speler, wins FROM scores ORDER BY wins DESC")
-        rows = self.cursor.fetchall()
+        version, rows = await self.run_db(self._fetch_leaderboard, widget=widget)
+        if version != self.leaderboard_version or not self.leaderboard.loaded:
+            self.leaderboard.load(rows)
+            self.leaderboard_version = version
+        self.show_scores_status()
 
-        if not rows:
-            self.scores_label.text = 'Nog geen scores.'
+    def show_scores_status(self):
+        self.scores_label.text = '' if self.leaderboard else 'Nog geen scores.'
+
+    def _fetch_leaderboard(self):
+        with self.connection() as conn:
+            return self.stats_cache.leaderboard(conn, self.db_type)
+
+    async def show_player_stats(self, widget, **kwargs):
+        row = widget.selection
+        if row is None or not self.is_connected():
+            return
+        stats = await self.run_db(self._fetch_player_stats, row.speler)
+        if stats is None:
+            self.main_window.info_dialog(row.speler, 'Nog geen spellen gespeeld.')
+            return
+        self.main_window.info_dialog(row.speler, "\n".join([
+            f"Gespeeld: {stats.games_played}",
+            f"Gewonnen: {stats.wins}",
+            f"Begonnen: {stats.starts} (waarvan {stats.wins_as_starter} gewonnen)",
+            f"Keer geschud: {stats.shuffles_seen}",
+            f"Rating: {stats.rating:.0f}" if stats.rating is not None else "Rating: -",
+            f"Laatst gespeeld: {stats.last_played or '-'}",
+        ]))
+
+    def _fetch_player_stats(self, speler):
+        with self.connection() as conn:
+            return self.stats_cache.player_stats(conn, self.db_type, speler)
+
+    async def export_games_csv(self, widget):
+        if not self.is_connected():
+            self.main_window.info_dialog('Fout', 'Geen databaseverbinding.')
+            return
+
+        # Eerst de bestandsnaam, zodat er niets wordt opgehaald als de gebruiker annuleert
+        file_path = await self.main_window.save_file_dialog(
+            title='Sla spellen op als CSV',
+            suggested_filename='spellen.csv',
+            file_types=['csv']
+        )
+
+        if not file_path:
+            return
+
+        file_path = os.path.abspath(file_path)
+        total = await self.run_db(self._count_games, widget=widget)
+        if not total:
+            self.main_window.info_dialog('Info', 'Er zijn geen gespeelde spellen om te exporteren.')
             return
 
-        score_texts = []
-        for speler, wins in rows:
-            if self.db_type == "sqlite":
-                self.cursor.execute("SELECT COUNT(*) FROM games WHERE instr(spelers, ?) > 0", (speler,))
-            else:
-                self.cursor.execute("SELECT COUNT(*) FROM games WHERE FIND_IN_SET(%s, spelers)", (speler,))
-            games_played = self.cursor.fetchone()[0]
-            percentage = (wins / games_played) * 100 if games_played > 0 else 0.0
-            score_texts.append(f"{speler}: {wins} / {games_played} - {percentage:.1f}%")
+        cancel = threading.Event()
+        progress_bar = toga.ProgressBar(max=total, value=0, style=Pack(padding=10))
+        progress_label = toga.Label(f'0 / {total} spellen', style=Pack(padding=(0, 10)))
+        cancel_button = toga.Button('Annuleer', on_press=lambda w: cancel.set(), style=Pack(padding=5))
+        self.main_window.content = toga.Box(
+            children=[toga.Label('Spellen exporteren...', style=Pack(padding=10)), progress_bar, progress_label, cancel_button],
+            style=Pack(direction=COLUMN, padding=10)
+        )
 
-        self.scores_label.text = "\n".join(score_texts)
+        def on_progress(exported):
+            self.loop.call_soon_threadsafe(self._show_export_progress, progress_bar, progress_label, exported, total)
+
+        # Eigen thread en eigen verbinding: de database-thread blijft vrij
+        # voor de rest van de app zolang de export loopt
+        try:
+            exported = await self.db.run_parallel(self._export_games, file_path, on_progress, cancel)
+        except ExportCancelled:
+            self.main_window.info_dialog('Geannuleerd', 'Export geannuleerd.')
+        except Exception as e:
+            self.main_window.info_dialog('Fout', f'Kon CSV niet opslaan:\n{e}')
+        else:
+            self.main_window.info_dialog('Succes', f'{exported} spellen succesvol opgeslagen in {file_path}')
+        self.show_main_screen()
+
+    @staticmethod
+    def _show_export_progress(progress_bar, progress_label, exported, total):
+        progress_bar.value = exported
+        progress_label.text = f'{exported} / {total} spellen'
+
+    def _count_games(self):
+        with self.connection() as conn:
+            return count_games(conn)
+
+    def _export_games(self, file_path, progress, cancel):
+        with self.export_connection() as conn:
+            return export_games_csv(conn, file_path, progress=progress, cancel=cancel)
+
+    @contextmanager
+    def export_connection(self):
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            # Met WAL leest de export naast de schrijvende database-thread
+            conn = self.instrument(connect_sqlite(self.sqlite_path(), **sqlite_profile(self.db_config)))
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+    def instrument(self, conn):
+        return instrument(conn, self.sql_stats)
+
+    def sql_stats_path(self):
+        return os.path.join(self.app_dir, SQL_STATS_FILENAME)
+
+    def show_sql_stats(self, command=None, **kwargs):
+        self.sql_stats.dump(self.sql_stats_path())
+        summary = self.sql_stats.summary()
+        lines = [
+            f"{item['calls']}x, gem. {item['mean_ms']:.2f} ms, max {item['max_ms']:.1f} ms: {item['sql'][:80]}"
+            for item in summary['statements'][:5]
+        ]
+        lines.append(f"\n{summary['slow_queries']} trage queries (>= {summary['slow_query_ms']:g} ms)")
+        lines.append(f"Volledig overzicht: {self.sql_stats_path()}")
+        self.main_window.info_dialog('SQL-statistieken', "\n".join(lines))
+
+    def reset_sql_stats(self, command=None, **kwargs):
+        self.sql_stats.reset()
 
     def on_exit(self):
-        if self.cursor:
-            self.cursor.close()
+        self.db.shutdown()
+        if self.pool:
+            self.pool.close_all()
         if self.conn:
+            try:
+                # Werk de statistieken van de query planner bij waar nodig
+                self.conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
             self.conn.close()
+        if self.sql_stats is not None:
+            self.sql_stats.dump(self.sql_stats_path())
 
 def main():
     return PestenApp()
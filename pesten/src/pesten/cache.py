@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+from pesten.data_version import current_data_version, only_own_write
+from pesten.leaderboard import LeaderboardModel, fetch_leaderboard
+from pesten.stats import fetch_player_stats
+
+DEFAULT_DETAIL_CACHE_SIZE = 256
+
+
+class StatsCache:
+    """Scorelijst en statistieken per speler in het geheugen, per dataversie.
+
+    Elke weergave kost alleen de versiecontrole (zie pesten.data_version);
+    pas als de versie verandert, ook door een andere client op dezelfde
+    MySQL-server, wordt alles opnieuw gelezen. Statistieken per speler staan
+    in een LRU van hoogstens detail_size spelers. Alleen vanaf de
+    database-thread gebruiken.
+    """
+
+    def __init__(self, detail_size=DEFAULT_DETAIL_CACHE_SIZE):
+        self.detail_size = detail_size
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._leaderboard = None  # LeaderboardModel zonder listeners
+        self._details = OrderedDict()
+
+    def invalidate(self):
+        self.version = None
+        self._leaderboard = None
+        self._details.clear()
+
+    def _check(self, conn, db_type):
+        version = current_data_version(conn, db_type)
+        if version != self.version:
+            self.invalidate()
+            self.version = version
+
+    def leaderboard(self, conn, db_type):
+        """Geef (versie, rijen) terug; bij een ongewijzigde versie uit het geheugen."""
+        self._check(conn, db_type)
+        if self._leaderboard is None:
+            self.misses += 1
+            cursor = conn.cursor()
+            try:
+                rows = fetch_leaderboard(cursor)
+            finally:
+                cursor.close()
+            self._leaderboard = LeaderboardModel()
+            self._leaderboard.load(rows)
+        else:
+            self.hits += 1
+        return self.version, list(self._leaderboard.rows)
+
+    def player_stats(self, conn, db_type, speler):
+        """PlayerStats van speler (of None), via de LRU."""
+        self._check(conn, db_type)
+        if speler in self._details:
+            self.hits += 1
+            self._details.move_to_end(speler)
+            return self._details[speler]
+        self.misses += 1
+        cursor = conn.cursor()
+        try:
+            stats = fetch_player_stats(cursor, db_type, speler)
+        finally:
+            cursor.close()
+        self._details[speler] = stats
+        if len(self._details) > self.detail_size:
+            self._details.popitem(last=False)
+        return stats
+
+    def begin_write(self, conn, db_type):
+        """Versie vlak voor een eigen schrijfactie; geef die door aan record_game."""
+        return current_data_version(conn, db_type)
+
+    def record_game(self, conn, db_type, before, spelers, winnaar, game_id=None):
+        """Verwerk een zojuist opgeslagen spel zonder de scorelijst opnieuw te lezen.
+
+        Dat kan alleen als de cache bij was en er sinds before niets anders
+        is veranderd (game_id is het id van het opgeslagen spel, zie
+        only_own_write); anders wordt alles bij de volgende weergave opnieuw
+        geladen. Geeft de nieuwe versie terug, of None als de cache niet kon
+        volgen.
+        """
+        after = current_data_version(conn, db_type)
+        if self._leaderboard is None or before != self.version or not only_own_write(db_type, before, after, game_id):
+            self.invalidate()
+            return None
+        self._leaderboard.apply_game(spelers, winnaar)
+        for speler in spelers:
+            self._details.pop(speler, None)
+        self.version = after
+        return after
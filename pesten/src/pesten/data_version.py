@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+# Goedkope versie van de gegevens, zodat een cache kan zien of er iets is
+# veranderd zonder de scorelijst zelf opnieuw te lezen.
+#
+# Elke schrijvende transactie van de app verhoogt data_version.counter.
+# Op MySQL is de versie (MAX(games.id), counter): zo ziet de app ook wat
+# andere clients op de gedeelde server hebben opgeslagen, en spellen van
+# oudere clients zonder teller komen via MAX(games.id) binnen. Op SQLite is
+# PRAGMA data_version (wijzigingen door andere verbindingen) samen met
+# total_changes (wijzigingen door deze verbinding) genoeg.
+
+DataVersion = namedtuple('DataVersion', ['external', 'local'])
+
+DATA_VERSION_DDL = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INT PRIMARY KEY,
+            counter BIGINT NOT NULL DEFAULT 0
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY,
+            counter INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+}
+
+BUMP_SQL = "UPDATE data_version SET counter = counter + 1 WHERE id = 1"
+
+MYSQL_VERSION_SQL = """
+    SELECT (SELECT MAX(id) FROM games), (SELECT counter FROM data_version WHERE id = 1)
+"""
+
+
+def create_data_version(cursor, db_type):
+    cursor.execute(DATA_VERSION_DDL[db_type])
+    cursor.execute("SELECT COUNT(*) FROM data_version")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO data_version (id, counter) VALUES (1, 0)")
+
+
+def bump_data_version(cursor):
+    """Verhoog de teller; binnen de transactie van de wijziging aanroepen."""
+    cursor.execute(BUMP_SQL)
+
+
+def current_data_version(conn, db_type):
+    """Huidige DataVersion; alleen buiten een schrijvende transactie aanroepen."""
+    if db_type == "sqlite":
+        cursor = conn.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return DataVersion(cursor.fetchone()[0], conn.total_changes)
+        finally:
+            cursor.close()
+
+    # Eerst de oude leesweergave van InnoDB (REPEATABLE READ) afsluiten,
+    # anders ziet een verbinding uit de pool nooit wat anderen schreven.
+    # Reads direct hierna zien dezelfde stand als de teruggegeven versie.
+    conn.commit()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(MYSQL_VERSION_SQL)
+        max_id, counter = cursor.fetchone()
+    finally:
+        cursor.close()
+    return DataVersion(max_id or 0, counter or 0)
+
+
+def only_own_write(db_type, before, after, game_id=None):
+    """Is het verschil tussen before en after precies één eigen schrijfactie?
+
+    Op MySQL moet ook MAX(games.id) kloppen: ongewijzigd, of precies game_id
+    als deze schrijfactie dat spel invoegde. Een oudere client die een spel
+    opslaat zonder de teller te verhogen valt zo ook op.
+    """
+    if db_type == "sqlite":
+        return after.external == before.external and after.local != before.local
+    return after.local == before.local + 1 and after.external == max(before.external, game_id or 0)
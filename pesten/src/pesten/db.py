@@ -0,0 +1,92 @@
+# Verbindingsprofiel voor SQLite. WAL met synchronous=NORMAL doet bij een
+# commit geen fsync meer (alleen bij een checkpoint) en blijft na een crash
+# consistent; hooguit de laatste commits gaan verloren bij stroomuitval.
+DEFAULT_SQLITE_CACHE_SIZE = 16 * 1024  # KiB
+DEFAULT_SQLITE_MMAP_SIZE = 64 * 1024 * 1024  # bytes
+SQLITE_BUSY_TIMEOUT = 5000  # ms
+
+# Sleutels in db_config.json voor het SQLite-profiel, niet voor de MySQL-driver
+SQLITE_KEYS = ('sqlite_cache_size', 'sqlite_mmap_size')
+
+
+def sql(db_type, query):
+    """Zet %s-placeholders om naar ? wanneer de query op SQLite draait."""
+    if db_type == "sqlite":
+        return query.replace("%s", "?")
+    return query
+
+
+def driver_module(conn):
+    """Module van de onderliggende driver, ook als conn ingepakt is (zie instrument.py)."""
+    conn = getattr(conn, 'raw_connection', conn)
+    return type(conn).__module__
+
+
+# Deadlock (1213) en lock wait timeout (1205): de transactie mag opnieuw
+TRANSIENT_MYSQL_ERRORS = (1205, 1213)
+
+
+def is_transient_error(error):
+    """Is error een lock-conflict waarna de hele transactie opnieuw kan?
+
+    Werkt voor pymysql (code in args[0]), mysql.connector (errno) en sqlite3
+    ('database is locked', ook als een leestransactie niet naar schrijven
+    kon opschalen).
+    """
+    module = type(error).__module__
+    if module.startswith('pymysql'):
+        return bool(error.args) and error.args[0] in TRANSIENT_MYSQL_ERRORS
+    if module.startswith('mysql.connector'):
+        return getattr(error, 'errno', None) in TRANSIENT_MYSQL_ERRORS
+    return module == 'sqlite3' and 'locked' in str(error)
+
+
+def connect_sqlite(path, cache_size=DEFAULT_SQLITE_CACHE_SIZE, mmap_size=DEFAULT_SQLITE_MMAP_SIZE, **kwargs):
+    """Open een SQLite-database met WAL, synchronous=NORMAL, cache (KiB) en mmap (bytes)."""
+    import sqlite3
+    conn = sqlite3.connect(path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_size)}")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    return conn
+
+
+def sqlite_profile(db_config):
+    """Cache- en mmap-instellingen uit db_config.json, met de standaardwaarden als terugval."""
+    return {
+        'cache_size': db_config.get('sqlite_cache_size', DEFAULT_SQLITE_CACHE_SIZE),
+        'mmap_size': db_config.get('sqlite_mmap_size', DEFAULT_SQLITE_MMAP_SIZE),
+    }
+
+
+def add_connection_arguments(parser):
+    parser.add_argument('--sqlite', metavar='PAD', help='Gebruik dit SQLite-bestand in plaats van MySQL')
+    parser.add_argument('--config', default='db_config.json', help='MySQL-config (standaard: db_config.json)')
+
+
+def connect_from_args(args):
+    """Open een verbinding op basis van --sqlite/--config en geef (conn, db_type) terug."""
+    if args.sqlite:
+        return connect_sqlite(args.sqlite), "sqlite"
+    return connect_mysql_config(args.config), "mysql"
+
+
+def connect_mysql_config(path):
+    import json
+    import pymysql
+    from pesten.pool import POOL_KEYS
+    with open(path, 'r') as f:
+        config = json.load(f)
+    return pymysql.connect(**{key: value for key, value in config.items() if key not in POOL_KEYS + SQLITE_KEYS})
+
+
+def connect_spec(spec):
+    """Open een verbinding uit 'sqlite:PAD' of 'mysql:CONFIG.json' en geef (conn, db_type) terug."""
+    kind, _, target = spec.partition(':')
+    if kind == 'sqlite' and target:
+        return connect_sqlite(target), "sqlite"
+    if kind == 'mysql' and target:
+        return connect_mysql_config(target), "mysql"
+    raise ValueError(f"Onbekende database {spec!r}, gebruik sqlite:PAD of mysql:CONFIG.json")
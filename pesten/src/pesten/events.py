@@ -0,0 +1,463 @@
+import argparse
+import json
+from datetime import datetime
+
+from pesten.data_version import bump_data_version
+from pesten.db import add_connection_arguments, connect_from_args, sql
+from pesten.game_players import split_spelers
+
+# Alles wat er tijdens een spel gebeurt, in volgorde en met tijdstip. games,
+# game_players en player_stats zijn hiervan afgeleid; replay_stats rekent de
+# statistieken opnieuw uit door de events af te spelen vanaf het laatste
+# snapshot, zodat ook een correctie achteraf geen losse fix-up query nodig heeft.
+GAME_STARTED = 'game_started'
+STARTER_CHOSEN = 'starter_chosen'
+DECK_SHUFFLED = 'deck_shuffled'
+WINNER_SET = 'winner_set'
+RESULT_CORRECTED = 'result_corrected'
+
+EVENT_TYPES = (GAME_STARTED, STARTER_CHOSEN, DECK_SHUFFLED, WINNER_SET, RESULT_CORRECTED)
+
+BACKFILL_CHUNK_SIZE = 1000
+REPLAY_CHUNK_SIZE = 10000
+SNAPSHOT_INTERVAL = 50000  # events tussen twee snapshots
+KEEP_SNAPSHOTS = 3
+# Op MySQL kan een transactie een lager id committen dan een event dat de
+# replay al gezien heeft. Overgeslagen ids binnen dit venster worden in het
+# snapshot bewaard en bij de volgende replay opnieuw opgevraagd.
+GAP_WINDOW = 10000
+
+GAME_EVENTS_DDL = {
+    "mysql": [
+        """
+        CREATE TABLE IF NOT EXISTS game_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            game_id INT NOT NULL,
+            seq INT NOT NULL,
+            event_type VARCHAR(32) NOT NULL,
+            speler VARCHAR(255) NULL,
+            data TEXT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_game_events_seq (game_id, seq)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_snapshots (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            last_event_id BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            payload LONGTEXT NOT NULL
+        )
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE TABLE IF NOT EXISTS game_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            speler TEXT,
+            data TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_game_events_seq ON game_events (game_id, seq)",
+        """
+        CREATE TABLE IF NOT EXISTS stats_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            last_event_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            payload TEXT NOT NULL
+        )
+        """,
+    ],
+}
+
+# (game_id, seq) is uniek: een event dat al is opgeslagen (herhaalde flush,
+# sync, of eerst als lopend spel geregistreerd) wordt overgeslagen
+INSERT_EVENT_SQL = {
+    "mysql": """
+        INSERT IGNORE INTO game_events (game_id, seq, event_type, speler, data, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """,
+    "sqlite": """
+        INSERT OR IGNORE INTO game_events (game_id, seq, event_type, speler, data, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+}
+
+EVENTS_AFTER_SQL = """
+    SELECT id, game_id, event_type, speler, data, created_at
+    FROM game_events WHERE id > %s ORDER BY id LIMIT %s
+"""
+
+GAME_EVENTS_BEFORE_SQL = """
+    SELECT event_type, speler, data, created_at FROM game_events
+    WHERE game_id = %s AND id < %s ORDER BY id
+"""
+
+
+def now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def create_game_events(cursor, db_type):
+    for statement in GAME_EVENTS_DDL[db_type]:
+        cursor.execute(statement)
+
+
+def _started_data(spelers):
+    return json.dumps({'spelers': list(spelers)}, ensure_ascii=False)
+
+
+def session_event_rows(game_id, session):
+    """Rijen voor game_events uit de events van een GameSession; seq is de positie."""
+    rows = []
+    for seq, (event_type, speler, created_at) in enumerate(session.events, start=1):
+        data = _started_data(session.spelers) if event_type == GAME_STARTED else None
+        rows.append((game_id, seq, event_type, speler, data, created_at))
+    return rows
+
+
+def unsaved_event_rows(cursor, db_type, rows):
+    """Alleen de rijen met een seq boven de laatst opgeslagen seq van hun spel.
+
+    Op MySQL verbruikt INSERT IGNORE ook voor een overgeslagen duplicaat een
+    AUTO_INCREMENT-id. Een lopend spel dat bij elke stap opnieuw wordt
+    weggeschreven zou zo gaten in game_events.id slaan, die de replay
+    allemaal als pending bijhoudt (zie GAP_WINDOW).
+    """
+    game_ids = sorted({row[0] for row in rows})
+    if not game_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(game_ids))
+    cursor.execute(
+        sql(db_type, f"SELECT game_id, MAX(seq) FROM game_events WHERE game_id IN ({placeholders}) GROUP BY game_id"),
+        game_ids,
+    )
+    saved = dict(cursor.fetchall())
+    return [row for row in rows if row[1] > saved.get(row[0], 0)]
+
+
+def game_event_rows(game_id, datum, spelers, starter, shuffles, winnaar):
+    """Events voor een spel van voor game_events; alles op het tijdstip van het spel."""
+    datum = str(datum) if datum is not None else now()
+    events = [(GAME_STARTED, None, _started_data(spelers))]
+    if starter:
+        events.append((STARTER_CHOSEN, starter, None))
+    events.extend((DECK_SHUFFLED, None, None) for _ in range(shuffles or 0))
+    if winnaar:
+        events.append((WINNER_SET, winnaar, None))
+    return [
+        (game_id, seq, event_type, speler, data, datum)
+        for seq, (event_type, speler, data) in enumerate(events, start=1)
+    ]
+
+
+def append_event(cursor, db_type, game_id, event_type, speler=None, data=None):
+    """Voeg één event achteraan de events van game_id toe, zonder commit."""
+    cursor.execute(sql(db_type, "SELECT COALESCE(MAX(seq), 0) FROM game_events WHERE game_id = %s"), (game_id,))
+    seq = cursor.fetchone()[0] + 1
+    cursor.execute(sql(db_type, """
+        INSERT INTO game_events (game_id, seq, event_type, speler, data, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """), (game_id, seq, event_type, speler, json.dumps(data, ensure_ascii=False) if data else None, now()))
+
+
+def backfill_events(conn, db_type, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Maak events voor spellen die er nog geen hebben en geef het aantal spellen terug.
+
+    Voor bestaande databases en geïmporteerde spellen: per spel game_started,
+    de starter, één deck_shuffled per keer geschud en de winnaar, allemaal op
+    games.datum. Veilig om opnieuw te draaien.
+    """
+    last_id = 0
+    backfilled = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(
+                sql(db_type, "SELECT id, datum, spelers, starter, stapel_geschud, winnaar FROM games WHERE id > %s ORDER BY id LIMIT %s"),
+                (last_id, chunk_size),
+            )
+            games = cursor.fetchall()
+            if not games:
+                break
+            last_id = games[-1][0]
+            cursor.execute(
+                sql(db_type, "SELECT DISTINCT game_id FROM game_events WHERE game_id BETWEEN %s AND %s"),
+                (games[0][0], last_id),
+            )
+            has_events = {row[0] for row in cursor.fetchall()}
+            rows = []
+            for game_id, datum, spelers, starter, shuffles, winnaar in games:
+                if game_id not in has_events:
+                    rows.extend(game_event_rows(game_id, datum, split_spelers(spelers), starter, shuffles, winnaar))
+                    backfilled += 1
+            if rows:
+                cursor.executemany(INSERT_EVENT_SQL[db_type], rows)
+                conn.commit()
+    finally:
+        cursor.close()
+    return backfilled
+
+
+class StatsReplay:
+    """Statistieken per speler, opgebouwd door events op volgorde af te spelen.
+
+    players: speler -> [gespeeld, wins, starts, wins als starter, geschud, laatst gespeeld]
+    open_games: game_id -> [spelers, starter, keer geschud, gestart] voor spellen zonder winnaar.
+    Een spel telt mee zodra winner_set langskomt, net als in player_stats;
+    laatst gespeeld is het begin van het spel (games.datum), zoals in REBUILD_SQL.
+
+    open_games staat niet in het snapshot: afgebroken spellen zouden het
+    anders eindeloos laten groeien. Komt er een event voor een spel dat niet
+    (meer) in open_games staat, dan haalt load_game(game_id, event_id) de
+    eerdere events van dat spel op. pending zijn overgeslagen ids, zie
+    GAP_WINDOW.
+    """
+
+    def __init__(self, players=None, last_event_id=0, pending=None, load_game=None):
+        self.players = players if players is not None else {}
+        self.open_games = {}
+        self.last_event_id = last_event_id
+        self.pending = set(pending or ())
+        self.load_game = load_game
+
+    def _player(self, speler):
+        stats = self.players.get(speler)
+        if stats is None:
+            stats = self.players[speler] = [0, 0, 0, 0, 0, None]
+        return stats
+
+    def _open_game(self, game_id, event_id):
+        game = self.open_games.get(game_id)
+        if game is None and self.load_game is not None:
+            game = _game_state(self.load_game(game_id, event_id))
+            if game is not None:
+                self.open_games[game_id] = game
+        return game
+
+    def apply(self, event_id, game_id, event_type, speler, data, created_at):
+        if event_type == GAME_STARTED:
+            self.open_games[game_id] = [json.loads(data)['spelers'], None, 0, str(created_at)]
+        elif event_type == STARTER_CHOSEN:
+            game = self._open_game(game_id, event_id)
+            if game is not None:
+                game[1] = speler
+        elif event_type == DECK_SHUFFLED:
+            game = self._open_game(game_id, event_id)
+            if game is not None:
+                game[2] += 1
+        elif event_type == WINNER_SET:
+            game = self._open_game(game_id, event_id)
+            if game is not None:
+                del self.open_games[game_id]
+                self._finish(game, speler)
+        elif event_type == RESULT_CORRECTED:
+            correction = json.loads(data)
+            previous, starter = correction['previous'], correction.get('starter')
+            self._player(previous)[1] -= 1
+            self._player(speler)[1] += 1
+            if previous == starter:
+                self._player(previous)[3] -= 1
+            if speler == starter:
+                self._player(speler)[3] += 1
+        self.last_event_id = max(self.last_event_id, event_id)
+
+    def _finish(self, game, winnaar):
+        spelers, starter, shuffles, played_at = game
+        for speler in spelers:
+            stats = self._player(speler)
+            stats[0] += 1
+            if speler == winnaar:
+                stats[1] += 1
+            if speler == starter:
+                stats[2] += 1
+                if speler == winnaar:
+                    stats[3] += 1
+            stats[4] += shuffles
+            if stats[5] is None or played_at > stats[5]:
+                stats[5] = played_at
+
+    def to_json(self):
+        return json.dumps({'players': self.players, 'pending': sorted(self.pending)}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, payload, last_event_id):
+        data = json.loads(payload)
+        return cls(data['players'], last_event_id, data.get('pending'))
+
+
+def _game_state(events):
+    """[spelers, starter, keer geschud, gestart] uit de eerdere events van een spel, of None.
+
+    None als het spel niet gestart is of al een winnaar had; een tweede
+    winner_set telt dan niet nog eens.
+    """
+    game = None
+    for event_type, speler, data, created_at in events:
+        if event_type == GAME_STARTED:
+            game = [json.loads(data)['spelers'], None, 0, str(created_at)]
+        elif event_type == WINNER_SET:
+            return None
+        elif game is None:
+            continue
+        elif event_type == STARTER_CHOSEN:
+            game[1] = speler
+        elif event_type == DECK_SHUFFLED:
+            game[2] += 1
+    return game
+
+
+def _game_loader(conn, db_type):
+    query = sql(db_type, GAME_EVENTS_BEFORE_SQL)
+
+    def load_game(game_id, event_id):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, (game_id, event_id))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    return load_game
+
+
+def load_snapshot(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT last_event_id, payload FROM stats_snapshots ORDER BY id DESC LIMIT 1")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        return None
+    return StatsReplay.from_json(row[1], row[0])
+
+
+def save_snapshot(conn, db_type, state, keep=KEEP_SNAPSHOTS):
+    """Leg state vast als snapshot en ruim oudere snapshots op (de laatste keep blijven).
+
+    Lopende spellen gaan niet mee en worden ook uit het geheugen gehaald;
+    alleen overgeslagen ids binnen GAP_WINDOW blijven bewaard.
+    """
+    state.open_games.clear()
+    state.pending = {event_id for event_id in state.pending if event_id > state.last_event_id - GAP_WINDOW}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            sql(db_type, "INSERT INTO stats_snapshots (last_event_id, payload) VALUES (%s, %s)"),
+            (state.last_event_id, state.to_json()),
+        )
+        cursor.execute("SELECT id FROM stats_snapshots ORDER BY id DESC")
+        old = [(row[0],) for row in cursor.fetchall()[keep:]]
+        if old:
+            cursor.executemany(sql(db_type, "DELETE FROM stats_snapshots WHERE id = %s"), old)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def replay_stats(conn, db_type, snapshot_interval=SNAPSHOT_INTERVAL, chunk_size=REPLAY_CHUNK_SIZE):
+    """Speel de events af vanaf het laatste snapshot en geef de StatsReplay terug.
+
+    Elke snapshot_interval afgespeelde events wordt een nieuw snapshot
+    opgeslagen, zodat de volgende replay alleen de staart hoeft te lezen.
+    Ids die in de reeks ontbreken worden onthouden (pending); zijn ze bij een
+    volgende replay alsnog gecommit, dan worden ze eerst afgespeeld.
+    """
+    state = load_snapshot(conn) or StatsReplay()
+    state.load_game = _game_loader(conn, db_type)
+    since_snapshot = 0
+    cursor = conn.cursor()
+    try:
+        pending = sorted(state.pending)
+        for start in range(0, len(pending), BACKFILL_CHUNK_SIZE):
+            chunk = pending[start:start + BACKFILL_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(sql(db_type, f"""
+                SELECT id, game_id, event_type, speler, data, created_at
+                FROM game_events WHERE id IN ({placeholders}) ORDER BY id
+            """), chunk)
+            for row in cursor.fetchall():
+                state.pending.discard(row[0])
+                state.apply(*row)
+
+        while True:
+            cursor.execute(sql(db_type, EVENTS_AFTER_SQL), (state.last_event_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for row in rows:
+                event_id = row[0]
+                if event_id > state.last_event_id + 1:
+                    state.pending.update(range(max(state.last_event_id + 1, event_id - GAP_WINDOW), event_id))
+                state.apply(*row)
+            since_snapshot += len(rows)
+            if snapshot_interval and since_snapshot >= snapshot_interval:
+                save_snapshot(conn, db_type, state)
+                since_snapshot = 0
+    finally:
+        cursor.close()
+    return state
+
+
+def rebuild_from_events(conn, db_type, snapshot_interval=SNAPSHOT_INTERVAL):
+    """Vervang player_stats en scores.wins door de uitkomst van replay_stats.
+
+    Geeft het aantal spelers met statistieken terug.
+    """
+    state = replay_stats(conn, db_type, snapshot_interval)
+    rows = [
+        (speler, *stats)
+        for speler, stats in state.players.items()
+        if stats[0] > 0
+    ]
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM player_stats")
+        cursor.executemany(sql(db_type, """
+            INSERT INTO player_stats (speler, games_played, wins, starts, wins_as_starter, shuffles_seen, last_played)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """), rows)
+        cursor.execute("UPDATE scores SET wins = 0")
+        cursor.executemany(
+            sql(db_type, "UPDATE scores SET wins = %s WHERE speler = %s"),
+            [(stats[1], speler) for speler, stats in state.players.items() if stats[1]],
+        )
+        bump_data_version(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m pesten.events', description='Eventlog van gespeelde spellen')
+    parser.add_argument('command', choices=['backfill', 'snapshot', 'rebuild'], help=(
+        'backfill: events maken voor oude spellen; snapshot: nu een snapshot vastleggen; '
+        'rebuild: player_stats en wins opnieuw afleiden uit de events'
+    ))
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, db_type = connect_from_args(args)
+    try:
+        if args.command == 'backfill':
+            print(f"Events gemaakt voor {backfill_events(conn, db_type)} spellen.")
+        elif args.command == 'snapshot':
+            state = replay_stats(conn, db_type)
+            save_snapshot(conn, db_type, state)
+            print(f"Snapshot tot en met event {state.last_event_id}.")
+        else:
+            print(f"player_stats afgeleid uit events voor {rebuild_from_events(conn, db_type)} spelers.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DatabaseExecutor:
+    """Voert blokkerende databasecalls uit op een worker-thread.
+
+    De Toga-eventloop blijft zo reageren terwijl een trage of wegvallende
+    database antwoordt. Standaard is er één worker, zodat alle calls op de
+    gedeelde verbinding na elkaar lopen (pymysql en sqlite3 zijn niet
+    thread-safe per verbinding).
+    """
+
+    def __init__(self, max_workers=1):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pesten-db')
+        # timer(seconden) wordt na elke call aangeroepen als hij gezet is (zie profiling.py)
+        self.timer = None
+
+    async def run(self, fn, *args, **kwargs):
+        return await self._run(self._pool, fn, *args, **kwargs)
+
+    async def run_parallel(self, fn, *args, **kwargs):
+        """Als run, maar op een eigen thread naast de database-thread (voor lange exports)."""
+        return await self._run(None, fn, *args, **kwargs)
+
+    async def _run(self, pool, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        if self.timer is None:
+            return await loop.run_in_executor(pool, call)
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(pool, call)
+        finally:
+            self.timer(time.perf_counter() - start)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
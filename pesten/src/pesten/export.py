@@ -0,0 +1,298 @@
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+from pesten.db import add_connection_arguments, connect_from_args, driver_module
+from pesten.session import IN_PROGRESS_MAX_AGE
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_HEADER = ['Spel ID', 'Spelers', 'Winnaar', 'Starter', 'Stapel Geschud']
+EXPORT_COLUMNS = ['id', 'datum', 'spelers', 'winnaar', 'starter', 'stapel_geschud']
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+NO_LIMIT_ID = 2 ** 63 - 1
+
+# Alleen spellen na het laatste checkpoint; id is de primary key, dus een
+# export van de spellen van één dag leest alleen die rijen
+EXPORT_SQL = """
+    SELECT id, datum, spelers, winnaar, starter, stapel_geschud
+    FROM games WHERE id > {since_id:d} AND id < {until_id:d} ORDER BY id
+"""
+
+# Een lopend spel (zelfde voorwaarde als GameRepository.in_progress) krijgt
+# later nog een winnaar. Een incrementele export stopt daarom vóór het oudste
+# lopende spel; anders schuift het checkpoint erlangs en komt de uitslag
+# nooit in de export. Via idx_games_in_progress (winnaar, datum).
+FIRST_OPEN_GAME_SQL = """
+    SELECT MIN(id) FROM games
+    WHERE winnaar IS NULL AND datum >= '{started_after:s}' AND uuid IS NOT NULL AND id > {since_id:d}
+"""
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def streaming_cursor(conn):
+    """Cursor die rijen van de server haalt terwijl ze gelezen worden.
+
+    pymysql buffert standaard de hele resultaatset in het geheugen; SSCursor
+    doet dat niet. mysql.connector en sqlite3 zijn standaard al unbuffered.
+    """
+    if driver_module(conn).startswith('pymysql'):
+        import pymysql.cursors
+        return conn.cursor(pymysql.cursors.SSCursor)
+    return conn.cursor()
+
+
+def count_games(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM games")
+    total = cursor.fetchone()[0]
+    cursor.close()
+    return total
+
+
+def iter_chunks(cursor, query, chunk_size=EXPORT_CHUNK_SIZE, params=()):
+    cursor.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+class _FileWriter:
+    """Basis voor de tekstformaten; schrijft naar path, eventueel achteraan.
+
+    abort() zet het bestand terug naar de lengte van voor de export (of
+    verwijdert het als het nieuw was), zodat een afgebroken export geen halve
+    rijen achterlaat.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.is_new = not (append and os.path.exists(path))
+        self.start_size = 0 if self.is_new else os.path.getsize(path)
+        self.file = open(path, 'w' if self.is_new else 'a', newline='', encoding='utf-8')
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        if self.is_new:
+            os.remove(self.path)
+        else:
+            os.truncate(self.path, self.start_size)
+
+
+class CsvWriter(_FileWriter):
+    def __init__(self, path, append=False):
+        super().__init__(path, append)
+        self.writer = csv.writer(self.file)
+        if self.is_new:
+            self.writer.writerow(EXPORT_HEADER)
+
+    def write(self, rows):
+        self.writer.writerows(
+            (spel_id, spelers, winnaar or '', starter or '', stapel_geschud)
+            for spel_id, datum, spelers, winnaar, starter, stapel_geschud in rows
+        )
+
+
+class JsonLinesWriter(_FileWriter):
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+class ParquetWriter:
+    """Gecomprimeerde kolomopslag via pyarrow (optioneel).
+
+    Een Parquet-bestand kan niet aangevuld worden. Bij een incrementele export
+    is path daarom een map en levert elke run een eigen bestand
+    games-<eerste id>-<laatste id>.parquet op; samen vormen die een dataset
+    die pyarrow.dataset of pandas in één keer kan lezen.
+    """
+
+    def __init__(self, path, append=False):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet-export vereist pyarrow (pip install pyarrow)") from None
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.append = append
+        self.schema = pyarrow.schema([
+            ('id', pyarrow.int64()),
+            ('datum', pyarrow.string()),
+            ('spelers', pyarrow.string()),
+            ('winnaar', pyarrow.string()),
+            ('starter', pyarrow.string()),
+            ('stapel_geschud', pyarrow.int8()),
+        ])
+        if append:
+            os.makedirs(path, exist_ok=True)
+            self.target = os.path.join(path, '.games-partial.parquet')
+        else:
+            self.target = path
+        self.writer = None
+        self.first_id = None
+        self.last_id = None
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        columns[1] = [None if datum is None else str(datum) for datum in columns[1]]
+        arrays = [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)]
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.target, self.schema, compression='zstd')
+            self.first_id = rows[0][0]
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+        self.last_id = rows[-1][0]
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        if self.append:
+            os.replace(self.target, os.path.join(self.path, f"games-{self.first_id}-{self.last_id}.parquet"))
+
+    def abort(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        os.remove(self.target)
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def export_games(conn, writer, since_id=0, chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel=None, until_id=None):
+    """Stream spellen met id > since_id (en < until_id) in blokken van chunk_size naar writer.
+
+    Het geheugengebruik hangt alleen af van chunk_size, niet van de grootte van
+    games. progress(aantal) wordt na elk blok aangeroepen; is het threading.Event
+    cancel gezet, dan wordt de writer teruggedraaid en volgt ExportCancelled.
+    Geeft (aantal, laatste rij) terug.
+
+    Na een fout of annulering wordt de cursor niet gesloten: een streaming
+    cursor zou dan eerst de rest van de resultaatset lezen. De aanroeper moet
+    de verbinding in dat geval weggooien.
+    """
+    exported = 0
+    last_row = None
+    cursor = streaming_cursor(conn)
+    try:
+        query = EXPORT_SQL.format(since_id=since_id, until_id=NO_LIMIT_ID if until_id is None else until_id)
+        for rows in iter_chunks(cursor, query, chunk_size):
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            writer.write(rows)
+            exported += len(rows)
+            last_row = rows[-1]
+            if progress is not None:
+                progress(exported)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    cursor.close()
+    return exported, last_row
+
+
+def export_games_csv(conn, path, chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel=None):
+    """Schrijf alle spellen naar een nieuw CSV-bestand en geef het aantal terug."""
+    exported, _ = export_games(conn, CsvWriter(path), chunk_size=chunk_size, progress=progress, cancel=cancel)
+    return exported
+
+
+def checkpoint_path_for(path):
+    return path.rstrip(os.sep) + '.checkpoint.json'
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'last_id': 0, 'datum': None}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def first_open_game(conn, since_id, now=None):
+    """Id van het oudste lopende spel na since_id, of None."""
+    started_after = ((now or datetime.now()) - IN_PROGRESS_MAX_AGE).strftime('%Y-%m-%d %H:%M:%S')
+    cursor = conn.cursor()
+    try:
+        cursor.execute(FIRST_OPEN_GAME_SQL.format(started_after=started_after, since_id=since_id))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def export_incremental(conn, path, fmt='csv', checkpoint_path=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Voeg alleen de spellen sinds het vorige checkpoint toe aan path.
+
+    Het checkpoint (laatste id en datum) wordt pas bijgewerkt als de export
+    volledig geschreven is, dus een afgebroken run wordt de volgende keer
+    gewoon overgedaan. Lopende spellen en alles erna wachten tot een volgende
+    run (zie FIRST_OPEN_GAME_SQL). Geeft het aantal nieuwe spellen terug.
+    """
+    checkpoint_path = checkpoint_path or checkpoint_path_for(path)
+    checkpoint = load_checkpoint(checkpoint_path)
+    until_id = first_open_game(conn, checkpoint['last_id'])
+    writer = WRITERS[fmt](path, append=True)
+    exported, last_row = export_games(
+        conn, writer, since_id=checkpoint['last_id'], chunk_size=chunk_size, until_id=until_id,
+    )
+    if last_row is not None:
+        save_checkpoint(checkpoint_path, {
+            'last_id': last_row[0],
+            'datum': None if last_row[1] is None else str(last_row[1]),
+            'format': fmt,
+        })
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m pesten.export', description='Exporteer spellen naar CSV, JSON Lines of Parquet')
+    parser.add_argument('output', help='Doelbestand (bij incrementele Parquet-export een map)')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--full', action='store_true', help='Alles opnieuw exporteren, zonder checkpoint')
+    parser.add_argument('--checkpoint', help='Checkpointbestand (standaard: <output>.checkpoint.json)')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, _ = connect_from_args(args)
+    try:
+        if args.full:
+            exported, _ = export_games(conn, WRITERS[args.format](args.output), chunk_size=args.chunk_size)
+        else:
+            exported = export_incremental(conn, args.output, args.format, args.checkpoint, args.chunk_size)
+        print(f"{exported} spellen geëxporteerd naar {args.output}.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
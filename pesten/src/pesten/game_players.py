@@ -0,0 +1,92 @@
+from pesten.db import sql
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# Eén rij per speler per spel, zodat "welke spellen speelde X" via een index gaat
+# in plaats van FIND_IN_SET/instr over de komma-gescheiden games.spelers.
+GAME_PLAYERS_DDL = {
+    "mysql": [
+        """
+        CREATE TABLE IF NOT EXISTS game_players (
+            game_id INT NOT NULL,
+            speler VARCHAR(255) NOT NULL,
+            is_starter TINYINT(1) NOT NULL DEFAULT 0,
+            is_winner TINYINT(1) NOT NULL DEFAULT 0,
+            PRIMARY KEY (game_id, speler),
+            INDEX idx_game_players_speler (speler, game_id)
+        )
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE TABLE IF NOT EXISTS game_players (
+            game_id INTEGER NOT NULL,
+            speler TEXT NOT NULL,
+            is_starter INTEGER NOT NULL DEFAULT 0,
+            is_winner INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (game_id, speler)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_game_players_speler ON game_players (speler, game_id)",
+    ],
+}
+
+INSERT_SQL = """
+    INSERT INTO game_players (game_id, speler, is_starter, is_winner)
+    VALUES (%s, %s, %s, %s)
+"""
+
+
+def create_game_players(cursor, db_type):
+    for statement in GAME_PLAYERS_DDL[db_type]:
+        cursor.execute(statement)
+
+
+def split_spelers(spelers):
+    seen = []
+    for speler in (spelers or "").split(","):
+        speler = speler.strip()
+        if speler and speler not in seen:
+            seen.append(speler)
+    return seen
+
+
+def player_rows(game_id, spelers, starter=None, winnaar=None):
+    return [(game_id, speler, int(speler == starter), int(speler == winnaar)) for speler in spelers]
+
+
+def backfill_game_players(conn, db_type, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Vul game_players vanuit bestaande games.spelers, in blokken van chunk_size spellen.
+
+    Alleen spellen zonder rijen in game_players worden meegenomen, dus de
+    migratie kan veilig opnieuw draaien. Geeft het aantal aangevulde spellen terug.
+    """
+    cursor = conn.cursor()
+    select = sql(db_type, """
+        SELECT g.id, g.spelers, g.starter, g.winnaar FROM games g
+        WHERE g.id > %s
+          AND NOT EXISTS (SELECT 1 FROM game_players gp WHERE gp.game_id = g.id)
+        ORDER BY g.id
+        LIMIT %s
+    """)
+    last_id = 0
+    backfilled = 0
+    while True:
+        cursor.execute(select, (last_id, chunk_size))
+        games = cursor.fetchall()
+        if not games:
+            break
+        rows = []
+        for game_id, spelers, starter, winnaar in games:
+            rows.extend(player_rows(game_id, split_spelers(spelers), starter, winnaar))
+        if rows:
+            cursor.executemany(sql(db_type, INSERT_SQL), rows)
+        conn.commit()
+        backfilled += len(games)
+        last_id = games[-1][0]
+    cursor.close()
+    return backfilled
+
+
+def add_game_players(cursor, db_type, game_id, spelers, starter=None, winnaar=None):
+    cursor.executemany(sql(db_type, INSERT_SQL), player_rows(game_id, spelers, starter, winnaar))
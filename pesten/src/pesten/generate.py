@@ -0,0 +1,160 @@
+import argparse
+import random
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from pesten.data_version import bump_data_version
+from pesten.db import add_connection_arguments, connect_from_args, sql
+from pesten.events import INSERT_EVENT_SQL, game_event_rows
+from pesten.game_players import INSERT_SQL as GAME_PLAYERS_INSERT_SQL, player_rows
+from pesten.import_games import rebuild_wins
+from pesten.migrations import migrate
+from pesten.players import INSERT_IGNORE_SQL
+from pesten.ratings import recompute_ratings
+
+GENERATE_CHUNK_SIZE = 10000
+
+FIRST_NAMES = [
+    'Anna', 'Bram', 'Cor', 'Daan', 'Eva', 'Fenna', 'Gijs', 'Hanna', 'Iris', 'Joost',
+    'Kees', 'Lotte', 'Mees', 'Noor', 'Otto', 'Pien', 'Quinten', 'Roos', 'Sem', 'Tess',
+    'Umut', 'Vera', 'Wim', 'Xander', 'Yara', 'Zoë',
+]
+
+Dataset = namedtuple('Dataset', ['players', 'games', 'first_game_id', 'last_game_id'])
+
+
+def player_names(count):
+    """count unieke, leesbare namen: Anna, Bram, ..., Anna 2, Bram 2, ..."""
+    return [
+        FIRST_NAMES[i % len(FIRST_NAMES)] + (f" {i // len(FIRST_NAMES) + 1}" if i >= len(FIRST_NAMES) else '')
+        for i in range(count)
+    ]
+
+
+class GameGenerator:
+    """Reproduceerbare spellen zoals een club ze speelt.
+
+    Een paar vaste kern-spelers spelen veel, de rest af en toe (gewichten
+    volgens een Zipf-achtige verdeling). Elke speler heeft een vaste
+    sterkte die de kans op winst bepaalt; de starter wint iets vaker.
+    Spellen liggen gelijkmatig verdeeld over de laatste days dagen.
+    """
+
+    def __init__(self, players, days=365, max_players=6, seed=0):
+        self.rng = random.Random(seed)
+        self.players = players
+        self.max_players = min(max_players, len(players))
+        self.activity = list(accumulate(1 / (rank + 1) for rank in range(len(players))))
+        self.skill = {speler: self.rng.uniform(0.5, 2.0) for speler in players}
+        self.start = datetime.now().replace(microsecond=0) - timedelta(days=days)
+        self.seconds = days * 24 * 3600
+
+    def _participants(self):
+        count = self.rng.randint(2, self.max_players)
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.rng.choices(self.players, cum_weights=self.activity, k=count - len(chosen)))
+        spelers = list(chosen)
+        self.rng.shuffle(spelers)
+        return spelers
+
+    def game(self, datum):
+        """(uuid, datum, spelers, starter, stapel_geschud, winnaar) van één spel."""
+        spelers = self._participants()
+        starter = self.rng.choice(spelers)
+        weights = [self.skill[speler] * (1.2 if speler == starter else 1.0) for speler in spelers]
+        winnaar = self.rng.choices(spelers, weights=weights)[0]
+        shuffles = min(int(self.rng.expovariate(1.5)), 5)
+        return uuid.UUID(int=self.rng.getrandbits(128)).hex, datum, spelers, starter, shuffles, winnaar
+
+    def games(self, count):
+        for offset in range(count):
+            yield self.game(self.start + timedelta(seconds=offset * self.seconds // count))
+
+
+def _next_game_id(cursor):
+    cursor.execute("SELECT MAX(id) FROM games")
+    return (cursor.fetchone()[0] or 0) + 1
+
+
+def generate(conn, db_type, players=200, games=10000, days=365, seed=0, chunk_size=GENERATE_CHUNK_SIZE, progress=None):
+    """Vul de database met players spelers en games afgeronde spellen.
+
+    Spellen worden met eigen ids in transacties van chunk_size geschreven
+    (games, game_players en game_events); scores.wins, player_stats en de
+    ratings worden aan het eind in één keer opnieuw berekend. Bestaande gegevens blijven staan,
+    de nieuwe spellen komen er achteraan. Geeft een Dataset terug.
+    """
+    migrate(conn, db_type)
+    names = player_names(players)
+    generator = GameGenerator(names, days=days, seed=seed)
+
+    insert_game = sql(db_type, """
+        INSERT INTO games (id, uuid, datum, spelers, starter, stapel_geschud, winnaar)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """)
+    insert_players = sql(db_type, GAME_PLAYERS_INSERT_SQL)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(INSERT_IGNORE_SQL[db_type], [(name,) for name in names])
+        conn.commit()
+        first_id = game_id = _next_game_id(cursor)
+        game_rows = []
+        player_rows_chunk = []
+        event_rows = []
+        for game_uuid, datum, spelers, starter, shuffles, winnaar in generator.games(games):
+            datum = datum.strftime('%Y-%m-%d %H:%M:%S')
+            game_rows.append((game_id, game_uuid, datum, ",".join(spelers), starter, shuffles, winnaar))
+            player_rows_chunk.extend(player_rows(game_id, spelers, starter, winnaar))
+            event_rows.extend(game_event_rows(game_id, datum, spelers, starter, shuffles, winnaar))
+            game_id += 1
+            if len(game_rows) >= chunk_size:
+                cursor.executemany(insert_game, game_rows)
+                cursor.executemany(insert_players, player_rows_chunk)
+                cursor.executemany(INSERT_EVENT_SQL[db_type], event_rows)
+                conn.commit()
+                game_rows, player_rows_chunk, event_rows = [], [], []
+                if progress is not None:
+                    progress(game_id - first_id)
+        if game_rows:
+            cursor.executemany(insert_game, game_rows)
+            cursor.executemany(insert_players, player_rows_chunk)
+            cursor.executemany(INSERT_EVENT_SQL[db_type], event_rows)
+        bump_data_version(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+
+    rebuild_wins(conn)
+    recompute_ratings(conn, db_type)
+    return Dataset(players, games, first_id, game_id - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m pesten.generate',
+        description='Vul een database met synthetische spelers en spellen (voor tests en benchmarks)',
+    )
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365, help='Spreiding van de speeldata (standaard: een jaar)')
+    parser.add_argument('--seed', type=int, default=0, help='Zelfde seed geeft dezelfde gegevens')
+    parser.add_argument('--chunk-size', type=int, default=GENERATE_CHUNK_SIZE)
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, db_type = connect_from_args(args)
+    try:
+        dataset = generate(
+            conn, db_type, args.players, args.games, args.days, args.seed, args.chunk_size,
+            progress=lambda done: print(f"\r{done}/{args.games} spellen", end='', flush=True),
+        )
+    finally:
+        conn.close()
+    print(f"\r{dataset.games} spellen (id {dataset.first_game_id}-{dataset.last_game_id}) voor {dataset.players} spelers gegenereerd.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import csv
+import sys
+import time
+import uuid
+from collections import namedtuple
+
+from pesten.data_version import bump_data_version
+from pesten.db import add_connection_arguments, connect_from_args, sql
+from pesten.events import backfill_events
+from pesten.export import EXPORT_HEADER
+from pesten.game_players import INSERT_SQL as GAME_PLAYERS_INSERT_SQL, player_rows, split_spelers
+from pesten.players import INSERT_IGNORE_SQL
+from pesten.ratings import recompute_ratings
+from pesten.session import _ids_by_uuid
+from pesten.stats import rebuild_player_stats
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+ImportResult = namedtuple('ImportResult', ['imported', 'skipped', 'invalid', 'players_added', 'errors'])
+GameRow = namedtuple('GameRow', ['line', 'spel_id', 'spelers', 'winnaar', 'starter', 'stapel_geschud'])
+
+# Eén query per speler via de primary key van player_stats, na de rebuild
+REBUILD_WINS_SQL = """
+    UPDATE scores SET wins = COALESCE(
+        (SELECT ps.wins FROM player_stats ps WHERE ps.speler = scores.speler), 0)
+"""
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def parse_row(line, row, keep_ids=True):
+    """Zet een CSV-rij uit export_games_csv om naar een GameRow of geef InvalidRow."""
+    if len(row) != len(EXPORT_HEADER):
+        raise InvalidRow(f"verwacht {len(EXPORT_HEADER)} kolommen, kreeg {len(row)}")
+    spel_id, spelers, winnaar, starter, stapel_geschud = (value.strip() for value in row)
+
+    if keep_ids or spel_id:
+        try:
+            spel_id = int(spel_id)
+        except ValueError:
+            raise InvalidRow(f"ongeldig Spel ID {spel_id!r}") from None
+        if spel_id <= 0:
+            raise InvalidRow(f"ongeldig Spel ID {spel_id}")
+    spelers = split_spelers(spelers)
+    if not spelers:
+        raise InvalidRow("geen spelers")
+    if winnaar and winnaar not in spelers:
+        raise InvalidRow(f"winnaar {winnaar!r} speelde niet mee")
+    if starter and starter not in spelers:
+        raise InvalidRow(f"starter {starter!r} speelde niet mee")
+    try:
+        stapel_geschud = int(stapel_geschud or 0)
+    except ValueError:
+        raise InvalidRow(f"ongeldige waarde voor Stapel Geschud {stapel_geschud!r}") from None
+    if stapel_geschud < 0:
+        raise InvalidRow(f"ongeldige waarde voor Stapel Geschud {stapel_geschud}")
+    return GameRow(line, spel_id or None, spelers, winnaar or None, starter or None, stapel_geschud)
+
+
+def read_games(stream, keep_ids=True, errors=None):
+    """Lees spellen uit een CSV in het formaat van export_games_csv.
+
+    Ongeldige rijen worden overgeslagen; (regelnummer, melding) komt in errors.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None or [name.strip().lower() for name in header] != [name.lower() for name in EXPORT_HEADER]:
+        raise ValueError(f"Onbekend formaat, verwacht de kolommen: {', '.join(EXPORT_HEADER)}")
+    for row in reader:
+        if not row:
+            continue
+        try:
+            yield parse_row(reader.line_num, row, keep_ids)
+        except InvalidRow as e:
+            if errors is not None:
+                errors.append((reader.line_num, str(e)))
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing_ids(cursor, db_type, ids):
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(sql(db_type, f"SELECT id FROM games WHERE id IN ({placeholders})"), ids)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _insert_chunk(cursor, db_type, games, keep_ids):
+    """Schrijf één chunk weg en geef (geïmporteerd, overgeslagen, nieuwe spelers) terug."""
+    names = {speler for game in games for speler in game.spelers}
+    cursor.executemany(INSERT_IGNORE_SQL[db_type], [(name,) for name in names])
+    players_added = max(cursor.rowcount, 0)
+
+    if keep_ids:
+        # Zelfde id al aanwezig: eerder geïmporteerd, dus overslaan
+        seen = _existing_ids(cursor, db_type, [game.spel_id for game in games])
+        new = []
+        for game in games:
+            if game.spel_id not in seen:
+                seen.add(game.spel_id)
+                new.append(game)
+        cursor.executemany(
+            sql(db_type, "INSERT INTO games (id, spelers, winnaar, starter, stapel_geschud) VALUES (%s, %s, %s, %s, %s)"),
+            [(g.spel_id, ",".join(g.spelers), g.winnaar, g.starter, g.stapel_geschud) for g in new],
+        )
+        ids = [game.spel_id for game in new]
+    else:
+        # Samenvoegen: nieuwe ids, teruggevonden via een uuid per spel
+        new = games
+        uuids = [uuid.uuid4().hex for _ in new]
+        cursor.executemany(
+            sql(db_type, "INSERT INTO games (uuid, spelers, winnaar, starter, stapel_geschud) VALUES (%s, %s, %s, %s, %s)"),
+            [(u, ",".join(g.spelers), g.winnaar, g.starter, g.stapel_geschud) for u, g in zip(uuids, new)],
+        )
+        by_uuid = _ids_by_uuid(cursor, db_type, uuids)
+        ids = [by_uuid[u] for u in uuids]
+
+    rows = []
+    for game_id, game in zip(ids, new):
+        rows.extend(player_rows(game_id, game.spelers, game.starter, game.winnaar))
+    if rows:
+        cursor.executemany(sql(db_type, GAME_PLAYERS_INSERT_SQL), rows)
+    return len(new), len(games) - len(new), players_added
+
+
+def rebuild_wins(conn):
+    """Herbereken player_stats en daarna scores.wins, elk in één query."""
+    rebuild_player_stats(conn)
+    cursor = conn.cursor()
+    cursor.execute(REBUILD_WINS_SQL)
+    bump_data_version(cursor)
+    conn.commit()
+    cursor.close()
+
+
+def import_games(conn, db_type, stream, keep_ids=True, chunk_size=IMPORT_CHUNK_SIZE):
+    """Importeer spellen uit een CSV van export_games_csv in transacties van chunk_size spellen.
+
+    Met keep_ids blijven de Spel ID's behouden (herstel van een back-up; al
+    aanwezige ids worden overgeslagen, dus opnieuw importeren is veilig).
+    Zonder keep_ids krijgen de spellen nieuwe ids (samenvoegen van
+    geschiedenissen). Ontbrekende spelers worden aangemaakt; de events van
+    de nieuwe spellen, scores.wins, player_stats en de ratings worden aan het
+    eind in één keer bijgewerkt.
+    """
+    errors = []
+    imported = skipped = players_added = 0
+    cursor = conn.cursor()
+    try:
+        for games in _chunks(read_games(stream, keep_ids, errors), chunk_size):
+            try:
+                chunk_imported, chunk_skipped, chunk_players = _insert_chunk(cursor, db_type, games, keep_ids)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            imported += chunk_imported
+            skipped += chunk_skipped
+            players_added += chunk_players
+    finally:
+        cursor.close()
+
+    if imported:
+        backfill_events(conn, db_type)
+        rebuild_wins(conn)
+        recompute_ratings(conn, db_type)
+    return ImportResult(imported, skipped, len(errors), players_added, errors[:MAX_REPORTED_ERRORS])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m pesten.import_games', description='Importeer spellen uit een CSV van de export')
+    parser.add_argument('bestand', help="CSV-bestand, '-' voor stdin")
+    parser.add_argument('--merge', action='store_true', help='Nieuwe Spel ID\'s toekennen in plaats van ze te behouden')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, db_type = connect_from_args(args)
+    start = time.perf_counter()
+    try:
+        if args.bestand == '-':
+            result = import_games(conn, db_type, sys.stdin, not args.merge, args.chunk_size)
+        else:
+            with open(args.bestand, 'r', newline='', encoding='utf-8') as f:
+                result = import_games(conn, db_type, f, not args.merge, args.chunk_size)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+
+    for line, message in result.errors:
+        print(f"Regel {line}: {message}")
+    if result.invalid > len(result.errors):
+        print(f"... en nog {result.invalid - len(result.errors)} ongeldige rijen")
+    print(f"{result.imported} spellen geïmporteerd, {result.skipped} al aanwezig, "
+          f"{result.invalid} ongeldig, {result.players_added} nieuwe spelers ({elapsed:.1f} s).")
+
+
+if __name__ == '__main__':
+    main()
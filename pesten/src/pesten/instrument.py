@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# Bovengrenzen van de latency-buckets in milliseconden; de laatste bucket is "meer"
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+DEFAULT_SLOW_QUERY_MS = 100
+
+logger = logging.getLogger('pesten.sql')
+
+
+def _statement_key(query):
+    return " ".join(query.split())
+
+
+class StatementStats:
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms, rows):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for index, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[index] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            'calls': self.calls,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'histogram': {label: count for label, count in zip(labels, self.histogram) if count},
+        }
+
+
+class QueryStats:
+    """Verzamelt per statement aantallen, rijen en een latency-histogram.
+
+    Queries boven slow_query_ms worden met hun parameters gelogd naar de
+    logger 'pesten.sql'. Thread-safe: de database-thread en de export-thread
+    kunnen tegelijk meten.
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.statements = {}
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def record(self, query, params, elapsed_ms, rows):
+        key = _statement_key(query)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.add(elapsed_ms, rows)
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            logger.warning("Trage query (%.1f ms): %s -- parameters: %r", elapsed_ms, key, params)
+
+    def add_rows(self, query, rows):
+        # Rijen die pas bij fetch* binnenkomen tellen mee bij de laatste query
+        with self._lock:
+            stats = self.statements.get(_statement_key(query))
+            if stats is not None:
+                stats.rows += rows
+
+    def summary(self):
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {
+                'slow_query_ms': self.slow_query_ms,
+                'slow_queries': self.slow_queries,
+                'statements': [dict(sql=query, **stats.as_dict()) for query, stats in statements],
+            }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.slow_queries = 0
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._query = None
+
+    def _affected_rows(self):
+        # Bij een SELECT tellen de rijen pas bij fetch*, anders het aantal gewijzigde rijen
+        if self._cursor.description is not None:
+            return 0
+        return max(self._cursor.rowcount, 0)
+
+    def execute(self, query, *args):
+        start = time.perf_counter()
+        try:
+            result = self._cursor.execute(query, *args)
+            # sqlite3 geeft de cursor zelf terug; dan de ingepakte versie
+            return self if result is self._cursor else result
+        finally:
+            self._query = query
+            self._stats.record(query, args[0] if args else None, (time.perf_counter() - start) * 1000, self._affected_rows())
+
+    def executemany(self, query, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_of_params)
+        finally:
+            self._query = query
+            params = seq_of_params[:3] + (['...'] if len(seq_of_params) > 3 else [])
+            self._stats.record(query, params, (time.perf_counter() - start) * 1000, self._affected_rows())
+
+    def _fetched(self, rows):
+        if self._query is not None and rows:
+            self._stats.add_rows(self._query, len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if self._query is not None and row is not None:
+            self._stats.add_rows(self._query, 1)
+        return row
+
+    def fetchmany(self, *args):
+        return self._fetched(self._cursor.fetchmany(*args))
+
+    def fetchall(self):
+        return self._fetched(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Verbinding waarvan elke cursor zijn queries meet; de rest wordt doorgegeven."""
+
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._stats)
+
+    @property
+    def raw_connection(self):
+        return self._conn
+
+    # Snelkoppelingen van sqlite3.Connection
+    def execute(self, query, *args):
+        cursor = self.cursor()
+        cursor.execute(query, *args)
+        return cursor
+
+    def executemany(self, query, seq_of_params):
+        cursor = self.cursor()
+        cursor.executemany(query, seq_of_params)
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def stats_from_environment(environ=os.environ):
+    """QueryStats als PESTEN_SQL_STATS is gezet, anders None (geen meting, geen overhead).
+
+    PESTEN_SLOW_QUERY_MS zet de drempel voor het log van trage queries.
+    """
+    if not environ.get('PESTEN_SQL_STATS'):
+        return None
+    return QueryStats(float(environ.get('PESTEN_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)))
+
+
+def instrument(conn, stats):
+    """Geef conn ingepakt terug als stats meet, anders conn zelf."""
+    if stats is None:
+        return conn
+    return InstrumentedConnection(conn, stats)
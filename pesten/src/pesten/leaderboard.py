@@ -0,0 +1,92 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+LeaderboardRow = namedtuple('LeaderboardRow', ['speler', 'wins', 'games_played', 'percentage'])
+
+# Wins en gespeelde spellen komen allebei uit de incrementeel bijgehouden
+# player_stats, zodat het percentage nooit twee bronnen mengt; scores levert
+# alleen de lijst met spelers. De scorelijst kost zo O(spelers), hoe lang de
+# geschiedenis ook wordt.
+LEADERBOARD_SQL = """
+    SELECT s.speler, COALESCE(ps.wins, 0), COALESCE(ps.games_played, 0)
+    FROM scores s
+    LEFT JOIN player_stats ps ON ps.speler = s.speler
+    ORDER BY 2 DESC, s.speler
+"""
+
+
+def fetch_leaderboard(cursor):
+    """Haal wins, gespeelde spellen en winpercentage van alle spelers op in één query."""
+    cursor.execute(LEADERBOARD_SQL)
+    rows = []
+    for speler, wins, games_played in cursor.fetchall():
+        rows.append(LeaderboardRow(speler, wins, games_played, _percentage(wins, games_played)))
+    return rows
+
+
+def _percentage(wins, games_played):
+    return (wins / games_played) * 100 if games_played > 0 else 0.0
+
+
+def _sort_key(row):
+    # Zelfde volgorde als LEADERBOARD_SQL: meeste wins eerst, dan op naam
+    return (-row.wins, row.speler)
+
+
+class LeaderboardModel:
+    """De scorelijst in het geheugen, gesorteerd zoals LEADERBOARD_SQL.
+
+    Na een spel past apply_game alleen de rijen van de deelnemers aan en
+    schuift die met bisect naar hun nieuwe plek. Listeners krijgen per rij
+    een melding (insert, remove, change) of bij load één reset, zodat een
+    tabel alleen de gewijzigde rijen opnieuw tekent, hoeveel spelers er
+    ook zijn.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self._keys = []
+        self._by_speler = {}
+        self.listeners = []
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    def load(self, rows):
+        self.rows = sorted(rows, key=_sort_key)
+        self._keys = [_sort_key(row) for row in self.rows]
+        self._by_speler = {row.speler: row for row in self.rows}
+        self.loaded = True
+        for listener in self.listeners:
+            listener.reset(self.rows)
+
+    def get(self, speler):
+        return self._by_speler.get(speler)
+
+    def apply_game(self, spelers, winnaar):
+        """Verwerk een afgelopen spel: één gespeeld spel erbij, de winnaar één win."""
+        for speler in dict.fromkeys(spelers):
+            old = self._by_speler.get(speler)
+            games_played = (old.games_played if old else 0) + 1
+            wins = (old.wins if old else 0) + (1 if speler == winnaar else 0)
+            self._put(old, LeaderboardRow(speler, wins, games_played, _percentage(wins, games_played)))
+
+    def _put(self, old, row):
+        old_index = None
+        if old is not None:
+            old_index = bisect_left(self._keys, _sort_key(old))
+            del self.rows[old_index]
+            del self._keys[old_index]
+        key = _sort_key(row)
+        index = bisect_left(self._keys, key)
+        self.rows.insert(index, row)
+        self._keys.insert(index, key)
+        self._by_speler[row.speler] = row
+        for listener in self.listeners:
+            if index == old_index:
+                listener.change(index, row)
+            else:
+                if old_index is not None:
+                    listener.remove(old_index)
+                listener.insert(index, row)
@@ -0,0 +1,237 @@
+from pesten.data_version import create_data_version
+from pesten.db import sql
+from pesten.events import backfill_events, create_game_events
+from pesten.game_players import backfill_game_players, create_game_players
+from pesten.ratings import create_ratings, recompute_ratings
+from pesten.stats import create_player_stats, ensure_player_stats
+from pesten.sync import create_outbox
+
+# Versiebeheer van het schema. Bij het opstarten is één SELECT op
+# schema_version genoeg zolang de database al bij is; alleen ontbrekende
+# migraties worden uitgevoerd. Elke migratie is ook veilig op een database
+# die nog met de oude ensure_columns/add_starter.py is aangemaakt.
+
+SCHEMA_VERSION_DDL = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+def _columns(cursor, db_type, table):
+    if db_type == "sqlite":
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in cursor.fetchall()}
+    cursor.execute(f"SHOW COLUMNS FROM {table}")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _indexes(cursor, db_type, table):
+    if db_type == "sqlite":
+        cursor.execute(f"PRAGMA index_list({table})")
+        return {row[1] for row in cursor.fetchall()}
+    cursor.execute(f"SHOW INDEX FROM {table}")
+    return {row[2] for row in cursor.fetchall()}
+
+
+def create_base_tables(conn, cursor, db_type):
+    if db_type == "sqlite":
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                speler TEXT PRIMARY KEY,
+                wins INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS games (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                spelers TEXT NOT NULL,
+                winnaar TEXT
+            )
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                speler VARCHAR(255) PRIMARY KEY,
+                wins INT DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS games (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                spelers TEXT NOT NULL,
+                winnaar VARCHAR(255)
+            )
+        """)
+
+
+def add_game_columns(conn, cursor, db_type):
+    # init.py maakte games ooit aan met alleen een id
+    columns = _columns(cursor, db_type, "games")
+    if db_type == "sqlite":
+        wanted = [
+            ("datum", "TIMESTAMP"),
+            ("spelers", "TEXT NOT NULL DEFAULT ''"),
+            ("winnaar", "TEXT"),
+            ("starter", "TEXT"),
+            ("stapel_geschud", "INTEGER DEFAULT 0"),
+        ]
+    else:
+        wanted = [
+            ("datum", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+            ("spelers", "TEXT NOT NULL"),
+            ("winnaar", "VARCHAR(255)"),
+            ("starter", "VARCHAR(255)"),
+            ("stapel_geschud", "TINYINT(1) DEFAULT 0"),
+        ]
+    for name, definition in wanted:
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE games ADD COLUMN {name} {definition}")
+
+
+def add_game_players(conn, cursor, db_type):
+    create_game_players(cursor, db_type)
+    conn.commit()
+    backfill_game_players(conn, db_type)
+
+
+def add_player_stats(conn, cursor, db_type):
+    create_player_stats(cursor, db_type)
+    conn.commit()
+    ensure_player_stats(conn)
+
+
+def add_game_uuid(conn, cursor, db_type):
+    if "uuid" in _columns(cursor, db_type, "games"):
+        return
+    if db_type == "sqlite":
+        cursor.execute("ALTER TABLE games ADD COLUMN uuid TEXT")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_games_uuid ON games (uuid)")
+    else:
+        cursor.execute("ALTER TABLE games ADD COLUMN uuid CHAR(32) NULL, ADD UNIQUE INDEX idx_games_uuid (uuid)")
+
+
+def add_outbox(conn, cursor, db_type):
+    # De outbox bestaat alleen in de lokale SQLite van de app
+    if db_type == "sqlite":
+        create_outbox(cursor)
+
+
+def add_game_indexes(conn, cursor, db_type):
+    # Voor zoeken op winnaar/starter en op periode (spellen van vandaag, deze week)
+    existing = _indexes(cursor, db_type, "games")
+    for name, column in [
+        ("idx_games_winnaar", "winnaar"),
+        ("idx_games_starter", "starter"),
+        ("idx_games_datum", "datum"),
+    ]:
+        if name not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON games ({column})")
+
+
+def add_player_search_index(conn, cursor, db_type):
+    # Zoeken met LIKE 'abc%' is hoofdletterongevoelig; SQLite gebruikt daarvoor
+    # alleen een NOCASE-index. In MySQL dekt de primary key dit al.
+    if db_type == "sqlite":
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scores_speler_nocase ON scores (speler COLLATE NOCASE)")
+
+
+def add_data_version(conn, cursor, db_type):
+    create_data_version(cursor, db_type)
+
+
+def add_in_progress_index(conn, cursor, db_type):
+    # Lopende spellen herstellen: WHERE winnaar IS NULL AND datum >= ...
+    # Zoeken op winnaar kan ook via deze index, dus idx_games_winnaar vervalt.
+    existing = _indexes(cursor, db_type, "games")
+    if "idx_games_in_progress" not in existing:
+        cursor.execute("CREATE INDEX idx_games_in_progress ON games (winnaar, datum)")
+    if "idx_games_winnaar" in existing:
+        cursor.execute("DROP INDEX idx_games_winnaar" if db_type == "sqlite" else "DROP INDEX idx_games_winnaar ON games")
+
+
+def add_game_events(conn, cursor, db_type):
+    create_game_events(cursor, db_type)
+    conn.commit()
+    backfill_events(conn, db_type)
+
+
+def add_ratings(conn, cursor, db_type):
+    create_ratings(cursor, db_type)
+    conn.commit()
+    recompute_ratings(conn, db_type)
+
+
+def add_event_type_index(conn, cursor, db_type):
+    # recompute_ratings leest de winner_set-events op volgorde van id
+    if "idx_game_events_type" not in _indexes(cursor, db_type, "game_events"):
+        cursor.execute("CREATE INDEX idx_game_events_type ON game_events (event_type, id)")
+
+
+MIGRATIONS = [
+    (1, "scores en games", create_base_tables),
+    (2, "kolommen starter en stapel_geschud", add_game_columns),
+    (3, "game_players met index op speler", add_game_players),
+    (4, "player_stats", add_player_stats),
+    (5, "games.uuid met unieke index", add_game_uuid),
+    (6, "outbox voor offline spellen", add_outbox),
+    (7, "indexen op games.winnaar, starter en datum", add_game_indexes),
+    (8, "index voor zoeken op spelersnaam", add_player_search_index),
+    (9, "data_version voor de statistiekencache", add_data_version),
+    (10, "index voor lopende spellen", add_in_progress_index),
+    (11, "game_events en stats_snapshots", add_game_events),
+    (12, "Elo-ratings per speler", add_ratings),
+    (13, "index op game_events.event_type", add_event_type_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchone()[0] or 0
+    except Exception:
+        # Nog geen schema_version: database van voor de migraties (of leeg)
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+
+
+def migrate(conn, db_type, log=None):
+    """Breng het schema naar LATEST_VERSION en geef de uiteindelijke versie terug."""
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SCHEMA_VERSION_DDL[db_type])
+        record = sql(db_type, "INSERT INTO schema_version (version, description) VALUES (%s, %s)")
+        for number, description, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            if log:
+                log(f"Migratie {number}: {description}")
+            apply(conn, cursor, db_type)
+            cursor.execute(record, (number, description))
+            conn.commit()
+            version = number
+    finally:
+        cursor.close()
+    return version
@@ -0,0 +1,138 @@
+import csv
+
+from pesten.data_version import bump_data_version
+
+IMPORT_CHUNK_SIZE = 1000
+PICKER_PAGE_SIZE = 50
+
+INSERT_IGNORE_SQL = {
+    "mysql": "INSERT IGNORE INTO scores (speler, wins) VALUES (%s, 0)",
+    "sqlite": "INSERT OR IGNORE INTO scores (speler, wins) VALUES (?, 0)",
+}
+
+HEADER_NAMES = {'speler', 'spelers', 'naam', 'name'}
+
+
+def read_player_names(stream):
+    """Lees spelersnamen uit een CSV- of tekstbestand: de eerste kolom van elke regel."""
+    for index, row in enumerate(csv.reader(stream)):
+        if not row:
+            continue
+        name = row[0].strip()
+        if not name:
+            continue
+        if index == 0 and name.lower() in HEADER_NAMES:
+            continue
+        yield name
+
+
+def import_players(conn, db_type, names, chunk_size=IMPORT_CHUNK_SIZE):
+    """Voeg spelers in bulk toe en geef (toegevoegd, overgeslagen) terug.
+
+    Dubbele namen in de invoer worden in het geheugen weggefilterd; namen die
+    al in de database staan slaat INSERT IGNORE over. Elke chunk is één
+    transactie.
+    """
+    seen = set()
+    unique = []
+    total = 0
+    for name in names:
+        total += 1
+        if name not in seen:
+            seen.add(name)
+            unique.append((name,))
+
+    inserted = 0
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(unique), chunk_size):
+            cursor.executemany(INSERT_IGNORE_SQL[db_type], unique[start:start + chunk_size])
+            inserted += max(cursor.rowcount, 0)
+            bump_data_version(cursor)
+            conn.commit()
+    finally:
+        cursor.close()
+    return inserted, total - inserted
+
+
+# Actiefste spelers eerst: laatst gespeeld, dan meeste spellen
+RANKING_SQL = """
+    SELECT s.speler FROM scores s
+    LEFT JOIN player_stats ps ON ps.speler = s.speler
+    ORDER BY ps.last_played DESC, ps.games_played DESC, s.speler
+"""
+
+# Het voorvoegsel gaat via de index op speler; alleen de treffers worden
+# gesorteerd. SQLite krijgt een bereik op idx_scores_speler_nocase in plaats
+# van LIKE: met een ESCAPE-clausule slaan oudere SQLite-versies de
+# LIKE-optimalisatie over en lezen ze bij elke toetsaanslag de hele tabel.
+SEARCH_SQL = {
+    "mysql": """
+        SELECT s.speler FROM scores s
+        LEFT JOIN player_stats ps ON ps.speler = s.speler
+        WHERE s.speler LIKE %s ESCAPE '!'
+        ORDER BY ps.last_played DESC, ps.games_played DESC, s.speler
+        LIMIT %s OFFSET %s
+    """,
+    "sqlite": """
+        SELECT s.speler FROM scores s
+        LEFT JOIN player_stats ps ON ps.speler = s.speler
+        WHERE s.speler COLLATE NOCASE >= ? AND s.speler COLLATE NOCASE < ?
+        ORDER BY ps.last_played DESC, ps.games_played DESC, s.speler
+        LIMIT ? OFFSET ?
+    """,
+}
+
+
+def like_prefix(prefix):
+    """LIKE-patroon voor alles wat met prefix begint, met % en _ letterlijk."""
+    return prefix.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+
+
+def nocase_range(prefix):
+    """(ondergrens, bovengrens) waarbinnen alles valt dat met prefix begint, volgens NOCASE.
+
+    NOCASE vouwt alleen A-Z naar kleine letters; de bovengrens is het
+    gevouwen voorvoegsel met het laatste teken één hoger.
+    """
+    folded = ''.join(chr(ord(char) + 32) if 'A' <= char <= 'Z' else char for char in prefix)
+    return folded, folded[:-1] + chr(ord(folded[-1]) + 1)
+
+
+def search_params(db_type, prefix):
+    if db_type == "sqlite":
+        return nocase_range(prefix)
+    return (like_prefix(prefix),)
+
+
+class PlayerDirectory:
+    """Pagina's spelers voor de spelerskiezer.
+
+    Zonder zoekterm komt de pagina uit een gecachte volgorde op activiteit
+    (één query, daarna alleen slicen); invalidate() na een gespeeld spel.
+    Met zoekterm wordt alleen de gevraagde pagina opgehaald.
+    """
+
+    def __init__(self, page_size=PICKER_PAGE_SIZE):
+        self.page_size = page_size
+        self._ranking = None
+
+    def invalidate(self):
+        self._ranking = None
+
+    def page(self, conn, db_type, prefix='', page=0):
+        """Geef (namen, is er een volgende pagina) terug."""
+        prefix = prefix.strip()
+        start = page * self.page_size
+        cursor = conn.cursor()
+        try:
+            if not prefix:
+                if self._ranking is None:
+                    cursor.execute(RANKING_SQL)
+                    self._ranking = [row[0] for row in cursor.fetchall()]
+                return self._ranking[start:start + self.page_size], len(self._ranking) > start + self.page_size
+            cursor.execute(SEARCH_SQL[db_type], search_params(db_type, prefix) + (self.page_size + 1, start))
+            names = [row[0] for row in cursor.fetchall()]
+            return names[:self.page_size], len(names) > self.page_size
+        finally:
+            cursor.close()
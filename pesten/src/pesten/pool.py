@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from pesten.db import SQLITE_KEYS
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_CONNECT_TIMEOUT = 5
+PROBE_CONNECT_TIMEOUT = 2  # seconden voor de bereikbaarheidstest bij opstarten en in offline modus
+DEFAULT_READ_TIMEOUT = 15
+
+# Sleutels in db_config.json die voor de pool bedoeld zijn en niet voor de driver
+POOL_KEYS = ('pool_size', 'connect_timeout', 'read_timeout')
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.failed_pings = 0
+        self.connect_failures = 0
+
+    def as_dict(self):
+        return {
+            'hits': self.hits,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failed_pings': self.failed_pings,
+            'connect_failures': self.connect_failures,
+        }
+
+
+class ConnectionPool:
+    """Kleine pool van MySQL-verbindingen met ping-voor-gebruik en reconnect.
+
+    Werkt met zowel pymysql als mysql.connector: beide hebben ping(reconnect=...).
+    Een verbinding die niet meer op ping reageert (wait_timeout van de server,
+    weggevallen wifi) wordt weggegooid en vervangen door een nieuwe, met
+    begrensde exponentiële backoff tussen de pogingen. Die retries gelden
+    alleen als de pool al eens verbonden was; zolang dat niet zo is, is één
+    mislukte poging genoeg om de server onbereikbaar te noemen.
+    """
+
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE, max_retries=3, backoff=0.5, max_backoff=4.0, sleep=time.sleep,
+                 probe_connect=None):
+        self._connect = connect
+        self._probe_connect = probe_connect or connect
+        self._size = size
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._sleep = sleep
+        self._idle = []
+        self._lock = threading.Lock()
+        self.metrics = PoolMetrics()
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+
+        if conn is not None:
+            if self._is_alive(conn):
+                self.metrics.hits += 1
+                return conn
+            self.metrics.failed_pings += 1
+            self._close(conn)
+            return self._open(reconnect=True)
+
+        return self._open()
+
+    def release(self, conn):
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # Verbinding in onbekende staat: niet teruggeven aan de pool
+            self._close(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def probe(self):
+        """Eén verbindingspoging met de korte probe-timeout, zonder retries.
+
+        Gooit de fout van de driver door als de server onbereikbaar is; anders
+        gaat de verbinding de pool in en werkt de pool daarna met retries.
+        """
+        try:
+            conn = self._probe_connect()
+        except Exception:
+            self.metrics.connect_failures += 1
+            raise
+        self.metrics.connects += 1
+        self.release(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    def _open(self, reconnect=False):
+        delay = self._backoff
+        attempts = self._max_retries if self.metrics.connects else 1
+        for attempt in range(attempts):
+            try:
+                conn = self._connect()
+            except Exception:
+                self.metrics.connect_failures += 1
+                if attempt == attempts - 1:
+                    raise
+                self._sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+                continue
+            self.metrics.connects += 1
+            if reconnect or attempt > 0:
+                self.metrics.reconnects += 1
+            return conn
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def mysql_connect_factory(db_config, driver, connect_timeout=None):
+    """Maak een connect-functie voor pymysql of mysql.connector met de timeouts uit db_config.
+
+    connect_timeout gaat voor die uit db_config (zie create_pool voor de probe).
+    """
+    options = {key: value for key, value in db_config.items() if key not in POOL_KEYS + SQLITE_KEYS}
+    if connect_timeout is None:
+        connect_timeout = db_config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)
+    read_timeout = db_config.get('read_timeout', DEFAULT_READ_TIMEOUT)
+
+    if driver.__name__ == 'pymysql':
+        options.update(connect_timeout=connect_timeout, read_timeout=read_timeout, write_timeout=read_timeout)
+    else:
+        # mysql.connector kent alleen een verbindingstimeout die ook voor lezen geldt
+        options.update(connection_timeout=max(connect_timeout, read_timeout))
+
+    def connect():
+        return driver.connect(**options)
+
+    return connect
+
+
+def create_pool(db_config, driver, wrap=None):
+    """Pool voor db_config; wrap(conn) kan elke nieuwe verbinding inpakken (zie instrument.py)."""
+    connect = mysql_connect_factory(db_config, driver)
+    probe_timeout = min(PROBE_CONNECT_TIMEOUT, db_config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT))
+    probe_connect = mysql_connect_factory(db_config, driver, connect_timeout=probe_timeout)
+    if wrap is not None:
+        connect = _wrapped(connect, wrap)
+        probe_connect = _wrapped(probe_connect, wrap)
+
+    return ConnectionPool(connect, size=db_config.get('pool_size', DEFAULT_POOL_SIZE), probe_connect=probe_connect)
+
+
+def _wrapped(connect, wrap):
+    def wrapped_connect():
+        return wrap(connect())
+
+    return wrapped_connect
@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import time
+from datetime import datetime
+
+UI_PROFILE_FILENAME = 'ui-profile.jsonl'
+
+_current = contextvars.ContextVar('pesten_handler_record', default=None)
+
+
+class HandlerRecord:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.db_seconds = 0.0
+
+    def add_db_time(self, seconds):
+        record = self
+        while record is not None:
+            record.db_seconds += seconds
+            record = record.parent
+
+
+class HandlerProfiler:
+    """Meet per Toga-handler de totale tijd, gesplitst in database- en UI-tijd.
+
+    Elke aanroep wordt als JSON-regel toegevoegd aan path. Database-tijd komt
+    van DatabaseExecutor.timer; de rest (widgets bouwen, layout) is UI-tijd.
+    Taken die een handler start erven zijn meting via contextvars, dus
+    ook de scores die show_main_screen op de achtergrond laadt tellen mee.
+
+    Met cprofile_handler wordt de eerstvolgende aanroep van die handler ook
+    met cProfile gemeten (<handler>-<tijd>.prof naast path, te lezen met
+    pstats of snakeviz). cProfile ziet alleen de UI-thread; het werk op de
+    database-thread staat als wachttijd in het profiel.
+    """
+
+    def __init__(self, path, cprofile_handler=None):
+        self.path = path
+        self.cprofile_handler = cprofile_handler
+
+    def add_db_time(self, seconds):
+        record = _current.get()
+        if record is not None:
+            record.add_db_time(seconds)
+
+    def wrap(self, handler, name=None):
+        name = name or handler.__name__
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                record, token, profile, start = self._start(name)
+                try:
+                    return await handler(*args, **kwargs)
+                finally:
+                    self._finish(record, token, profile, start)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            record, token, profile, start = self._start(name)
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self._finish(record, token, profile, start)
+        return wrapper
+
+    def wrap_methods(self, obj, names):
+        """Vervang de methodes names van obj door gemeten versies.
+
+        Knoppen die daarna gemaakt worden (on_press=self.show_scores) krijgen
+        zo automatisch de gemeten versie; zonder profiler verandert er niets.
+        """
+        for name in names:
+            setattr(obj, name, self.wrap(getattr(obj, name), name))
+
+    def _start(self, name):
+        record = HandlerRecord(name, _current.get())
+        token = _current.set(record)
+        profile = None
+        if name == self.cprofile_handler:
+            self.cprofile_handler = None  # één keer profileren
+            profile = cProfile.Profile()
+            profile.enable()
+        return record, token, profile, time.perf_counter()
+
+    def _finish(self, record, token, profile, start):
+        wall = time.perf_counter() - start
+        _current.reset(token)
+        entry = {
+            'handler': record.name,
+            'parent': record.parent.name if record.parent else None,
+            'wall_ms': round(wall * 1000, 3),
+            'db_ms': round(record.db_seconds * 1000, 3),
+            'ui_ms': round(max(wall - record.db_seconds, 0.0) * 1000, 3),
+            'time': datetime.now().isoformat(timespec='seconds'),
+        }
+        if profile is not None:
+            profile.disable()
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            profile_path = os.path.join(os.path.dirname(self.path), f"{record.name}-{stamp}.prof")
+            profile.dump_stats(profile_path)
+            entry['cprofile'] = profile_path
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+def summarize(path):
+    """Gemiddelde en maximale tijden per handler uit een ui-profile.jsonl."""
+    totals = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            stats = totals.setdefault(entry['handler'], {'calls': 0, 'wall_ms': 0.0, 'db_ms': 0.0, 'ui_ms': 0.0, 'max_wall_ms': 0.0})
+            stats['calls'] += 1
+            for key in ('wall_ms', 'db_ms', 'ui_ms'):
+                stats[key] += entry[key]
+            stats['max_wall_ms'] = max(stats['max_wall_ms'], entry['wall_ms'])
+    return {
+        handler: {
+            'calls': stats['calls'],
+            'mean_wall_ms': round(stats['wall_ms'] / stats['calls'], 3),
+            'mean_db_ms': round(stats['db_ms'] / stats['calls'], 3),
+            'mean_ui_ms': round(stats['ui_ms'] / stats['calls'], 3),
+            'max_wall_ms': stats['max_wall_ms'],
+        }
+        for handler, stats in sorted(totals.items(), key=lambda item: item[1]['wall_ms'], reverse=True)
+    }
+
+
+def profiler_from_environment(directory, environ=os.environ):
+    """HandlerProfiler als PESTEN_PROFILE_UI is gezet, anders None.
+
+    PESTEN_PROFILE_HANDLER=<naam> laat de eerste aanroep van die handler ook
+    met cProfile meten.
+    """
+    if not environ.get('PESTEN_PROFILE_UI'):
+        return None
+    return HandlerProfiler(os.path.join(directory, UI_PROFILE_FILENAME), environ.get('PESTEN_PROFILE_HANDLER') or None)
+
+
+if __name__ == '__main__':
+    import sys
+    print(json.dumps(summarize(sys.argv[1] if len(sys.argv) > 1 else UI_PROFILE_FILENAME), indent=2))
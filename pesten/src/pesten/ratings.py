@@ -0,0 +1,229 @@
+import argparse
+import math
+from collections import namedtuple
+
+from pesten.db import add_connection_arguments, connect_from_args, sql
+from pesten.game_players import split_spelers
+
+# Elo voor spellen met meer spelers en één winnaar: de winnaar heeft van
+# elke andere speler gewonnen, de verliezers onderling spelen gelijk op.
+# Per paar gaat K / (n - 1) punten om, zodat een spel met zes spelers niet
+# zwaarder weegt dan een spel met twee. Het totaal blijft gelijk: wat de
+# winnaar erbij krijgt, verliezen de anderen samen.
+DEFAULT_RATING = 1500.0
+K_FACTOR = 32.0
+RECOMPUTE_CHUNK_SIZE = 20000
+
+# 1 / (1 + 10 ** (verschil / 400)) met exp in plaats van een macht
+_SCALE = math.log(10) / 400
+
+Rating = namedtuple('Rating', ['speler', 'rating', 'games'])
+
+RATINGS_DDL = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS ratings (
+            speler VARCHAR(255) PRIMARY KEY,
+            rating DOUBLE NOT NULL,
+            games INT NOT NULL DEFAULT 0
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS ratings (
+            speler TEXT PRIMARY KEY,
+            rating REAL NOT NULL,
+            games INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+}
+
+UPSERT_RATING_SQL = {
+    "mysql": """
+        INSERT INTO ratings (speler, rating, games) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE rating = VALUES(rating), games = VALUES(games)
+    """,
+    "sqlite": """
+        INSERT INTO ratings (speler, rating, games) VALUES (?, ?, ?)
+        ON CONFLICT(speler) DO UPDATE SET rating = excluded.rating, games = excluded.games
+    """,
+}
+
+# Spellen worden beoordeeld in de volgorde waarin ze afgerond zijn: die van
+# hun winner_set-event. Met meerdere tafels tegelijk is dat een andere
+# volgorde dan die van games.datum (het begin van het spel). De winnaar
+# komt uit games, zodat een correctie achteraf meetelt. Via
+# idx_game_events_type (event_type, id).
+FINISHED_GAMES_SQL = """
+    SELECT e.id, g.spelers, g.winnaar
+    FROM game_events e
+    JOIN games g ON g.id = e.game_id
+    WHERE e.event_type = 'winner_set' AND e.id > %s AND g.winnaar IS NOT NULL
+    ORDER BY e.id LIMIT %s
+"""
+
+
+def create_ratings(cursor, db_type):
+    cursor.execute(RATINGS_DDL[db_type])
+
+
+def rate_game(ratings, played, spelers, winnaar, k=K_FACTOR):
+    """Werk ratings en played (dicts per speler) bij voor één afgerond spel.
+
+    Alle paren worden met de ratings van vóór het spel berekend.
+    """
+    if len(spelers) < 2 or winnaar not in spelers:
+        return
+    rating_winner = ratings.get(winnaar, DEFAULT_RATING)
+    step = k / (len(spelers) - 1)
+    gain = 0.0
+    for speler in spelers:
+        played[speler] = played.get(speler, 0) + 1
+        if speler == winnaar:
+            continue
+        rating = ratings.get(speler, DEFAULT_RATING)
+        # step * (1 - verwachte score van de winnaar tegen deze speler)
+        delta = step / (1.0 + math.exp((rating_winner - rating) * _SCALE))
+        ratings[speler] = rating - delta
+        gain += delta
+    ratings[winnaar] = rating_winner + gain
+
+
+def update_ratings(cursor, db_type, games):
+    """Verwerk (spelers, winnaar)-paren op volgorde in ratings, zonder commit.
+
+    Leest alleen de ratings van de betrokken spelers; op MySQL met FOR UPDATE,
+    zodat twee clients die tegelijk een spel van dezelfde speler opslaan
+    elkaars update niet overschrijven. Roep dit aan vóór het opslaan van de
+    winner_set-events: dan krijgen spellen met gedeelde spelers hun event-id
+    in dezelfde volgorde als hun rating-update, zoals recompute_ratings ze
+    afspeelt.
+    """
+    names = sorted({speler for spelers, _ in games for speler in spelers})
+    if not names:
+        return
+    placeholders = ", ".join(["%s"] * len(names))
+    lock = " FOR UPDATE" if db_type == "mysql" else ""
+    cursor.execute(sql(db_type, f"SELECT speler, rating, games FROM ratings WHERE speler IN ({placeholders}){lock}"), names)
+    ratings = {}
+    played = {}
+    for speler, rating, count in cursor.fetchall():
+        ratings[speler] = rating
+        played[speler] = count
+    for spelers, winnaar in games:
+        rate_game(ratings, played, spelers, winnaar)
+    cursor.executemany(
+        UPSERT_RATING_SQL[db_type],
+        [(speler, ratings.get(speler, DEFAULT_RATING), played.get(speler, 0)) for speler in names],
+    )
+
+
+def iter_rated_games(conn, db_type, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """(spelers-tekst, winnaar) van alle afgeronde spellen, in volgorde van afronden, in batches."""
+    query = sql(db_type, FINISHED_GAMES_SQL)
+    last_id = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(query, (last_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield [(spelers, winnaar) for _, spelers, winnaar in rows]
+            if len(rows) < chunk_size:
+                break
+            last_id = rows[-1][0]
+    finally:
+        cursor.close()
+
+
+def _split_fast(spelers):
+    """split_spelers, maar zonder strip en dubbelcheck als de tekst al netjes is."""
+    names = spelers.split(",")
+    if spelers != spelers.strip() or ", " in spelers or " ," in spelers or "" in names or len(set(names)) != len(names):
+        return split_spelers(spelers)
+    return names
+
+
+def recompute_ratings(conn, db_type, k=K_FACTOR, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """Bereken alle ratings opnieuw door de hele geschiedenis opnieuw af te spelen.
+
+    Eén doorloop in volgorde van afronden (zie FINISHED_GAMES_SQL), in
+    keyset-batches; dezelfde volgorde als de incrementele updates. Elo is per spel sequentieel
+    (elk spel gebruikt de ratings van het vorige), dus de winst zit in een
+    strakke lus: rate_game staat hier ingevouwen, met lokale namen en zonder
+    aanroep per spel. Vervangt de tabel ratings in één transactie en geeft
+    het aantal beoordeelde spellen terug.
+    """
+    ratings = {}
+    played = {}
+    get_rating = ratings.get
+    get_played = played.get
+    exp = math.exp
+    scale = _SCALE
+    games = 0
+    for batch in iter_rated_games(conn, db_type, chunk_size):
+        for spelers, winnaar in batch:
+            names = _split_fast(spelers)
+            if len(names) < 2 or winnaar not in names:
+                continue
+            games += 1
+            rating_winner = get_rating(winnaar, DEFAULT_RATING)
+            step = k / (len(names) - 1)
+            gain = 0.0
+            for speler in names:
+                played[speler] = get_played(speler, 0) + 1
+                if speler == winnaar:
+                    continue
+                rating = get_rating(speler, DEFAULT_RATING)
+                delta = step / (1.0 + exp((rating_winner - rating) * scale))
+                ratings[speler] = rating - delta
+                gain += delta
+            ratings[winnaar] = rating_winner + gain
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM ratings")
+        cursor.executemany(
+            sql(db_type, "INSERT INTO ratings (speler, rating, games) VALUES (%s, %s, %s)"),
+            [(speler, get_rating(speler, DEFAULT_RATING), count) for speler, count in played.items()],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return games
+
+
+def fetch_ratings(cursor, limit=None):
+    """Ratings van hoog naar laag, als Rating."""
+    cursor.execute("SELECT speler, rating, games FROM ratings ORDER BY rating DESC, speler" + (f" LIMIT {int(limit)}" if limit else ""))
+    return [Rating(*row) for row in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m pesten.ratings', description='Elo-ratings van de spelers')
+    parser.add_argument('command', choices=['recompute', 'top'], help=(
+        'recompute: alle ratings opnieuw berekenen uit games; top: de hoogste ratings tonen'
+    ))
+    parser.add_argument('--limit', type=int, default=20)
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, db_type = connect_from_args(args)
+    try:
+        if args.command == 'recompute':
+            print(f"Ratings berekend uit {recompute_ratings(conn, db_type)} spellen.")
+        else:
+            cursor = conn.cursor()
+            try:
+                for rank, rating in enumerate(fetch_ratings(cursor, args.limit), start=1):
+                    print(f"{rank:>3}. {rating.speler:<25} {rating.rating:>7.0f}  ({rating.games} spellen)")
+            finally:
+                cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import time
+
+from pesten.data_version import BUMP_SQL
+from pesten.db import driver_module, is_transient_error, sql
+from pesten.events import INSERT_EVENT_SQL, RESULT_CORRECTED, append_event, rebuild_from_events, session_event_rows, \
+    unsaved_event_rows
+from pesten.game_players import split_spelers
+from pesten.leaderboard import fetch_leaderboard
+from pesten.ratings import recompute_ratings
+from pesten.session import GameSession, write_games
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 0.05  # seconden, verdubbelt per poging
+
+# Alle SQL van de repository, één keer per backend vertaald. Omdat elke
+# aanroep exact dezelfde string gebruikt, hergebruikt sqlite3 de voorbereide
+# statement uit zijn statement-cache (cached_statements) en hoeft de query
+# niet opnieuw geparsed te worden.
+_QUERIES = {
+    'players': "SELECT speler FROM scores ORDER BY speler",
+    'game': "SELECT spelers, starter, stapel_geschud, winnaar FROM games WHERE id = %s",
+    'set_starter_players': "UPDATE game_players SET is_starter = CASE WHEN speler = %s THEN 1 ELSE 0 END WHERE game_id = %s",
+    'set_open_starter': "UPDATE games SET starter = %s WHERE id = %s AND winnaar IS NULL",
+    'correct_winner': "UPDATE games SET winnaar = %s WHERE id = %s AND winnaar = %s",
+    'record_winner_players': "UPDATE game_players SET is_winner = CASE WHEN speler = %s THEN 1 ELSE 0 END WHERE game_id = %s",
+    # Via idx_games_in_progress (winnaar, datum): alleen de open spellen van
+    # de laatste uren, hoe groot games ook is
+    'in_progress': """
+        SELECT id, uuid, datum, spelers, starter, stapel_geschud FROM games
+        WHERE winnaar IS NULL AND datum >= %s AND uuid IS NOT NULL
+        ORDER BY datum
+    """,
+    'bump_version': BUMP_SQL,
+}
+
+STATEMENTS = {
+    db_type: dict(
+        {name: sql(db_type, query) for name, query in _QUERIES.items()},
+        insert_events=INSERT_EVENT_SQL[db_type],
+    )
+    for db_type in ("mysql", "sqlite")
+}
+
+
+class GameRepository:
+    """Eén methode per databaseoperatie, los van de backend.
+
+    Op mysql.connector worden server-side prepared statements gebruikt
+    (cursor(prepared=True)); op sqlite3 de statement-cache van de
+    verbinding. pymysql kent geen prepared statements en vult parameters
+    aan de clientkant in, daar levert de vaste SQL alleen het overslaan van
+    de vertaling per aanroep op.
+
+    Spellen worden alleen via record_game en record_progress geschreven
+    (write_games), dezelfde weg als de app, zodat er één set bewakingen is.
+    """
+
+    def __init__(self, conn, db_type, sleep=time.sleep):
+        self.conn = conn
+        self.db_type = db_type
+        self.statements = STATEMENTS[db_type]
+        self.prepared = driver_module(conn).startswith('mysql.connector')
+        self.sleep = sleep
+        self.retries = 0
+
+    def _cursor(self):
+        if self.prepared:
+            return self.conn.cursor(prepared=True)
+        return self.conn.cursor()
+
+    def _transaction(self, work, new_cursor=None, retry_on=()):
+        """Voer work(cursor) uit in één transactie en geef het resultaat terug.
+
+        Bij een deadlock of lock-timeout (zie is_transient_error) of een fout
+        uit retry_on wordt teruggedraaid en de hele transactie tot
+        MAX_ATTEMPTS keer opnieuw geprobeerd, met oplopende wachttijd. work
+        moet daarom veilig te herhalen zijn.
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            cursor = (new_cursor or self._cursor)()
+            try:
+                result = work(cursor)
+                self.conn.commit()
+                return result
+            except Exception as e:
+                self.conn.rollback()
+                if attempt == MAX_ATTEMPTS - 1 or not (is_transient_error(e) or isinstance(e, retry_on)):
+                    raise
+            finally:
+                cursor.close()
+            self.retries += 1
+            self.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def players(self):
+        cursor = self._cursor()
+        try:
+            cursor.execute(self.statements['players'])
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def leaderboard(self):
+        cursor = self.conn.cursor()
+        try:
+            return fetch_leaderboard(cursor)
+        finally:
+            cursor.close()
+
+    def in_progress(self, since):
+        """Lopende spellen (zonder winnaar) die sinds since gestart zijn, als GameSessions."""
+        cursor = self._cursor()
+        try:
+            cursor.execute(self.statements['in_progress'], (since,))
+            return [
+                GameSession(split_spelers(spelers), game_uuid=game_uuid, starter=starter,
+                            shuffles=shuffles or 0, started_at=str(datum), game_id=game_id)
+                for game_id, game_uuid, datum, spelers, starter, shuffles in cursor.fetchall()
+            ]
+        finally:
+            cursor.close()
+
+    def finished(self, uuids):
+        """De uuids uit uuids waarvan het spel in games al een winnaar heeft."""
+        if not uuids:
+            return set()
+        placeholders = ", ".join(["%s"] * len(uuids))
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                sql(self.db_type, f"SELECT uuid FROM games WHERE uuid IN ({placeholders}) AND winnaar IS NOT NULL"),
+                list(uuids),
+            )
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def record_game(self, session):
+        """Schrijf een spel in één transactie weg en geef het game-id terug.
+
+        Idempotent per uuid: een spel dat al in games staat wordt niet nog
+        eens geteld. Slaat een andere client hetzelfde spel tegelijk op, dan
+        faalt onze insert op de unieke index; de nieuwe poging ziet het spel
+        dan staan.
+        """
+        integrity_error = getattr(self.conn, 'IntegrityError', ())
+        ids = self._transaction(
+            lambda cursor: write_games(cursor, self.db_type, [session]),
+            new_cursor=self.conn.cursor,
+            retry_on=integrity_error,
+        )
+        return ids[session.uuid]
+
+    def record_progress(self, session):
+        """Sla starter en events van een geregistreerd lopend spel op.
+
+        Alleen events na de laatst opgeslagen seq worden ingevoegd (zie
+        unsaved_event_rows); is het spel inmiddels afgerond, dan blijft de
+        starter staan.
+        """
+        def work(cursor):
+            cursor.execute(self.statements['set_open_starter'], (session.starter, session.game_id))
+            cursor.execute(self.statements['set_starter_players'], (session.starter, session.game_id))
+            rows = unsaved_event_rows(cursor, self.db_type, session_event_rows(session.game_id, session))
+            if rows:
+                cursor.executemany(self.statements['insert_events'], rows)
+            cursor.execute(self.statements['bump_version'])
+        self._transaction(work)
+
+    def correct_result(self, game_id, winnaar):
+        """Wijs een afgerond spel achteraf aan een andere winnaar toe.
+
+        Er komt een result_corrected-event bij en games en game_players worden
+        aangepast; scores en player_stats worden daarna opnieuw uit de events
+        afgeleid (rebuild_from_events, vanaf het laatste snapshot) en de
+        ratings opnieuw berekend, want die hangen van de volgorde af. Geeft False
+        als er niets te corrigeren is: spel zonder winnaar, dezelfde winnaar
+        of iemand die niet meespeelde.
+        """
+        def work(cursor):
+            cursor.execute(self.statements['game'], (game_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            spelers, starter, _, previous = row
+            if previous is None or previous == winnaar or winnaar not in split_spelers(spelers):
+                return False
+            cursor.execute(self.statements['correct_winner'], (winnaar, game_id, previous))
+            if cursor.rowcount != 1:
+                return False
+            cursor.execute(self.statements['record_winner_players'], (winnaar, game_id))
+            append_event(cursor, self.db_type, game_id, RESULT_CORRECTED, winnaar, {'previous': previous, 'starter': starter})
+            cursor.execute(self.statements['bump_version'])
+            return True
+        corrected = self._transaction(work, new_cursor=self.conn.cursor, retry_on=getattr(self.conn, 'IntegrityError', ()))
+        if corrected:
+            rebuild_from_events(self.conn, self.db_type)
+            recompute_ratings(self.conn, self.db_type)
+        return corrected
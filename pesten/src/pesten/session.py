@@ -0,0 +1,297 @@
+import json
+import os
+import sys
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pesten.data_version import bump_data_version
+from pesten.db import sql
+from pesten.events import (
+    DECK_SHUFFLED, GAME_STARTED, INSERT_EVENT_SQL, STARTER_CHOSEN, WINNER_SET, now, session_event_rows,
+    unsaved_event_rows,
+)
+from pesten.game_players import INSERT_SQL as GAME_PLAYERS_INSERT_SQL, player_rows
+from pesten.ratings import update_ratings
+from pesten.stats import RECORD_GAME_SQL, player_stats_rows
+
+IN_PROGRESS_MAX_AGE = timedelta(hours=12)  # oudere open spellen zijn verlaten, niet meer herstellen
+
+
+class GameSession:
+    """Een spel dat in het geheugen wordt bijgehouden tot er een winnaar is.
+
+    Spelers, starter, aantal keer geschud en winnaar worden lokaal verzameld en
+    pas bij flush_session in één transactie naar de database geschreven.
+    game_id is gezet als het spel al als lopend spel in games staat. events
+    is het verloop als (type, speler, tijdstip), zie pesten.events.
+
+    Compact, want er kunnen veel spellen tegelijk lopen: __slots__ in plaats
+    van een __dict__, spelers als tuple en namen via sys.intern gedeeld.
+    """
+
+    __slots__ = ('spelers', 'uuid', 'starter', 'shuffles', 'winnaar', 'started_at', 'game_id', 'events')
+
+    def __init__(self, spelers, game_uuid=None, starter=None, shuffles=0, winnaar=None, started_at=None, game_id=None,
+                 events=None):
+        self.spelers = tuple(sys.intern(speler) for speler in spelers)
+        self.uuid = game_uuid or uuid.uuid4().hex
+        self.starter = starter
+        self.shuffles = shuffles
+        self.winnaar = winnaar
+        self.started_at = started_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.game_id = game_id
+        if events is None:
+            # Journaal van voor de events, of hersteld uit games: afleiden uit de tellers
+            events = [(GAME_STARTED, None, self.started_at)]
+            if starter:
+                events.append((STARTER_CHOSEN, starter, self.started_at))
+            events.extend((DECK_SHUFFLED, None, self.started_at) for _ in range(shuffles))
+            if winnaar:
+                events.append((WINNER_SET, winnaar, self.started_at))
+        self.events = [tuple(event) for event in events]
+
+    def set_starter(self, starter):
+        self.starter = starter
+        self.events.append((STARTER_CHOSEN, starter, now()))
+
+    def shuffle(self):
+        self.shuffles += 1
+        self.events.append((DECK_SHUFFLED, None, now()))
+
+    def set_winner(self, winnaar):
+        self.winnaar = winnaar
+        self.events.append((WINNER_SET, winnaar, now()))
+
+    @property
+    def is_finished(self):
+        return self.winnaar is not None
+
+    def to_dict(self):
+        return {
+            'uuid': self.uuid,
+            'spelers': list(self.spelers),
+            'starter': self.starter,
+            'shuffles': self.shuffles,
+            'winnaar': self.winnaar,
+            'started_at': self.started_at,
+            'game_id': self.game_id,
+            'events': [list(event) for event in self.events],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['spelers'],
+            game_uuid=data['uuid'],
+            starter=data.get('starter'),
+            shuffles=data.get('shuffles', 0),
+            winnaar=data.get('winnaar'),
+            started_at=data.get('started_at'),
+            game_id=data.get('game_id'),
+            events=data.get('events'),
+        )
+
+
+class SessionManager:
+    """Alle lopende spellen van deze app, op uuid, met één actief spel.
+
+    Elke tafel in de club is een eigen GameSession met eigen spelers,
+    starter en schudteller; het actieve spel is het spel waarvan de
+    schermen nu getoond worden.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self.active_uuid = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(sorted(self._sessions.values(), key=lambda session: session.started_at))
+
+    def __contains__(self, game_uuid):
+        return game_uuid in self._sessions
+
+    @property
+    def active(self):
+        return self._sessions.get(self.active_uuid)
+
+    def get(self, game_uuid):
+        return self._sessions.get(game_uuid)
+
+    def start(self, spelers):
+        session = GameSession(spelers)
+        self.add(session)
+        self.active_uuid = session.uuid
+        return session
+
+    def add(self, session):
+        """Voeg een (hersteld) spel toe; een spel dat er al is blijft ongewijzigd."""
+        return self._sessions.setdefault(session.uuid, session)
+
+    def switch(self, game_uuid):
+        if game_uuid not in self._sessions:
+            raise KeyError(game_uuid)
+        self.active_uuid = game_uuid
+        return self._sessions[game_uuid]
+
+    def remove(self, session):
+        self._sessions.pop(session.uuid, None)
+        if self.active_uuid == session.uuid:
+            self.active_uuid = None
+
+
+class SessionJournal:
+    """Crash-veilig journaal: één JSON-bestand per lopend spel.
+
+    Elke wijziging wordt atomair weggeschreven (tijdelijk bestand, fsync,
+    os.replace), zodat een spel dat nog niet geflusht is een crash of
+    afgesloten app overleeft.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session):
+        return os.path.join(self.directory, f"{session.uuid}.json")
+
+    def save(self, session):
+        path = self._path(session)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(session.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def remove(self, session):
+        try:
+            os.remove(self._path(session))
+        except FileNotFoundError:
+            pass
+
+    def load_all(self):
+        sessions = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    sessions.append(GameSession.from_dict(json.load(f)))
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(sessions, key=lambda session: session.started_at)
+
+
+FINISH_GAME_SQL = """
+    UPDATE games SET winnaar = %s, starter = %s, stapel_geschud = %s
+    WHERE id = %s AND winnaar IS NULL
+"""
+
+FINISH_GAME_PLAYERS_SQL = """
+    UPDATE game_players
+    SET is_starter = CASE WHEN speler = %s THEN 1 ELSE 0 END,
+        is_winner = CASE WHEN speler = %s THEN 1 ELSE 0 END
+    WHERE game_id = %s
+"""
+
+
+def _ids_by_uuid(cursor, db_type, uuids):
+    placeholders = ", ".join(["%s"] * len(uuids))
+    cursor.execute(sql(db_type, f"SELECT uuid, id FROM games WHERE uuid IN ({placeholders})"), uuids)
+    return dict(cursor.fetchall())
+
+
+def _finish_existing(cursor, db_type, ids, sessions):
+    """Rond al opgeslagen lopende spellen af; geef de spellen terug die nu pas een winnaar kregen.
+
+    De UPDATE is bewaakt met winnaar IS NULL, dus een spel dat elders al is
+    afgerond (of een herhaalde flush) telt niet nog eens.
+    """
+    finished = []
+    for session in sessions:
+        game_id = ids[session.uuid]
+        cursor.execute(sql(db_type, FINISH_GAME_SQL), (session.winnaar, session.starter, session.shuffles, game_id))
+        if cursor.rowcount != 1:
+            continue
+        cursor.execute(sql(db_type, FINISH_GAME_PLAYERS_SQL), (session.starter, session.winnaar, game_id))
+        finished.append(session)
+    return finished
+
+
+def write_games(cursor, db_type, sessions):
+    """Schrijf spellen in bulk weg, zonder commit.
+
+    Spellen waarvan de uuid al in games staat worden niet opnieuw ingevoegd,
+    zodat een herhaalde flush of sync nooit dubbel telt. Staat zo'n spel er
+    nog als lopend spel (zie SessionManager), dan wordt het afgerond. De
+    events van nieuwe en nu afgeronde spellen gaan mee naar game_events.
+    Geeft {uuid: game_id} terug voor alle meegegeven spellen.
+    """
+    uuids = [session.uuid for session in sessions]
+    ids = _ids_by_uuid(cursor, db_type, uuids)
+    new = [session for session in sessions if session.uuid not in ids]
+    existing = [session for session in sessions if session.uuid in ids and session.is_finished]
+    counted = _finish_existing(cursor, db_type, ids, existing) if existing else []
+    if not new and not counted:
+        return ids
+
+    if new:
+        cursor.executemany(
+            sql(db_type, """
+                INSERT INTO games (uuid, datum, spelers, starter, stapel_geschud, winnaar)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """),
+            [
+                (s.uuid, s.started_at, ",".join(s.spelers), s.starter, s.shuffles, s.winnaar)
+                for s in new
+            ],
+        )
+        ids.update(_ids_by_uuid(cursor, db_type, [session.uuid for session in new]))
+
+    game_player_rows = []
+    for session in new:
+        game_player_rows.extend(player_rows(ids[session.uuid], session.spelers, session.starter, session.winnaar))
+    stats_rows = []
+    wins = Counter()
+    # Een spel zonder winnaar telt pas mee in de statistieken als het wordt afgerond
+    for session in new + counted:
+        if session.is_finished:
+            stats_rows.extend(player_stats_rows(
+                session.spelers, session.starter, session.winnaar, session.shuffles, session.started_at,
+            ))
+            wins[session.winnaar] += 1
+    if game_player_rows:
+        cursor.executemany(sql(db_type, GAME_PLAYERS_INSERT_SQL), game_player_rows)
+    # Ratings vóór de events, in dezelfde volgorde (zie update_ratings)
+    update_ratings(cursor, db_type, [(session.spelers, session.winnaar) for session in new + counted if session.is_finished])
+    event_rows = []
+    for session in new + counted:
+        event_rows.extend(session_event_rows(ids[session.uuid], session))
+    # Van een al geregistreerd spel staan de eerste events er al
+    cursor.executemany(INSERT_EVENT_SQL[db_type], unsaved_event_rows(cursor, db_type, event_rows))
+    cursor.executemany(RECORD_GAME_SQL[db_type], stats_rows)
+    cursor.executemany(
+        sql(db_type, "UPDATE scores SET wins = wins + %s WHERE speler = %s"),
+        [(count, speler) for speler, count in wins.items()],
+    )
+    bump_data_version(cursor)
+    return ids
+
+
+def flush_session(conn, db_type, session):
+    """Schrijf een afgelopen spel in één transactie weg en geef het game-id terug."""
+    cursor = conn.cursor()
+    try:
+        ids = write_games(cursor, db_type, [session])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return ids[session.uuid]
+
@@ -0,0 +1,157 @@
+import argparse
+from collections import namedtuple
+
+from pesten.data_version import bump_data_version
+from pesten.db import add_connection_arguments, connect_from_args, sql
+
+# Gematerialiseerde statistieken per speler. Wordt bijgewerkt in dezelfde
+# transactie waarin een spel wordt opgeslagen, zodat de scorelijst O(spelers) blijft.
+PLAYER_STATS_DDL = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS player_stats (
+            speler VARCHAR(255) PRIMARY KEY,
+            games_played INT NOT NULL DEFAULT 0,
+            wins INT NOT NULL DEFAULT 0,
+            starts INT NOT NULL DEFAULT 0,
+            wins_as_starter INT NOT NULL DEFAULT 0,
+            shuffles_seen INT NOT NULL DEFAULT 0,
+            last_played TIMESTAMP NULL
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS player_stats (
+            speler TEXT PRIMARY KEY,
+            games_played INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            starts INTEGER NOT NULL DEFAULT 0,
+            wins_as_starter INTEGER NOT NULL DEFAULT 0,
+            shuffles_seen INTEGER NOT NULL DEFAULT 0,
+            last_played TIMESTAMP
+        )
+    """,
+}
+
+# last_played is de datum van het spel (games.datum), net als MAX(g.datum) in
+# REBUILD_SQL, zodat een rebuild of replay het niet verschuift
+RECORD_GAME_SQL = {
+    "mysql": """
+        INSERT INTO player_stats (speler, games_played, wins, starts, wins_as_starter, shuffles_seen, last_played)
+        VALUES (%s, 1, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            games_played = games_played + 1,
+            wins = wins + VALUES(wins),
+            starts = starts + VALUES(starts),
+            wins_as_starter = wins_as_starter + VALUES(wins_as_starter),
+            shuffles_seen = shuffles_seen + VALUES(shuffles_seen),
+            last_played = GREATEST(COALESCE(last_played, VALUES(last_played)), VALUES(last_played))
+    """,
+    "sqlite": """
+        INSERT INTO player_stats (speler, games_played, wins, starts, wins_as_starter, shuffles_seen, last_played)
+        VALUES (?, 1, ?, ?, ?, ?, ?)
+        ON CONFLICT(speler) DO UPDATE SET
+            games_played = games_played + 1,
+            wins = wins + excluded.wins,
+            starts = starts + excluded.starts,
+            wins_as_starter = wins_as_starter + excluded.wins_as_starter,
+            shuffles_seen = shuffles_seen + excluded.shuffles_seen,
+            last_played = MAX(COALESCE(last_played, excluded.last_played), excluded.last_played)
+    """,
+}
+
+REBUILD_SQL = """
+    INSERT INTO player_stats (speler, games_played, wins, starts, wins_as_starter, shuffles_seen, last_played)
+    SELECT gp.speler,
+           COUNT(*),
+           SUM(gp.is_winner),
+           SUM(gp.is_starter),
+           SUM(CASE WHEN gp.is_winner = 1 AND gp.is_starter = 1 THEN 1 ELSE 0 END),
+           SUM(COALESCE(g.stapel_geschud, 0)),
+           MAX(g.datum)
+    FROM game_players gp
+    JOIN games g ON g.id = gp.game_id
+    WHERE g.winnaar IS NOT NULL
+    GROUP BY gp.speler
+"""
+
+
+PlayerStats = namedtuple('PlayerStats', [
+    'speler', 'games_played', 'wins', 'starts', 'wins_as_starter', 'shuffles_seen', 'last_played', 'rating',
+])
+
+PLAYER_STATS_SQL = """
+    SELECT ps.speler, ps.games_played, ps.wins, ps.starts, ps.wins_as_starter, ps.shuffles_seen, ps.last_played, r.rating
+    FROM player_stats ps LEFT JOIN ratings r ON r.speler = ps.speler
+    WHERE ps.speler = %s
+"""
+
+
+def fetch_player_stats(cursor, db_type, speler):
+    """PlayerStats van één speler, of None als die nog niet gespeeld heeft."""
+    cursor.execute(sql(db_type, PLAYER_STATS_SQL), (speler,))
+    row = cursor.fetchone()
+    return PlayerStats(*row) if row is not None else None
+
+
+def create_player_stats(cursor, db_type):
+    cursor.execute(PLAYER_STATS_DDL[db_type])
+
+
+def player_stats_rows(spelers, starter, winnaar, shuffles, datum):
+    rows = []
+    for speler in spelers:
+        is_starter = int(speler == starter)
+        is_winner = int(speler == winnaar)
+        rows.append((speler, is_winner, is_starter, is_winner * is_starter, shuffles, datum))
+    return rows
+
+
+def rebuild_player_stats(conn):
+    """Bereken player_stats opnieuw uit games/game_players in één geaggregeerde query.
+
+    Net als bij het incrementeel bijwerken tellen alleen afgeronde spellen;
+    lopende en afgebroken spellen (zonder winnaar) blijven buiten beschouwing.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM player_stats")
+    cursor.execute(REBUILD_SQL)
+    conn.commit()
+    cursor.execute("SELECT COUNT(*) FROM player_stats")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+
+def ensure_player_stats(conn):
+    """Vul player_stats eenmalig wanneer de tabel leeg is maar er al spellen zijn."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM player_stats")
+    empty = cursor.fetchone()[0] == 0
+    cursor.execute("SELECT COUNT(*) FROM game_players")
+    has_games = cursor.fetchone()[0] > 0
+    cursor.close()
+    if empty and has_games:
+        rebuild_player_stats(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m pesten.stats', description='Onderhoud van player_stats')
+    parser.add_argument('command', choices=['rebuild'])
+    add_connection_arguments(parser)
+    args = parser.parse_args()
+
+    conn, _ = connect_from_args(args)
+    try:
+        if args.command == 'rebuild':
+            count = rebuild_player_stats(conn)
+            # Draaiende apps laten hun statistiekencache opnieuw laden
+            cursor = conn.cursor()
+            bump_data_version(cursor)
+            conn.commit()
+            cursor.close()
+            print(f"player_stats opnieuw opgebouwd voor {count} spelers.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import json
+
+from pesten.session import GameSession, write_games
+
+SYNC_BATCH_SIZE = 500
+
+# Wachtrij in de lokale SQLite van spellen die offline gespeeld zijn en nog
+# naar de MySQL-server moeten. De uuid van het spel is de sleutel, zodat een
+# herhaalde sync nooit dubbel telt.
+OUTBOX_DDL = """
+    CREATE TABLE IF NOT EXISTS outbox (
+        uuid TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def create_outbox(cursor):
+    cursor.execute(OUTBOX_DDL)
+
+
+def record_offline(conn, session):
+    """Sla een spel op in de lokale SQLite en zet het in dezelfde transactie in de outbox."""
+    cursor = conn.cursor()
+    try:
+        write_games(cursor, "sqlite", [session])
+        cursor.execute(
+            "INSERT OR IGNORE INTO outbox (uuid, payload) VALUES (?, ?)",
+            (session.uuid, json.dumps(session.to_dict())),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def pending_count(conn):
+    return conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+def push_batch(conn, db_type, sessions):
+    """Schrijf een batch spellen in één transactie naar de server.
+
+    Loopt een andere client tegelijk dezelfde uuid's te syncen, dan faalt de
+    insert op de unieke index; de tweede poging slaat die spellen dan over.
+    """
+    integrity_error = getattr(conn, 'IntegrityError', ())
+    for attempt in range(2):
+        cursor = conn.cursor()
+        try:
+            write_games(cursor, db_type, sessions)
+            conn.commit()
+            return
+        except integrity_error:
+            conn.rollback()
+            if attempt == 1:
+                raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def sync_outbox(local_conn, remote_conn, remote_type, batch_size=SYNC_BATCH_SIZE):
+    """Push alle wachtende spellen in batches en geef het aantal gesynchroniseerde spellen terug."""
+    synced = 0
+    while True:
+        rows = local_conn.execute(
+            "SELECT uuid, payload FROM outbox ORDER BY rowid LIMIT ?", (batch_size,)
+        ).fetchall()
+        if not rows:
+            break
+        sessions = [GameSession.from_dict(json.loads(payload)) for _, payload in rows]
+        push_batch(remote_conn, remote_type, sessions)
+        local_conn.executemany("DELETE FROM outbox WHERE uuid = ?", [(uuid,) for uuid, _ in rows])
+        local_conn.commit()
+        synced += len(rows)
+    return synced
+
+
+def mirror_players(local_conn, remote_conn):
+    """Neem de spelerslijst van de server over, zodat er offline ook spelers te kiezen zijn."""
+    cursor = remote_conn.cursor()
+    cursor.execute("SELECT speler FROM scores")
+    spelers = cursor.fetchall()
+    cursor.close()
+    remote_conn.commit()
+    local_conn.executemany("INSERT OR IGNORE INTO scores (speler, wins) VALUES (?, 0)", spelers)
+    local_conn.commit()
@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+
+from pesten.db import connect_spec, sql
+from pesten.export import save_checkpoint
+from pesten.migrations import migrate
+from pesten.ratings import recompute_ratings
+
+TRANSFER_BATCH_SIZE = 2000
+DEFAULT_CHECKPOINT = 'pesten-transfer.json'
+
+Table = namedtuple('Table', ['name', 'key', 'columns'])
+TableCheck = namedtuple('TableCheck', ['table', 'source_count', 'target_count', 'source_checksum', 'target_checksum'])
+
+# Volgorde telt niet voor foreign keys (die zijn er niet), wel voor de
+# leesbaarheid van de voortgang: eerst spelers, dan spellen, dan afgeleid
+TABLES = [
+    Table('scores', ('speler',), ('speler', 'wins')),
+    Table('games', ('id',), ('id', 'uuid', 'datum', 'spelers', 'winnaar', 'starter', 'stapel_geschud')),
+    Table('game_players', ('game_id', 'speler'), ('game_id', 'speler', 'is_starter', 'is_winner')),
+    Table('game_events', ('id',), ('id', 'game_id', 'seq', 'event_type', 'speler', 'data', 'created_at')),
+    Table('player_stats', ('speler',), (
+        'speler', 'games_played', 'wins', 'starts', 'wins_as_starter', 'shuffles_seen', 'last_played',
+    )),
+]
+
+INSERT_IGNORE = {
+    "mysql": "INSERT IGNORE INTO",
+    "sqlite": "INSERT OR IGNORE INTO",
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+def _after_key(key):
+    """WHERE-clausule voor keyset-paginering: alles na de laatst gekopieerde sleutel."""
+    if len(key) == 1:
+        return f"{key[0]} > %s"
+    first, second = key
+    return f"({first} > %s OR ({first} = %s AND {second} > %s))"
+
+
+def _key_params(key, last_key):
+    if len(key) == 1:
+        return tuple(last_key)
+    return (last_key[0], last_key[0], last_key[1])
+
+
+def iter_batches(conn, db_type, table, batch_size=TRANSFER_BATCH_SIZE, last_key=None):
+    """Lees table in batches op volgorde van de primary key, zonder OFFSET.
+
+    Elke batch is een aparte query die via de index direct na de vorige
+    sleutel begint; het geheugengebruik is één batch.
+    """
+    columns = ", ".join(table.columns)
+    order = ", ".join(table.key)
+    key_positions = [table.columns.index(name) for name in table.key]
+    cursor = conn.cursor()
+    try:
+        while True:
+            if last_key is None:
+                cursor.execute(sql(db_type, f"SELECT {columns} FROM {table.name} ORDER BY {order} LIMIT %s"), (batch_size,))
+            else:
+                cursor.execute(
+                    sql(db_type, f"SELECT {columns} FROM {table.name} WHERE {_after_key(table.key)} ORDER BY {order} LIMIT %s"),
+                    _key_params(table.key, last_key) + (batch_size,),
+                )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_key = [rows[-1][position] for position in key_positions]
+            yield rows, last_key
+            if len(rows) < batch_size:
+                break
+    finally:
+        cursor.close()
+
+
+def _normalize(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _normalize_row(row):
+    return tuple(_normalize(value) for value in row)
+
+
+def table_checksum(conn, db_type, table, batch_size=TRANSFER_BATCH_SIZE):
+    """Aantal rijen en een volgorde-onafhankelijke checksum van table.
+
+    De checksum is de som van een hash per rij (mod 2**64), zodat MySQL en
+    SQLite dezelfde waarde geven ook als hun collaties anders sorteren.
+    """
+    count = 0
+    checksum = 0
+    for rows, _ in iter_batches(conn, db_type, table, batch_size):
+        for row in rows:
+            digest = hashlib.sha1(repr(_normalize_row(row)).encode('utf-8')).digest()
+            checksum = (checksum + int.from_bytes(digest[:8], 'big')) % 2 ** 64
+        count += len(rows)
+    return count, f"{checksum:016x}"
+
+
+def load_transfer_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _target_is_empty(conn):
+    cursor = conn.cursor()
+    try:
+        for table in TABLES:
+            cursor.execute(f"SELECT 1 FROM {table.name} LIMIT 1")
+            if cursor.fetchone() is not None:
+                return False
+        return True
+    finally:
+        cursor.close()
+
+
+def copy_table(source, source_type, target, target_type, table, state, save, batch_size=TRANSFER_BATCH_SIZE):
+    """Kopieer table batch voor batch; state['last_key'] houdt bij waar we zijn.
+
+    Elke batch is één transactie op het doel, gevolgd door save(). Wordt het
+    proces daartussen afgebroken, dan staat de batch al in het doel maar nog
+    niet in het checkpoint; INSERT IGNORE slaat die rijen bij hervatten over.
+    """
+    insert = sql(target_type, f"""
+        {INSERT_IGNORE[target_type]} {table.name} ({", ".join(table.columns)})
+        VALUES ({", ".join(["%s"] * len(table.columns))})
+    """)
+    cursor = target.cursor()
+    try:
+        for rows, last_key in iter_batches(source, source_type, table, batch_size, state.get('last_key')):
+            cursor.executemany(insert, [_normalize_row(row) for row in rows])
+            target.commit()
+            state['last_key'] = last_key
+            state['copied'] = state.get('copied', 0) + len(rows)
+            save()
+    finally:
+        cursor.close()
+    state['done'] = True
+    save()
+
+
+def transfer(source, source_type, target, target_type, batch_size=TRANSFER_BATCH_SIZE, checkpoint_path=DEFAULT_CHECKPOINT, log=None):
+    """Kopieer alle tabellen van source naar target met behoud van ids.
+
+    Het schema van beide kanten wordt eerst op de laatste versie gebracht.
+    Zonder checkpoint moet het doel leeg zijn; met checkpoint gaat de kopie
+    verder bij de laatst vastgelegde sleutel per tabel. Na een volledige
+    kopie wordt het checkpoint verwijderd. Geeft de controle per tabel terug
+    (zie verify).
+    """
+    migrate(source, source_type)
+    migrate(target, target_type)
+
+    checkpoint = load_transfer_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        if not _target_is_empty(target):
+            raise TransferError("De doeldatabase bevat al gegevens; kopiëren kan alleen naar een lege database")
+        checkpoint = {'tables': {}}
+
+    def save():
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    for table in TABLES:
+        state = checkpoint['tables'].setdefault(table.name, {})
+        if state.get('done'):
+            continue
+        if log:
+            log(f"{table.name} kopiëren...")
+        copy_table(source, source_type, target, target_type, table, state, save, batch_size)
+        if log:
+            log(f"{table.name}: {state.get('copied', 0)} rijen")
+    os.remove(checkpoint_path)
+    # Ratings zijn afgeleid en worden niet gekopieerd (REAL verschilt per backend)
+    recompute_ratings(target, target_type)
+
+    return verify(source, source_type, target, target_type, batch_size)
+
+
+def verify(source, source_type, target, target_type, batch_size=TRANSFER_BATCH_SIZE):
+    checks = []
+    for table in TABLES:
+        source_count, source_checksum = table_checksum(source, source_type, table, batch_size)
+        target_count, target_checksum = table_checksum(target, target_type, table, batch_size)
+        checks.append(TableCheck(table.name, source_count, target_count, source_checksum, target_checksum))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m pesten.transfer',
+        description='Kopieer alle gegevens tussen twee databases (sqlite:PAD of mysql:CONFIG.json)',
+    )
+    parser.add_argument('bron', help='Bron, bijvoorbeeld sqlite:pesten.sqlite3')
+    parser.add_argument('doel', help='Doel, bijvoorbeeld mysql:db_config.json')
+    parser.add_argument('--batch-size', type=int, default=TRANSFER_BATCH_SIZE)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help=f'Voortgangsbestand (standaard: {DEFAULT_CHECKPOINT})')
+    parser.add_argument('--verify-only', action='store_true', help='Alleen aantallen en checksums vergelijken')
+    args = parser.parse_args()
+
+    source, source_type = connect_spec(args.bron)
+    target, target_type = connect_spec(args.doel)
+    try:
+        if args.verify_only:
+            checks = verify(source, source_type, target, target_type, args.batch_size)
+        else:
+            checks = transfer(source, source_type, target, target_type, args.batch_size, args.checkpoint, log=print)
+    except TransferError as e:
+        print(e)
+        sys.exit(2)
+    finally:
+        source.close()
+        target.close()
+
+    ok = True
+    for check in checks:
+        same = check.source_count == check.target_count and check.source_checksum == check.target_checksum
+        ok = ok and same
+        print(f"{'OK ' if same else 'FOUT'} {check.table}: {check.source_count} -> {check.target_count} rijen, "
+              f"checksum {check.source_checksum} -> {check.target_checksum}")
+    if not ok:
+        sys.exit(1)
+    print("Kopie compleet en gecontroleerd.")
+
+
+if __name__ == '__main__':
+    main()
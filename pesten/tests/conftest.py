@@ -0,0 +1,27 @@
+import sqlite3
+
+import pytest
+
+from pesten.migrations import migrate
+
+
+def make_db(path=':memory:'):
+    """SQLite-database met hetzelfde schema als de app."""
+    conn = sqlite3.connect(path)
+    migrate(conn, "sqlite")
+    return conn
+
+
+@pytest.fixture
+def db():
+    conn = make_db()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def remote_db():
+    """Tweede database als stand-in voor de MySQL-server."""
+    conn = make_db()
+    yield conn
+    conn.close()
@@ -1,3 +1,85 @@
+import pytest
+
+from pesten.db import connect_sqlite
+from pesten.migrations import migrate
+from pesten.session import SessionJournal
+
+
 def test_first():
     """An initial test for the app."""
     assert 1 + 1 == 2
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """PestenApp op de dummy-backend van Toga, met een lokale SQLite-database."""
+    monkeypatch.setenv('TOGA_BACKEND', 'toga_dummy')
+    pytest.importorskip('toga_dummy')
+    pytest.importorskip('pymysql')
+    import toga
+    from pesten.app import PestenApp
+
+    class ScoresApp(PestenApp):
+        def startup(self):
+            self.main_window = toga.MainWindow(title=self.formal_name)
+
+    application = ScoresApp()
+    application.app_dir = str(tmp_path)
+    application.journal = SessionJournal(str(tmp_path / 'journal'))
+    application.db_type = "sqlite"
+    application.conn = connect_sqlite(str(tmp_path / 'pesten.sqlite3'), check_same_thread=False)
+    migrate(application.conn, "sqlite")
+    yield application
+    application.db.shutdown()
+    application.conn.close()
+
+
+def test_finished_game_only_touches_its_rows(app, monkeypatch):
+    from pesten.app import LeaderboardTable
+
+    app.conn.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [(n,) for n in ("Anna", "Bram", "Cor", "Daan")])
+    app.conn.commit()
+    app.show_main_screen()
+    app.loop.run_until_complete(app.show_scores())
+    table = app.scores_table
+    rows = {row.speler: row for row in table.data}
+
+    resets = []
+    reset = LeaderboardTable.reset
+    monkeypatch.setattr(LeaderboardTable, 'reset', lambda listener, rows: (resets.append(len(rows)), reset(listener, rows)))
+    app.games.start(["Anna", "Bram"])
+    app.loop.run_until_complete(app.set_winner(None, speler="Bram"))
+    app.loop.run_until_complete(app.show_scores())
+
+    # Zelfde scherm en tabel; alleen de rijen van Anna en Bram zijn bijgewerkt
+    assert app.main_window.content is app.main_box
+    assert app.scores_table is table
+    assert resets == []
+    assert [(row.speler, row.wins, row.gespeeld) for row in table.data] == [
+        ("Bram", 1, 1), ("Anna", 0, 1), ("Cor", 0, 0), ("Daan", 0, 0),
+    ]
+    assert table.data[2] is rows["Cor"]
+    assert table.data[3] is rows["Daan"]
+
+
+def test_replay_journal_drops_stale_and_finished_games(app):
+    from pesten.repository import GameRepository
+    from pesten.session import GameSession
+
+    repository = GameRepository(app.conn, "sqlite")
+    stale = GameSession(["Anna", "Bram"], started_at="2020-01-01 10:00:00")
+    elsewhere = GameSession(["Anna", "Cor"])
+    elsewhere.game_id = repository.record_game(elsewhere)
+    running = GameSession(["Bram", "Cor"])
+    for session in (stale, elsewhere, running):
+        app.journal.save(session)
+    # Op een andere tablet afgerond, en daar nog een spel gestart
+    finished = GameSession(["Anna", "Cor"], game_uuid=elsewhere.uuid, game_id=elsewhere.game_id, winnaar="Anna")
+    repository.record_game(finished)
+    other_tablet = GameSession(["Anna", "Daan"])
+    repository.record_game(other_tablet)
+
+    app.loop.run_until_complete(app.replay_journal())
+
+    assert {session.uuid for session in app.games} == {running.uuid, other_tablet.uuid}
+    assert [session.uuid for session in app.journal.load_all()] == [running.uuid]
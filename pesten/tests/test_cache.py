@@ -0,0 +1,104 @@
+import sqlite3
+
+from pesten.cache import StatsCache
+from pesten.data_version import DataVersion, only_own_write
+from pesten.leaderboard import fetch_leaderboard
+from pesten.migrations import migrate
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+
+
+def _players(conn, *names):
+    conn.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [(name,) for name in names])
+    conn.commit()
+
+
+def test_repeated_views_come_from_memory(db):
+    _players(db, "Anna", "Bram")
+    cache = StatsCache()
+    version, rows = cache.leaderboard(db, "sqlite")
+    assert cache.leaderboard(db, "sqlite") == (version, rows)
+    assert cache.leaderboard(db, "sqlite") == (version, rows)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_change_by_other_connection_is_detected(tmp_path):
+    path = str(tmp_path / "pesten.sqlite3")
+    app_conn = sqlite3.connect(path)
+    migrate(app_conn, "sqlite")
+    other = sqlite3.connect(path)
+    _players(app_conn, "Anna", "Bram")
+
+    cache = StatsCache()
+    cache.leaderboard(app_conn, "sqlite")
+    GameRepository(other, "sqlite").record_game(GameSession(["Anna", "Bram"], winnaar="Bram"))
+
+    _, rows = cache.leaderboard(app_conn, "sqlite")
+    assert cache.misses == 2
+    assert [(row.speler, row.wins, row.games_played) for row in rows] == [("Bram", 1, 1), ("Anna", 0, 1)]
+    other.close()
+    app_conn.close()
+
+
+def test_own_game_is_applied_without_reloading(db):
+    _players(db, "Anna", "Bram", "Cor")
+    cache = StatsCache()
+    cache.leaderboard(db, "sqlite")
+    cache.player_stats(db, "sqlite", "Anna")
+
+    before = cache.begin_write(db, "sqlite")
+    GameRepository(db, "sqlite").record_game(GameSession(["Anna", "Bram"], winnaar="Anna"))
+    version = cache.record_game(db, "sqlite", before, ["Anna", "Bram"], "Anna")
+    assert version is not None
+
+    misses = cache.misses
+    assert cache.leaderboard(db, "sqlite") == (version, fetch_leaderboard(db.cursor()))
+    assert cache.misses == misses
+    # Details van deelnemers zijn verouderd en worden opnieuw gelezen
+    assert cache.player_stats(db, "sqlite", "Anna").games_played == 1
+    assert cache.misses == misses + 1
+
+
+def test_replayed_game_does_not_count_twice(db):
+    _players(db, "Anna", "Bram")
+    session = GameSession(["Anna", "Bram"], winnaar="Anna")
+    GameRepository(db, "sqlite").record_game(session)
+    cache = StatsCache()
+    cache.leaderboard(db, "sqlite")
+
+    before = cache.begin_write(db, "sqlite")
+    GameRepository(db, "sqlite").record_game(session)  # al opgeslagen, schrijft niets
+    assert cache.record_game(db, "sqlite", before, session.spelers, session.winnaar) is None
+    _, rows = cache.leaderboard(db, "sqlite")
+    assert rows == fetch_leaderboard(db.cursor())
+
+
+def test_player_details_are_bounded_lru(db):
+    _players(db, "Anna", "Bram", "Cor")
+    cache = StatsCache(detail_size=2)
+    cache.player_stats(db, "sqlite", "Anna")
+    cache.player_stats(db, "sqlite", "Bram")
+    cache.player_stats(db, "sqlite", "Anna")  # Anna is nu het recentst gebruikt
+    cache.player_stats(db, "sqlite", "Cor")   # Bram valt eruit
+    assert list(cache._details) == ["Anna", "Cor"]
+
+
+def test_mysql_version_needs_exactly_one_own_bump():
+    before = DataVersion(10, 4)
+    assert only_own_write("mysql", before, DataVersion(11, 5), game_id=11)
+    # Lopend spel afgerond: geen nieuwe rij in games
+    assert only_own_write("mysql", before, DataVersion(10, 5), game_id=7)
+    # Een andere client schreef ook: teller twee hoger
+    assert not only_own_write("mysql", before, DataVersion(12, 6), game_id=11)
+    # Spel was er al: niets geschreven
+    assert not only_own_write("mysql", before, before, game_id=7)
+
+
+def test_mysql_game_without_bump_from_other_client_forces_reload():
+    before = DataVersion(10, 4)
+    # Oudere client voegde spel 11 in zonder de teller; wij rondden spel 7 af
+    assert not only_own_write("mysql", before, DataVersion(11, 5), game_id=7)
+    # Wij voegden 11 in, een ander daarna nog 12
+    assert not only_own_write("mysql", before, DataVersion(12, 5), game_id=11)
+    # Zonder game_id alleen als er geen spel bij kwam
+    assert not only_own_write("mysql", before, DataVersion(11, 5))
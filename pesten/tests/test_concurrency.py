@@ -0,0 +1,109 @@
+import multiprocessing
+import random
+
+from pesten.db import connect_sqlite
+from pesten.migrations import migrate
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+from pesten.stats import rebuild_player_stats
+
+PLAYERS = ["Anna", "Bram", "Cor", "Daan", "Eva", "Fenna"]
+WRITERS = 4
+GAMES = 40
+
+STATS_SQL = "SELECT speler, games_played, wins, starts, wins_as_starter, shuffles_seen FROM player_stats ORDER BY speler"
+
+
+def _writer(path, seed, open_games, finished, barrier, results):
+    """Eén tablet: rondt alle open spellen af en slaat dezelfde afgeronde spellen op."""
+    rng = random.Random(seed)
+    conn = connect_sqlite(path)
+    repository = GameRepository(conn, "sqlite")
+    barrier.wait()
+    for game_id, game_uuid, spelers in rng.sample(open_games, len(open_games)):
+        # Elke tablet denkt dat iemand anders gewonnen heeft
+        session = GameSession(spelers, game_uuid=game_uuid, starter=spelers[0], game_id=game_id)
+        session.set_winner(rng.choice(spelers))
+        repository.record_game(session)
+        repository.record_game(GameSession.from_dict(finished[game_id % len(finished)]))
+    conn.close()
+    results.put(repository.retries)
+
+
+def test_concurrent_writers_count_each_result_once(tmp_path):
+    path = str(tmp_path / "pesten.sqlite3")
+    conn = connect_sqlite(path)
+    migrate(conn, "sqlite")
+    conn.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [(speler,) for speler in PLAYERS])
+    conn.commit()
+    repository = GameRepository(conn, "sqlite")
+    rng = random.Random(0)
+    open_games = []
+    for _ in range(GAMES):
+        spelers = rng.sample(PLAYERS, rng.randint(2, 5))
+        session = GameSession(spelers, starter=spelers[0])
+        open_games.append((repository.record_game(session), session.uuid, spelers))
+    finished = [GameSession(["Anna", "Bram"], winnaar="Bram").to_dict() for _ in range(5)]
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(WRITERS)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_writer, args=(path, seed, open_games, finished, barrier, results))
+        for seed in range(WRITERS)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        results.get(timeout=60)
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    # Elk open spel kreeg precies één winnaar, hoeveel tablets het ook probeerden
+    assert conn.execute("SELECT COUNT(*) FROM game_events WHERE event_type = 'winner_set'").fetchone()[0] == GAMES + len(finished)
+    assert conn.execute("SELECT COUNT(*) FROM games").fetchone()[0] == GAMES + len(finished)
+    assert conn.execute("SELECT COUNT(*) FROM games WHERE winnaar IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT SUM(wins) FROM scores").fetchone()[0] == GAMES + len(finished)
+    assert conn.execute("SELECT SUM(is_winner) FROM game_players").fetchone()[0] == GAMES + len(finished)
+    # De incrementele statistieken kloppen met een volledige herberekening
+    incremental = conn.execute(STATS_SQL).fetchall()
+    rebuild_player_stats(conn)
+    assert conn.execute(STATS_SQL).fetchall() == incremental
+    conn.close()
+
+
+def test_open_game_is_finished_once(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)
+    # Twee tablets met hetzelfde lopende spel, elk met een andere winnaar
+    first, other = GameSession.from_dict(session.to_dict()), GameSession.from_dict(session.to_dict())
+    first.set_winner("Anna")
+    other.set_winner("Bram")
+    for finished in (first, first, other):
+        assert repository.record_game(finished) == session.game_id
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 1), ("Bram", 0)]
+    assert db.execute("SELECT winnaar FROM games WHERE id = ?", (session.game_id,)).fetchone() == ("Anna",)
+
+
+def test_transient_lock_errors_are_retried(db):
+    import sqlite3
+
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    db.commit()
+    sleeps = []
+    repository = GameRepository(db, "sqlite", sleep=sleeps.append)
+    attempts = []
+
+    def work(cursor):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        cursor.execute("UPDATE scores SET wins = wins + 1 WHERE speler = 'Anna'")
+        return "klaar"
+
+    assert repository._transaction(work) == "klaar"
+    assert len(sleeps) == 2 and sleeps[1] == 2 * sleeps[0]
+    assert db.execute("SELECT wins FROM scores WHERE speler = 'Anna'").fetchone() == (1,)
@@ -0,0 +1,161 @@
+from pesten.events import backfill_events, load_snapshot, rebuild_from_events, replay_stats
+from pesten.generate import generate
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+from pesten.stats import rebuild_player_stats
+
+STATS_SQL = """
+    SELECT speler, games_played, wins, starts, wins_as_starter, shuffles_seen
+    FROM player_stats ORDER BY speler
+"""
+
+
+def _players(conn, *names):
+    conn.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [(name,) for name in names])
+    conn.commit()
+
+
+def _events(conn, game_id):
+    return conn.execute(
+        "SELECT seq, event_type, speler FROM game_events WHERE game_id = ? ORDER BY seq", (game_id,)
+    ).fetchall()
+
+
+def test_session_events_are_stored_once(db):
+    _players(db, "Anna", "Bram")
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)  # lopend spel registreren
+    session.set_starter("Bram")
+    repository.record_progress(session)
+    session.shuffle()
+    session.set_winner("Anna")
+    repository.record_game(session)
+    repository.record_game(session)  # herhaalde flush
+
+    assert _events(db, session.game_id) == [
+        (1, "game_started", None),
+        (2, "starter_chosen", "Bram"),
+        (3, "deck_shuffled", None),
+        (4, "winner_set", "Anna"),
+    ]
+
+
+def test_replay_matches_incremental_stats(db):
+    generate(db, "sqlite", players=12, games=300, seed=3)
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram", "Cor"], starter="Cor", shuffles=2, winnaar="Cor")
+    repository.record_game(session)
+    expected = db.execute(STATS_SQL).fetchall()
+
+    rebuild_from_events(db, "sqlite")
+    assert db.execute(STATS_SQL).fetchall() == expected
+
+
+def test_snapshot_plus_tail_equals_full_replay(db):
+    generate(db, "sqlite", players=10, games=200, seed=1)
+    full = replay_stats(db, "sqlite", snapshot_interval=0)
+    db.execute("DELETE FROM stats_snapshots")
+
+    partial = replay_stats(db, "sqlite", snapshot_interval=100, chunk_size=50)
+    assert load_snapshot(db).last_event_id > 0
+    assert partial.players == full.players
+    # Tweede replay begint bij het laatste snapshot en leest alleen de staart
+    assert replay_stats(db, "sqlite").players == full.players
+
+
+def test_correction_is_replayed_into_stats(db):
+    _players(db, "Anna", "Bram")
+    repository = GameRepository(db, "sqlite")
+    game_id = repository.record_game(GameSession(["Anna", "Bram"], starter="Anna", winnaar="Anna"))
+    replay_stats(db, "sqlite", snapshot_interval=1)  # snapshot van voor de correctie
+
+    assert repository.correct_result(game_id, "Bram")
+    assert not repository.correct_result(game_id, "Bram")
+    assert not repository.correct_result(game_id, "Cor")
+
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 0), ("Bram", 1)]
+    assert db.execute(STATS_SQL).fetchall() == [("Anna", 1, 0, 1, 0, 0), ("Bram", 1, 1, 0, 0, 0)]
+    assert _events(db, game_id)[-1] == (4, "result_corrected", "Bram")
+    # De SQL-rebuild uit game_players komt op hetzelfde uit
+    rebuild_player_stats(db)
+    assert db.execute(STATS_SQL).fetchall() == [("Anna", 1, 0, 1, 0, 0), ("Bram", 1, 1, 0, 0, 0)]
+
+
+def test_backfill_covers_games_without_events(db):
+    _players(db, "Anna", "Bram")
+    db.execute(
+        "INSERT INTO games (id, datum, spelers, starter, stapel_geschud, winnaar) VALUES (7, '2024-01-01 20:00:00', 'Anna,Bram', 'Anna', 1, 'Bram')"
+    )
+    db.commit()
+
+    assert backfill_events(db, "sqlite") == 1
+    assert backfill_events(db, "sqlite") == 0
+    assert _events(db, 7) == [
+        (1, "game_started", None), (2, "starter_chosen", "Anna"), (3, "deck_shuffled", None), (4, "winner_set", "Bram"),
+    ]
+
+
+def test_open_games_stay_out_of_snapshots(db):
+    _players(db, "Anna", "Bram")
+    repository = GameRepository(db, "sqlite")
+    abandoned = GameSession(["Anna", "Bram"])
+    repository.record_game(abandoned)
+    late = GameSession(["Anna", "Bram"])
+    late.game_id = repository.record_game(late)
+    late.set_starter("Bram")
+    repository.record_progress(late)
+
+    replay_stats(db, "sqlite", snapshot_interval=1)
+    payload = db.execute("SELECT payload FROM stats_snapshots ORDER BY id DESC LIMIT 1").fetchone()[0]
+    assert "open_games" not in payload
+
+    # Na het snapshot afgerond: de starter komt uit de eerdere events van het spel
+    late.set_winner("Bram")
+    repository.record_game(late)
+    state = replay_stats(db, "sqlite")
+    assert state.players["Bram"][:4] == [1, 1, 1, 1]
+    assert state.open_games == {}
+
+
+def test_late_commit_below_snapshot_is_replayed(db):
+    insert = """
+        INSERT INTO game_events (id, game_id, seq, event_type, speler, data, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, '2024-01-01 20:00:00')
+    """
+    started = '{"spelers": ["Anna", "Bram"]}'
+    db.executemany(insert, [(1, 1, 1, "game_started", None, started), (2, 1, 2, "winner_set", "Anna", None)])
+    # Ids 3 en 4 zijn uitgedeeld aan een transactie die nog niet gecommit is
+    db.executemany(insert, [(5, 3, 1, "game_started", None, started), (6, 3, 2, "winner_set", "Anna", None)])
+    db.commit()
+    replay_stats(db, "sqlite", snapshot_interval=1)
+    assert load_snapshot(db).pending == {3, 4}
+
+    db.executemany(insert, [(3, 2, 1, "game_started", None, started), (4, 2, 2, "winner_set", "Bram", None)])
+    db.commit()
+    state = replay_stats(db, "sqlite")
+    assert state.players["Anna"][:2] == [3, 2]
+    assert state.players["Bram"][:2] == [3, 1]
+    assert state.pending == set()
+
+
+def test_repeated_progress_writes_only_new_events(db):
+    _players(db, "Anna", "Bram")
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)
+    session.set_starter("Anna")
+    inserts = []
+    db.set_trace_callback(lambda statement: inserts.append(statement) if "INTO game_events" in statement else None)
+    for _ in range(5):
+        repository.record_progress(session)
+    session.set_winner("Anna")
+    repository.record_game(session)
+    db.set_trace_callback(None)
+
+    # Eén insert voor starter_chosen en één voor winner_set: geen verbruikte ids
+    assert len(inserts) == 2
+    assert db.execute("SELECT MAX(id) - COUNT(*) FROM game_events").fetchone()[0] == 0
+    state = replay_stats(db, "sqlite", snapshot_interval=1)
+    assert state.pending == set()
+    assert load_snapshot(db).pending == set()
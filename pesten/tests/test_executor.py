@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from pesten.executor import DatabaseExecutor
+
+
+def slow_connection():
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.create_function('sleep', 1, lambda seconds: time.sleep(seconds) or seconds)
+    return conn
+
+
+def test_event_loop_stays_responsive_during_slow_query():
+    conn = slow_connection()
+    executor = DatabaseExecutor()
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        result = await executor.run(lambda: conn.execute("SELECT sleep(0.3)").fetchone()[0])
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        return result, ticks, elapsed
+
+    result, ticks, elapsed = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert result == 0.3
+    assert elapsed >= 0.3
+    # De loop moet tijdens de query gewoon doorgetikt hebben (~30 ticks).
+    assert ticks >= 10
+
+
+def test_errors_are_raised_in_the_awaiting_handler():
+    conn = slow_connection()
+    executor = DatabaseExecutor()
+
+    async def scenario():
+        await executor.run(conn.execute, "SELECT * FROM bestaat_niet")
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(scenario())
+    executor.shutdown()
+
+
+def test_parallel_call_does_not_hold_up_the_database_thread():
+    conn = slow_connection()
+    executor = DatabaseExecutor()
+
+    async def scenario():
+        # Bv. een verbindingsprobe naar een onbereikbare server
+        probe = asyncio.ensure_future(executor.run_parallel(time.sleep, 0.3))
+        start = time.perf_counter()
+        await executor.run(lambda: conn.execute("SELECT 1").fetchone())
+        elapsed = time.perf_counter() - start
+        await probe
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+    executor.shutdown()
+    assert elapsed < 0.2
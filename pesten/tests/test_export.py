@@ -0,0 +1,117 @@
+import csv
+import json
+import os
+import threading
+
+import pytest
+
+from pesten.export import (
+    EXPORT_HEADER, ExportCancelled, JsonLinesWriter, count_games, export_games, export_games_csv,
+    export_incremental, load_checkpoint,
+)
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+
+
+def add_games(db, count):
+    db.executemany(
+        "INSERT INTO games (spelers, winnaar, starter, stapel_geschud) VALUES (?, ?, ?, ?)",
+        [("Anna,Bram", "Anna" if i % 2 else None, "Bram", i % 2) for i in range(count)],
+    )
+    db.commit()
+
+
+def test_export_streams_all_games_in_chunks(db, tmp_path):
+    add_games(db, 25)
+    path = tmp_path / "spellen.csv"
+    progress = []
+
+    assert count_games(db) == 25
+    assert export_games_csv(db, str(path), chunk_size=10, progress=progress.append) == 25
+
+    assert progress == [10, 20, 25]
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == EXPORT_HEADER
+    assert len(rows) == 26
+    assert rows[1] == ["1", "Anna,Bram", "", "Bram", "0"]
+    assert rows[2] == ["2", "Anna,Bram", "Anna", "Bram", "1"]
+
+
+def test_cancelled_export_removes_partial_file(db, tmp_path):
+    add_games(db, 25)
+    path = tmp_path / "spellen.csv"
+    cancel = threading.Event()
+
+    with pytest.raises(ExportCancelled):
+        export_games_csv(db, str(path), chunk_size=10, progress=lambda n: cancel.set(), cancel=cancel)
+
+    assert not path.exists()
+
+
+def test_incremental_export_appends_only_new_games(db, tmp_path):
+    path = str(tmp_path / "spellen.csv")
+    add_games(db, 3)
+    assert export_incremental(db, path) == 3
+    assert export_incremental(db, path) == 0
+
+    add_games(db, 2)
+    assert export_incremental(db, path) == 2
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert [row[0] for row in rows] == ["Spel ID", "1", "2", "3", "4", "5"]
+    assert load_checkpoint(path + ".checkpoint.json")["last_id"] == 5
+
+
+def test_game_in_progress_is_exported_once_it_is_finished(db, tmp_path):
+    path = str(tmp_path / "spellen.csv")
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    add_games(db, 1)
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)
+    add_games(db, 1)
+
+    # Het lopende spel en alles erna wachten op de uitslag
+    assert export_incremental(db, path) == 1
+    assert load_checkpoint(path + ".checkpoint.json")["last_id"] == 1
+
+    session.set_winner("Bram")
+    repository.record_game(session)
+    assert export_incremental(db, path) == 2
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert [(row[0], row[2]) for row in rows[1:]] == [("1", ""), (str(session.game_id), "Bram"), ("3", "")]
+
+
+def test_failed_append_is_rolled_back_and_retried(db, tmp_path):
+    path = str(tmp_path / "spellen.jsonl")
+    add_games(db, 2)
+    export_incremental(db, path, fmt="jsonl")
+    size = os.path.getsize(path)
+
+    add_games(db, 25)
+    cancel = threading.Event()
+    writer = JsonLinesWriter(path, append=True)
+    with pytest.raises(ExportCancelled):
+        export_games(db, writer, since_id=2, chunk_size=10, progress=lambda n: cancel.set(), cancel=cancel)
+    assert os.path.getsize(path) == size
+
+    assert export_incremental(db, path, fmt="jsonl") == 25
+    with open(path, encoding='utf-8') as f:
+        games = [json.loads(line) for line in f]
+    assert [game["id"] for game in games] == list(range(1, 28))
+    assert games[0]["spelers"] == "Anna,Bram" and games[0]["winnaar"] is None
+
+
+def test_incremental_parquet_writes_one_file_per_run(db, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "spellen")
+    add_games(db, 3)
+    export_incremental(db, path, fmt="parquet")
+    add_games(db, 2)
+    export_incremental(db, path, fmt="parquet")
+
+    assert sorted(os.listdir(path)) == ["games-1-3.parquet", "games-4-5.parquet"]
+    assert pq.read_table(os.path.join(path, "games-4-5.parquet")).column("id").to_pylist() == [4, 5]
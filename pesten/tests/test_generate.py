@@ -0,0 +1,31 @@
+from pesten.generate import generate, player_names
+from pesten.stats import rebuild_player_stats
+
+STATS_SQL = "SELECT * FROM player_stats ORDER BY speler"
+
+
+def test_generated_history_is_consistent(db):
+    dataset = generate(db, "sqlite", players=30, games=500, seed=1, chunk_size=64)
+    assert (dataset.first_game_id, dataset.last_game_id) == (1, 500)
+    assert db.execute("SELECT COUNT(*) FROM scores").fetchone()[0] == 30
+    assert db.execute("SELECT COUNT(*) FROM games WHERE winnaar IS NULL OR starter IS NULL").fetchone()[0] == 0
+    # Elke winnaar en starter speelde mee, en elk spel heeft precies één van beide in game_players
+    assert db.execute("SELECT SUM(is_winner), SUM(is_starter) FROM game_players").fetchone() == (500, 500)
+    assert db.execute("SELECT SUM(wins) FROM scores").fetchone()[0] == 500
+    stats = db.execute(STATS_SQL).fetchall()
+    rebuild_player_stats(db)
+    assert db.execute(STATS_SQL).fetchall() == stats
+
+
+def test_same_seed_gives_same_games(db, remote_db):
+    generate(db, "sqlite", players=10, games=50, seed=7)
+    generate(remote_db, "sqlite", players=10, games=50, seed=7)
+    query = "SELECT uuid, spelers, starter, stapel_geschud, winnaar FROM games ORDER BY id"
+    assert db.execute(query).fetchall() == remote_db.execute(query).fetchall()
+
+
+def test_player_names_are_unique():
+    names = player_names(100)
+    assert len(set(names)) == 100
+    assert names[:2] == ["Anna", "Bram"]
+    assert names[26] == "Anna 2"
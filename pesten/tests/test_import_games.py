@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from pesten.export import export_games_csv
+from pesten.import_games import import_games
+from pesten.session import GameSession, flush_session
+
+GAMES_SQL = "SELECT id, spelers, winnaar, starter, stapel_geschud FROM games ORDER BY id"
+
+
+def play(db, spelers, starter, winnaar, shuffles=0):
+    session = GameSession(spelers)
+    session.set_starter(starter)
+    for _ in range(shuffles):
+        session.shuffle()
+    session.set_winner(winnaar)
+    flush_session(db, "sqlite", session)
+
+
+def test_export_import_round_trip(db, remote_db, tmp_path):
+    for name in ["Anna", "Bram", "Cor"]:
+        db.execute("INSERT INTO scores (speler, wins) VALUES (?, 0)", (name,))
+    play(db, ["Anna", "Bram"], "Anna", "Bram", 1)
+    play(db, ["Anna", "Bram", "Cor"], "Cor", "Anna")
+    play(db, ["Bram", "Cor"], "Bram", "Bram")
+    path = tmp_path / "spellen.csv"
+    export_games_csv(db, str(path))
+
+    restored = remote_db
+    with open(path, newline='', encoding='utf-8') as f:
+        result = import_games(restored, "sqlite", f, chunk_size=2)
+
+    assert (result.imported, result.skipped, result.invalid, result.players_added) == (3, 0, 0, 3)
+    assert restored.execute(GAMES_SQL).fetchall() == db.execute(GAMES_SQL).fetchall()
+    assert restored.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [
+        ("Anna", 1), ("Bram", 2), ("Cor", 0),
+    ]
+    stats = "SELECT speler, games_played, wins, starts FROM player_stats ORDER BY speler"
+    assert restored.execute(stats).fetchall() == db.execute(stats).fetchall()
+
+    # Nogmaals importeren verandert niets
+    with open(path, newline='', encoding='utf-8') as f:
+        again = import_games(restored, "sqlite", f)
+    assert (again.imported, again.skipped) == (0, 3)
+    assert restored.execute("SELECT SUM(wins) FROM scores").fetchone()[0] == 3
+
+
+def test_invalid_rows_are_reported_and_skipped(db):
+    csv_file = io.StringIO(
+        "Spel ID,Spelers,Winnaar,Starter,Stapel Geschud\n"
+        "1,\"Anna,Bram\",Anna,Bram,0\n"
+        "x,\"Anna,Bram\",Anna,Bram,0\n"
+        "3,,,,0\n"
+        "4,\"Anna,Bram\",Cor,,0\n"
+        "5,\"Anna,Bram\",,Anna,ja\n"
+        "6,Anna\n"
+        "1,\"Anna,Bram\",Bram,,0\n"
+    )
+    result = import_games(db, "sqlite", csv_file)
+
+    assert (result.imported, result.skipped, result.invalid) == (1, 1, 5)
+    assert [line for line, _ in result.errors] == [3, 4, 5, 6, 7]
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 1), ("Bram", 0)]
+
+
+def test_merge_assigns_new_ids(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    play(db, ["Anna", "Bram"], "Anna", "Anna")
+    csv_file = io.StringIO("Spel ID,Spelers,Winnaar,Starter,Stapel Geschud\n1,\"Cor,Dirk\",Dirk,Cor,1\n")
+
+    result = import_games(db, "sqlite", csv_file, keep_ids=False)
+
+    assert result.imported == 1
+    assert db.execute(GAMES_SQL).fetchall()[1] == (2, "Cor,Dirk", "Dirk", "Cor", 1)
+    assert db.execute("SELECT speler, wins FROM scores WHERE wins > 0 ORDER BY speler").fetchall() == [("Anna", 1), ("Dirk", 1)]
+
+
+def test_unknown_header_is_rejected(db):
+    with pytest.raises(ValueError):
+        import_games(db, "sqlite", io.StringIO("id;spelers\n1;Anna\n"))
@@ -0,0 +1,41 @@
+import json
+import logging
+
+from pesten.export import export_games_csv
+from pesten.instrument import QueryStats, instrument, stats_from_environment
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+
+
+def test_disabled_instrumentation_returns_the_raw_connection(db):
+    assert stats_from_environment({}) is None
+    assert instrument(db, None) is db
+
+
+def test_queries_are_counted_with_rows_and_histogram(db, tmp_path):
+    stats = QueryStats(slow_query_ms=1000)
+    conn = instrument(db, stats)
+    conn.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    repository = GameRepository(conn, "sqlite")
+    for _ in range(3):
+        repository.players()
+    export_games_csv(conn, str(tmp_path / "spellen.csv"))
+
+    summary = stats.summary()
+    by_sql = {item['sql']: item for item in summary['statements']}
+    players = by_sql["SELECT speler FROM scores ORDER BY speler"]
+    assert (players['calls'], players['rows']) == (3, 6)
+    assert sum(players['histogram'].values()) == 3
+    assert by_sql["INSERT INTO scores (speler, wins) VALUES (?, 0)"]['rows'] == 2
+    assert summary['slow_queries'] == 0
+
+    stats.dump(str(tmp_path / "stats.json"))
+    with open(tmp_path / "stats.json", encoding='utf-8') as f:
+        assert json.load(f) == summary
+
+
+def test_slow_queries_are_logged_with_parameters(db, caplog):
+    conn = instrument(db, QueryStats(slow_query_ms=0))
+    with caplog.at_level(logging.WARNING, logger='pesten.sql'):
+        GameRepository(conn, "sqlite").record_game(GameSession(["Anna", "Bram"]))
+    assert any("INSERT INTO games" in record.getMessage() and "Anna,Bram" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,121 @@
+import pytest
+
+from pesten.game_players import backfill_game_players
+from pesten.leaderboard import LeaderboardModel, LeaderboardRow, fetch_leaderboard
+from pesten.stats import rebuild_player_stats
+
+
+@pytest.fixture
+def history(db):
+    db.executemany("INSERT INTO scores VALUES (?, ?)", [("Jan", 1), ("Janneke", 2), ("Piet", 0)])
+    db.executemany("INSERT INTO games (spelers, winnaar, starter) VALUES (?, ?, ?)", [
+        ("Jan,Piet", "Jan", "Piet"),
+        ("Janneke,Piet", "Janneke", None),
+        ("Janneke", "Janneke", "Janneke"),
+    ])
+    db.commit()
+    return db
+
+
+def test_backfill_game_players_is_exact_and_idempotent(history):
+    assert backfill_game_players(history, "sqlite", chunk_size=2) == 3
+    assert backfill_game_players(history, "sqlite") == 0
+    rows = history.execute(
+        "SELECT game_id, speler, is_starter, is_winner FROM game_players ORDER BY game_id, speler"
+    ).fetchall()
+    assert rows == [
+        (1, "Jan", 0, 1),
+        (1, "Piet", 1, 0),
+        (2, "Janneke", 0, 1),
+        (2, "Piet", 0, 0),
+        (3, "Janneke", 1, 1),
+    ]
+
+
+def test_fetch_leaderboard_single_query(history):
+    backfill_game_players(history, "sqlite")
+    rebuild_player_stats(history)
+    rows = fetch_leaderboard(history.cursor())
+    assert [(r.speler, r.wins, r.games_played) for r in rows] == [
+        ("Janneke", 2, 2),
+        ("Jan", 1, 1),
+        ("Piet", 0, 2),
+    ]
+    assert rows[0].percentage == 100.0
+    assert rows[2].percentage == 0.0
+
+
+def test_leaderboard_takes_wins_from_player_stats(history):
+    backfill_game_players(history, "sqlite")
+    rebuild_player_stats(history)
+    # scores loopt uit de pas met player_stats: het percentage blijft kloppen
+    history.execute("UPDATE scores SET wins = 7 WHERE speler = 'Jan'")
+    rows = fetch_leaderboard(history.cursor())
+    assert [(r.speler, r.wins, r.games_played, r.percentage) for r in rows] == [
+        ("Janneke", 2, 2, 100.0),
+        ("Jan", 1, 1, 100.0),
+        ("Piet", 0, 2, 0.0),
+    ]
+
+
+class RecordingListener:
+    def __init__(self):
+        self.events = []
+
+    def reset(self, rows):
+        self.events.append(('reset', len(rows)))
+
+    def insert(self, index, row):
+        self.events.append(('insert', index, row.speler))
+
+    def remove(self, index):
+        self.events.append(('remove', index))
+
+    def change(self, index, row):
+        self.events.append(('change', index, row.speler))
+
+
+def _model(player_count):
+    model = LeaderboardModel()
+    model.load([LeaderboardRow(f"Speler{i:05d}", i % 50, 60, 0.0) for i in range(player_count)])
+    listener = RecordingListener()
+    model.listeners.append(listener)
+    return model, listener
+
+
+def test_apply_game_updates_and_resorts_only_participants(history):
+    backfill_game_players(history, "sqlite")
+    rebuild_player_stats(history)
+    model = LeaderboardModel()
+    model.load(fetch_leaderboard(history.cursor()))
+    listener = RecordingListener()
+    model.listeners.append(listener)
+
+    model.apply_game(["Jan", "Piet"], "Jan")
+    assert [(r.speler, r.wins, r.games_played) for r in model.rows] == [
+        ("Jan", 2, 2),
+        ("Janneke", 2, 2),
+        ("Piet", 0, 3),
+    ]
+    # Jan schuift één plek omhoog, Piet blijft staan
+    assert listener.events == [('remove', 1), ('insert', 0, 'Jan'), ('change', 2, 'Piet')]
+
+    # Het model komt overeen met een volledige herlaadactie
+    history.execute("UPDATE scores SET wins = wins + 1 WHERE speler = 'Jan'")
+    history.execute("INSERT INTO games (spelers, winnaar, starter) VALUES ('Jan,Piet', 'Jan', NULL)")
+    history.commit()
+    backfill_game_players(history, "sqlite")
+    rebuild_player_stats(history)
+    assert model.rows == fetch_leaderboard(history.cursor())
+
+
+def test_redraw_work_is_flat_as_player_count_grows():
+    counts = {}
+    for player_count in (100, 1000, 10000):
+        model, listener = _model(player_count)
+        model.apply_game(["Speler00003", "Speler00042", "Speler00077"], "Speler00003")
+        counts[player_count] = len(listener.events)
+        assert model.rows == sorted(model.rows, key=lambda r: (-r.wins, r.speler))
+        assert model.get("Speler00003").wins == 4
+    # Alleen de drie deelnemers worden opnieuw getekend, niet de hele lijst
+    assert counts[100] == counts[1000] == counts[10000] <= 6
@@ -0,0 +1,55 @@
+import sqlite3
+
+from pesten.db import connect_sqlite
+from pesten.migrations import LATEST_VERSION, current_version, migrate
+
+
+def test_fresh_database_reaches_latest_version():
+    conn = sqlite3.connect(':memory:')
+    assert current_version(conn) == 0
+    assert migrate(conn, "sqlite") == LATEST_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"scores", "games", "game_players", "player_stats", "outbox", "schema_version"} <= tables
+
+
+def test_up_to_date_database_needs_a_single_read(db):
+    statements = []
+    db.set_trace_callback(statements.append)
+    assert migrate(db, "sqlite") == LATEST_VERSION
+    assert statements == ["SELECT MAX(version) FROM schema_version"]
+
+
+def test_legacy_database_is_upgraded_and_backfilled():
+    # Schema zoals de app het vóór de migraties aanmaakte
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE scores (speler TEXT PRIMARY KEY, wins INTEGER DEFAULT 0)")
+    conn.execute("""
+        CREATE TABLE games (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            datum TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            spelers TEXT NOT NULL,
+            winnaar TEXT,
+            starter TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO scores VALUES (?, ?)", [("Anna", 1), ("Bram", 0)])
+    conn.execute("INSERT INTO games (spelers, winnaar, starter) VALUES ('Anna,Bram', 'Anna', 'Bram')")
+    conn.commit()
+
+    assert migrate(conn, "sqlite") == LATEST_VERSION
+    assert conn.execute("SELECT stapel_geschud, uuid FROM games").fetchone() == (0, None)
+    assert conn.execute("SELECT COUNT(*) FROM game_players").fetchone()[0] == 2
+    assert conn.execute(
+        "SELECT speler, games_played, wins, starts FROM player_stats ORDER BY speler"
+    ).fetchall() == [("Anna", 1, 1, 0), ("Bram", 1, 0, 1)]
+
+
+def test_tuned_sqlite_profile_uses_wal_and_game_indexes(tmp_path):
+    conn = connect_sqlite(str(tmp_path / "pesten.sqlite3"), cache_size=2048, mmap_size=1024 * 1024)
+    migrate(conn, "sqlite")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM games WHERE winnaar = 'Anna'"))
+    assert "idx_games_in_progress" in plan
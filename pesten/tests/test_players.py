@@ -0,0 +1,59 @@
+import io
+
+from pesten.players import SEARCH_SQL, PlayerDirectory, import_players, nocase_range, read_player_names
+
+
+def test_read_player_names_from_csv_or_text():
+    csv_file = io.StringIO("speler,lid sinds\nAnna,2020\n\nBram,2021\n  Cor  ,2022\n")
+    assert list(read_player_names(csv_file)) == ["Anna", "Bram", "Cor"]
+    assert list(read_player_names(io.StringIO("Anna\nBram\n"))) == ["Anna", "Bram"]
+
+
+def test_import_players_dedupes_and_skips_existing(db):
+    db.execute("INSERT INTO scores (speler, wins) VALUES ('Bram', 3)")
+    db.commit()
+
+    names = ["Anna", "Bram", "Anna", "Cor", "Dirk", "Cor"]
+    inserted, skipped = import_players(db, "sqlite", names, chunk_size=2)
+
+    assert (inserted, skipped) == (3, 3)
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [
+        ("Anna", 0), ("Bram", 3), ("Cor", 0), ("Dirk", 0),
+    ]
+
+
+def test_player_directory_pages_by_activity(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [(f"speler{i:02d}",) for i in range(7)])
+    db.executemany(
+        "INSERT INTO player_stats (speler, games_played, last_played) VALUES (?, ?, ?)",
+        [("speler05", 3, "2024-05-02"), ("speler03", 9, "2024-05-01"), ("speler01", 1, "2024-05-01")],
+    )
+    db.commit()
+    directory = PlayerDirectory(page_size=3)
+
+    assert directory.page(db, "sqlite") == (["speler05", "speler03", "speler01"], True)
+    assert directory.page(db, "sqlite", page=2) == (["speler06"], False)
+
+    # Gecachte volgorde tot invalidate()
+    db.execute("UPDATE player_stats SET last_played = '2024-06-01' WHERE speler = 'speler01'")
+    assert directory.page(db, "sqlite")[0][0] == "speler05"
+    directory.invalidate()
+    assert directory.page(db, "sqlite")[0][0] == "speler01"
+
+
+def test_player_search_is_an_indexed_case_insensitive_prefix_query(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("annemie",), ("Bram",), ("an_dre",), ("Andre",)])
+    directory = PlayerDirectory(page_size=2)
+
+    assert directory.page(db, "sqlite", "AN") == (["Andre", "Anna"], True)
+    assert directory.page(db, "sqlite", "an", page=1) == (["an_dre", "annemie"], False)
+    assert directory.page(db, "sqlite", "an_") == (["an_dre"], False)
+    assert directory.page(db, "sqlite", "BRAZ") == ([], False)
+
+    plan = db.execute("EXPLAIN QUERY PLAN " + SEARCH_SQL["sqlite"], nocase_range("an") + (3, 0)).fetchall()
+    assert "SEARCH s USING COVERING INDEX idx_scores_speler_nocase" in plan[0][3]
+
+
+def test_nocase_range_folds_only_ascii_letters():
+    assert nocase_range("AnZ") == ("anz", "an{")
+    assert nocase_range("Ém") == ("Ém", "Én")
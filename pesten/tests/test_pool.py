@@ -0,0 +1,151 @@
+import pytest
+
+from pesten.pool import ConnectionPool, create_pool, mysql_connect_factory
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class FlakyConnect:
+    """Connect-functie die eerst `failures` keer faalt."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.created = []
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection refused")
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+
+def test_reuses_live_connections():
+    connect = FlakyConnect()
+    pool = ConnectionPool(connect, size=1)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert pool.metrics.as_dict() == {
+        'hits': 1, 'connects': 1, 'reconnects': 0, 'failed_pings': 0, 'connect_failures': 0,
+    }
+
+
+def test_replaces_dead_connection_after_failed_ping():
+    connect = FlakyConnect()
+    pool = ConnectionPool(connect)
+    with pool.connection() as first:
+        pass
+    first.alive = False  # bv. wait_timeout van de server verlopen
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert first.closed
+    assert pool.metrics.failed_pings == 1
+    assert pool.metrics.reconnects == 1
+
+
+def test_bounded_backoff_between_reconnect_attempts():
+    delays = []
+    connect = FlakyConnect()
+    pool = ConnectionPool(connect, max_retries=4, backoff=0.5, max_backoff=1.0, sleep=delays.append)
+    with pool.connection() as first:
+        pass
+    first.alive = False
+    connect.failures = 3
+    with pool.connection():
+        pass
+    assert delays == [0.5, 1.0, 1.0]
+    assert pool.metrics.connect_failures == 3
+    assert pool.metrics.reconnects == 1
+
+
+def test_gives_up_after_max_retries():
+    connect = FlakyConnect()
+    pool = ConnectionPool(connect, max_retries=2, sleep=lambda _: None)
+    with pool.connection() as first:
+        pass
+    first.alive = False
+    connect.failures = 5
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert connect.failures == 3
+
+
+def test_first_connect_is_a_single_attempt():
+    delays = []
+    connect = FlakyConnect(failures=1)
+    pool = ConnectionPool(connect, sleep=delays.append)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert delays == []
+    assert pool.metrics.connect_failures == 1
+
+
+def test_probe_uses_its_own_connect_and_fills_the_pool():
+    probe_connect = FlakyConnect(failures=1)
+    pool = ConnectionPool(FlakyConnect(), probe_connect=probe_connect)
+    with pytest.raises(ConnectionError):
+        pool.probe()
+    pool.probe()
+    with pool.connection() as conn:
+        assert conn is probe_connect.created[0]
+    assert pool.metrics.as_dict() == {
+        'hits': 1, 'connects': 1, 'reconnects': 0, 'failed_pings': 0, 'connect_failures': 1,
+    }
+
+
+def test_connection_is_discarded_after_error():
+    connect = FlakyConnect()
+    pool = ConnectionPool(connect)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("query mislukt")
+    assert connect.created[0].closed
+    with pool.connection() as conn:
+        assert conn is connect.created[1]
+
+
+def test_connect_factory_maps_timeouts_per_driver():
+    calls = []
+
+    class pymysql:
+        @staticmethod
+        def connect(**kwargs):
+            calls.append(kwargs)
+
+    config = {'host': 'db', 'user': 'u', 'pool_size': 4, 'connect_timeout': 3, 'read_timeout': 9}
+    mysql_connect_factory(config, pymysql)()
+    assert calls[-1] == {'host': 'db', 'user': 'u', 'connect_timeout': 3, 'read_timeout': 9, 'write_timeout': 9}
+
+
+def test_probe_connects_with_a_short_timeout():
+    calls = []
+
+    class pymysql:
+        @staticmethod
+        def connect(**kwargs):
+            calls.append(kwargs)
+            return FakeConnection()
+
+    pool = create_pool({'host': 'db', 'connect_timeout': 10}, pymysql)
+    pool.probe()
+    assert calls[-1]['connect_timeout'] == 2
+    pool.close_all()
+    with pool.connection():
+        pass
+    assert calls[-1]['connect_timeout'] == 10
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+import time
+
+from pesten.executor import DatabaseExecutor
+from pesten.profiling import HandlerProfiler, profiler_from_environment, summarize
+
+
+class FakeApp:
+    def __init__(self, db):
+        self.db = db
+        self.built = []
+
+    def build_screen(self, widget=None):
+        time.sleep(0.02)  # widgets bouwen
+        self.built.append(widget)
+
+    async def show_scores(self, widget=None):
+        await self.db.run(time.sleep, 0.05)
+        self.build_screen(widget)
+
+
+def test_handlers_are_split_in_db_and_ui_time(tmp_path):
+    path = str(tmp_path / "ui-profile.jsonl")
+    profiler = HandlerProfiler(path, cprofile_handler="show_scores")
+    executor = DatabaseExecutor()
+    executor.timer = profiler.add_db_time
+    app = FakeApp(executor)
+    profiler.wrap_methods(app, ["build_screen", "show_scores"])
+
+    asyncio.run(app.show_scores("knop"))
+    app.build_screen("knop")
+    executor.shutdown()
+
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert [(entry['handler'], entry['parent']) for entry in entries] == [
+        ("build_screen", "show_scores"), ("show_scores", None), ("build_screen", None),
+    ]
+    scores = entries[1]
+    assert scores['db_ms'] >= 50 and scores['ui_ms'] >= 20
+    assert scores['wall_ms'] >= scores['db_ms'] + 20
+    assert entries[0]['db_ms'] == 0
+    assert os.path.exists(scores['cprofile'])
+    assert 'cprofile' not in entries[2]
+    assert app.built == ["knop", "knop"]
+    assert summarize(path)["build_screen"]["calls"] == 2
+
+
+def test_profiling_is_opt_in(tmp_path):
+    assert profiler_from_environment(str(tmp_path), {}) is None
+    assert profiler_from_environment(str(tmp_path), {'PESTEN_PROFILE_UI': '1'}) is not None
@@ -0,0 +1,72 @@
+import pytest
+
+from pesten.generate import generate
+from pesten.ratings import DEFAULT_RATING, K_FACTOR, _split_fast, fetch_ratings, rate_game, recompute_ratings
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+
+
+def _ratings(conn):
+    return {rating.speler: (pytest.approx(rating.rating), rating.games) for rating in fetch_ratings(conn.cursor())}
+
+
+def test_equal_players_exchange_half_k():
+    ratings, played = {}, {}
+    rate_game(ratings, played, ["Anna", "Bram"], "Anna")
+    assert ratings == {"Anna": DEFAULT_RATING + K_FACTOR / 2, "Bram": DEFAULT_RATING - K_FACTOR / 2}
+    assert played == {"Anna": 1, "Bram": 1}
+
+
+def test_table_size_does_not_change_the_stakes():
+    ratings, played = {}, {}
+    rate_game(ratings, played, ["Anna", "Bram", "Cor", "Daan", "Eva", "Fenna"], "Cor")
+    assert ratings["Cor"] == pytest.approx(DEFAULT_RATING + K_FACTOR / 2)
+    assert sum(ratings.values()) == pytest.approx(6 * DEFAULT_RATING)
+    # Winnen van een sterkere speler levert meer op
+    rate_game(ratings, played, ["Anna", "Cor"], "Anna")
+    assert ratings["Anna"] - (DEFAULT_RATING - K_FACTOR / 10) > K_FACTOR / 2
+
+
+def test_incremental_updates_match_batch_recompute(db):
+    generate(db, "sqlite", players=8, games=200, seed=2)
+    repository = GameRepository(db, "sqlite")
+    repository.record_game(GameSession(["Anna", "Bram", "Cor"], starter="Anna", winnaar="Cor"))
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)
+    session.set_winner("Bram")
+    repository.record_game(session)
+    incremental = _ratings(db)
+
+    assert recompute_ratings(db, "sqlite") == 202
+    assert _ratings(db) == incremental
+
+
+def test_overlapping_games_are_rated_in_finish_order(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",), ("Cor",)])
+    repository = GameRepository(db, "sqlite")
+    # Twee tafels: het eerst begonnen spel is het laatst klaar
+    first = GameSession(["Anna", "Bram"], started_at="2024-05-01 20:00:00")
+    first.game_id = repository.record_game(first)
+    second = GameSession(["Anna", "Cor"], started_at="2024-05-01 20:05:00")
+    second.game_id = repository.record_game(second)
+    second.set_winner("Anna")
+    repository.record_game(second)
+    first.set_winner("Bram")
+    repository.record_game(first)
+    incremental = _ratings(db)
+
+    assert recompute_ratings(db, "sqlite") == 2
+    assert _ratings(db) == incremental
+
+
+def test_correction_recomputes_ratings(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    repository = GameRepository(db, "sqlite")
+    game_id = repository.record_game(GameSession(["Anna", "Bram"], winnaar="Anna"))
+    assert repository.correct_result(game_id, "Bram")
+    assert _ratings(db) == {"Anna": (DEFAULT_RATING - K_FACTOR / 2, 1), "Bram": (DEFAULT_RATING + K_FACTOR / 2, 1)}
+
+
+def test_messy_player_lists_are_cleaned():
+    assert _split_fast("Anna,Bram 2") == ["Anna", "Bram 2"]
+    assert _split_fast("Anna, Bram,,Anna") == ["Anna", "Bram"]
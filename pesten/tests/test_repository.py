@@ -0,0 +1,38 @@
+from pesten.repository import GameRepository
+from pesten.session import GameSession
+from pesten.stats import rebuild_player_stats
+
+STATS_SQL = "SELECT speler, games_played, wins, starts, wins_as_starter, shuffles_seen FROM player_stats ORDER BY speler"
+
+
+def test_game_recorded_step_by_step(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",), ("Cor",)])
+    repository = GameRepository(db, "sqlite")
+
+    session = GameSession(["Anna", "Bram", "Cor"])
+    session.game_id = repository.record_game(session)
+    assert db.execute(STATS_SQL).fetchall() == []
+
+    session.set_starter("Bram")
+    repository.record_progress(session)
+    session.shuffle()
+    session.shuffle()
+    repository.record_progress(session)
+    session.set_winner("Bram")
+    repository.record_game(session)
+
+    assert db.execute(
+        "SELECT starter, stapel_geschud, winnaar FROM games WHERE id = ?", (session.game_id,)
+    ).fetchone() == ("Bram", 2, "Bram")
+    assert [(row.speler, row.wins, row.games_played) for row in repository.leaderboard()] == [
+        ("Bram", 1, 1), ("Anna", 0, 1), ("Cor", 0, 1),
+    ]
+    incremental = db.execute(STATS_SQL).fetchall()
+    assert incremental == [("Anna", 1, 0, 0, 0, 2), ("Bram", 1, 1, 1, 1, 2), ("Cor", 1, 0, 0, 0, 2)]
+    rebuild_player_stats(db)
+    assert db.execute(STATS_SQL).fetchall() == incremental
+
+
+def test_players_are_sorted(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Cor",), ("Anna",)])
+    assert GameRepository(db, "sqlite").players() == ["Anna", "Cor"]
@@ -0,0 +1,118 @@
+import pytest
+
+from pesten.repository import STATEMENTS, GameRepository
+from pesten.session import GameSession, SessionJournal, SessionManager, flush_session
+
+
+def test_journal_survives_restart(tmp_path):
+    journal = SessionJournal(str(tmp_path))
+    session = GameSession(["Anna", "Bram"])
+    session.set_starter("Bram")
+    session.shuffle()
+    journal.save(session)
+
+    restored, = SessionJournal(str(tmp_path)).load_all()
+    assert restored.to_dict() == session.to_dict()
+    assert not restored.is_finished
+
+    journal.remove(session)
+    assert journal.load_all() == []
+
+
+def test_flush_writes_whole_game_in_one_transaction(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    session = GameSession(["Anna", "Bram"])
+    session.set_starter("Bram")
+    session.shuffle()
+    session.shuffle()
+    session.set_winner("Anna")
+
+    game_id = flush_session(db, "sqlite", session)
+
+    assert db.execute(
+        "SELECT spelers, starter, stapel_geschud, winnaar FROM games WHERE id = ?", (game_id,)
+    ).fetchone() == ("Anna,Bram", "Bram", 2, "Anna")
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 1), ("Bram", 0)]
+    assert db.execute(
+        "SELECT speler, is_starter, is_winner FROM game_players ORDER BY speler"
+    ).fetchall() == [("Anna", 0, 1), ("Bram", 1, 0)]
+
+
+def test_failed_flush_leaves_no_partial_game(db):
+    db.execute("DROP TABLE player_stats")
+    session = GameSession(["Anna"])
+    session.set_winner("Anna")
+
+    with pytest.raises(Exception):
+        flush_session(db, "sqlite", session)
+
+    assert db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 0
+    assert db.execute("SELECT COUNT(*) FROM game_players").fetchone()[0] == 0
+
+
+def test_manager_keeps_games_apart():
+    games = SessionManager()
+    first = games.start(["Anna", "Bram"])
+    second = games.start(["Cor", "Daan", "Eva"])
+    assert games.active is second
+
+    games.switch(first.uuid).set_starter("Bram")
+    games.active.shuffle()
+    assert (first.starter, first.shuffles) == ("Bram", 1)
+    assert (second.starter, second.shuffles) == (None, 0)
+
+    games.remove(first)
+    assert games.active is None
+    assert list(games) == [second]
+    # Compact: geen __dict__ per spel
+    assert not hasattr(second, '__dict__')
+
+
+def test_registered_game_is_finished_once(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    repository = GameRepository(db, "sqlite")
+    session = GameSession(["Anna", "Bram"])
+    session.game_id = repository.record_game(session)
+    session.set_starter("Bram")
+    session.shuffle()
+    session.set_winner("Anna")
+
+    assert repository.record_game(session) == session.game_id
+    assert repository.record_game(session) == session.game_id
+    assert db.execute(
+        "SELECT starter, stapel_geschud, winnaar FROM games WHERE id = ?", (session.game_id,)
+    ).fetchone() == ("Bram", 1, "Anna")
+    assert db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 1), ("Bram", 0)]
+    assert db.execute(
+        "SELECT speler, is_starter, is_winner FROM game_players ORDER BY speler"
+    ).fetchall() == [("Anna", 0, 1), ("Bram", 1, 0)]
+    assert db.execute("SELECT speler, games_played FROM player_stats ORDER BY speler").fetchall() == [("Anna", 1), ("Bram", 1)]
+
+
+def test_in_progress_games_recovered_via_index(db):
+    repository = GameRepository(db, "sqlite")
+    old = GameSession(["Anna", "Bram"], started_at="2020-01-01 10:00:00")
+    done = GameSession(["Anna", "Bram"], winnaar="Anna")
+    running = GameSession(["Cor", "Daan"], starter="Daan", shuffles=2)
+    for session in (old, done, running):
+        repository.record_game(session)
+
+    recovered, = repository.in_progress("2024-01-01 00:00:00")
+    assert (recovered.uuid, recovered.spelers, recovered.starter, recovered.shuffles) == (running.uuid, ("Cor", "Daan"), "Daan", 2)
+    assert recovered.game_id is not None
+
+    plan = " ".join(row[3] for row in db.execute("EXPLAIN QUERY PLAN " + STATEMENTS["sqlite"]["in_progress"], ("2024-01-01",)))
+    assert "idx_games_in_progress" in plan
+
+
+def test_games_finished_elsewhere_are_reported(db):
+    repository = GameRepository(db, "sqlite")
+    running = GameSession(["Anna", "Bram"])
+    elsewhere = GameSession(["Cor", "Daan"])
+    for session in (running, elsewhere):
+        session.game_id = repository.record_game(session)
+    elsewhere.set_winner("Cor")
+    repository.record_game(elsewhere)
+
+    assert repository.finished([running.uuid, elsewhere.uuid, "onbekend"]) == {elsewhere.uuid}
+    assert repository.finished([]) == set()
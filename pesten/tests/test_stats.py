@@ -0,0 +1,60 @@
+from pesten.events import rebuild_from_events
+from pesten.session import GameSession, flush_session
+from pesten.stats import rebuild_player_stats
+
+STATS_SQL = """
+    SELECT speler, games_played, wins, starts, wins_as_starter, shuffles_seen
+    FROM player_stats ORDER BY speler
+"""
+
+
+def play(db, spelers, starter, winnaar, shuffles):
+    session = GameSession(spelers)
+    session.set_starter(starter)
+    for _ in range(shuffles):
+        session.shuffle()
+    session.set_winner(winnaar)
+    return flush_session(db, "sqlite", session)
+
+
+def test_incremental_stats_match_rebuild(db):
+    play(db, ["Anna", "Bram"], "Anna", "Anna", 2)
+    play(db, ["Anna", "Bram", "Cor"], "Cor", "Bram", 0)
+    play(db, ["Bram", "Cor"], "Bram", "Bram", 1)
+
+    incremental = db.execute(STATS_SQL).fetchall()
+    assert incremental == [
+        ("Anna", 2, 1, 1, 1, 2),
+        ("Bram", 3, 2, 1, 1, 3),
+        ("Cor", 2, 0, 1, 0, 1),
+    ]
+
+    assert rebuild_player_stats(db) == 3
+    assert db.execute(STATS_SQL).fetchall() == incremental
+
+
+def test_rebuild_skips_games_in_progress(db):
+    play(db, ["Anna", "Bram"], "Anna", "Anna", 0)
+    # Geregistreerd lopend spel (zoals _register_game in de app) dat nooit afloopt
+    flush_session(db, "sqlite", GameSession(["Anna", "Bram"]))
+
+    incremental = db.execute(STATS_SQL).fetchall()
+    assert incremental == [("Anna", 1, 1, 1, 1, 0), ("Bram", 1, 0, 0, 0, 0)]
+    rebuild_player_stats(db)
+    assert db.execute(STATS_SQL).fetchall() == incremental
+
+
+def test_last_played_is_the_game_date_in_every_path(db):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    for started_at in ("2024-05-02 20:00:00", "2024-05-01 20:00:00"):  # het oudere spel wordt later opgeslagen
+        session = GameSession(["Anna", "Bram"], started_at=started_at)
+        session.set_winner("Anna")
+        flush_session(db, "sqlite", session)
+    last_played = "SELECT speler, last_played FROM player_stats ORDER BY speler"
+    expected = [("Anna", "2024-05-02 20:00:00"), ("Bram", "2024-05-02 20:00:00")]
+
+    assert db.execute(last_played).fetchall() == expected
+    rebuild_player_stats(db)
+    assert db.execute(last_played).fetchall() == expected
+    rebuild_from_events(db, "sqlite")
+    assert db.execute(last_played).fetchall() == expected
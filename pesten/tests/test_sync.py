@@ -0,0 +1,49 @@
+from pesten.session import GameSession
+from pesten.sync import mirror_players, pending_count, record_offline, sync_outbox
+
+
+def finished_game(spelers, winnaar):
+    session = GameSession(spelers)
+    session.set_starter(spelers[0])
+    session.set_winner(winnaar)
+    return session
+
+
+def test_offline_games_sync_in_batches(db, remote_db):
+    remote_db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",)])
+    remote_db.commit()
+    for i in range(7):
+        record_offline(db, finished_game(["Anna", "Bram"], "Anna" if i % 2 else "Bram"))
+
+    assert pending_count(db) == 7
+    assert db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 7
+
+    assert sync_outbox(db, remote_db, "sqlite", batch_size=3) == 7
+    assert pending_count(db) == 0
+    assert remote_db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 7
+    assert remote_db.execute("SELECT speler, wins FROM scores ORDER BY speler").fetchall() == [("Anna", 3), ("Bram", 4)]
+
+
+def test_retried_sync_never_double_counts(db, remote_db):
+    remote_db.execute("INSERT INTO scores (speler, wins) VALUES ('Anna', 0)")
+    remote_db.commit()
+    session = finished_game(["Anna"], "Anna")
+    record_offline(db, session)
+    sync_outbox(db, remote_db, "sqlite")
+
+    # Zelfde spel opnieuw in de wachtrij, bv. omdat het verwijderen uit de
+    # outbox na een geslaagde push niet meer gelukt is.
+    db.execute("DELETE FROM games")
+    record_offline(db, session)
+    assert sync_outbox(db, remote_db, "sqlite") == 1
+
+    assert remote_db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 1
+    assert remote_db.execute("SELECT wins FROM scores").fetchone()[0] == 1
+    assert remote_db.execute("SELECT wins FROM player_stats").fetchone()[0] == 1
+
+
+def test_mirror_players(db, remote_db):
+    remote_db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 5)", [("Anna",), ("Bram",)])
+    remote_db.commit()
+    mirror_players(db, remote_db)
+    assert db.execute("SELECT speler FROM scores ORDER BY speler").fetchall() == [("Anna",), ("Bram",)]
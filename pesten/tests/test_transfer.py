@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from pesten.session import GameSession, flush_session
+from pesten.transfer import TABLES, TransferError, transfer, verify
+
+
+def fill(db, games):
+    db.executemany("INSERT INTO scores (speler, wins) VALUES (?, 0)", [("Anna",), ("Bram",), ("cor",)])
+    for i in range(games):
+        session = GameSession(["Anna", "Bram", "cor"][: 2 + i % 2])
+        session.set_starter("Bram")
+        session.set_winner(session.spelers[i % len(session.spelers)])
+        flush_session(db, "sqlite", session)
+    db.execute("DELETE FROM games WHERE id = 3")  # gat in de ids
+    db.commit()
+
+
+def assert_identical(checks):
+    assert [check.table for check in checks] == [table.name for table in TABLES]
+    for check in checks:
+        assert check.source_count == check.target_count
+        assert check.source_checksum == check.target_checksum
+
+
+def test_transfer_copies_everything_with_ids(db, remote_db, tmp_path):
+    fill(db, 7)
+    checkpoint = str(tmp_path / "transfer.json")
+
+    checks = transfer(db, "sqlite", remote_db, "sqlite", batch_size=2, checkpoint_path=checkpoint)
+
+    assert_identical(checks)
+    assert [row[0] for row in remote_db.execute("SELECT id FROM games ORDER BY id")] == [1, 2, 4, 5, 6, 7]
+    assert not os.path.exists(checkpoint)
+    with pytest.raises(TransferError):
+        transfer(db, "sqlite", remote_db, "sqlite", checkpoint_path=checkpoint)
+
+
+def test_transfer_resumes_after_interruption(db, remote_db, tmp_path, monkeypatch):
+    import pesten.transfer
+
+    fill(db, 9)
+    checkpoint = str(tmp_path / "transfer.json")
+    real_save = pesten.transfer.save_checkpoint
+    calls = []
+
+    def crash_after_some_batches(path, data):
+        real_save(path, data)
+        calls.append(path)
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(pesten.transfer, "save_checkpoint", crash_after_some_batches)
+    with pytest.raises(KeyboardInterrupt):
+        transfer(db, "sqlite", remote_db, "sqlite", batch_size=2, checkpoint_path=checkpoint)
+    assert os.path.exists(checkpoint)
+    assert remote_db.execute("SELECT COUNT(*) FROM games").fetchone()[0] < 8
+
+    monkeypatch.setattr(pesten.transfer, "save_checkpoint", real_save)
+    assert_identical(transfer(db, "sqlite", remote_db, "sqlite", batch_size=2, checkpoint_path=checkpoint))
+
+
+def test_verify_detects_differences(db, remote_db, tmp_path):
+    fill(db, 3)
+    transfer(db, "sqlite", remote_db, "sqlite", checkpoint_path=str(tmp_path / "transfer.json"))
+    remote_db.execute("UPDATE games SET winnaar = 'Bram' WHERE id = 1")
+    remote_db.commit()
+
+    games = [check for check in verify(db, "sqlite", remote_db, "sqlite") if check.table == "games"][0]
+    assert games.source_count == games.target_count
+    assert games.source_checksum != games.target_checksum